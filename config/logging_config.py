@@ -1,5 +1,58 @@
 ﻿# ...existing code...
+"""
+Configuración de logging de la aplicación (una sola vez, desde el punto de entrada).
+- Consola con formato corto; nivel por parámetro (o LOG_LEVEL en config/settings.py)
+- Archivo rotativo opcional en <workspace>/logs/billread.log (UTF-8)
+- Los módulos solo piden su logger (logging.getLogger); no instalan handlers propios
+- Llamarla de nuevo reemplaza los handlers instalados aquí (no se duplican líneas)
+"""
 import logging
-def configure_logging():
-    logging.basicConfig(level=logging.INFO,
-                        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+LOG_FILENAME = "billread.log"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+
+
+def _level(value) -> int:
+    if isinstance(value, str):
+        value = logging.getLevelName(value.strip().upper())
+    if not isinstance(value, int):
+        raise ValueError(f"Nivel de logging desconocido: {value}")
+    return value
+
+
+def configure_logging(workspace=None, level=logging.INFO, file_level=None):
+    """
+    Configura el logger raíz. workspace: con él se agrega el archivo rotativo en
+    <workspace>/logs; level: nivel (int o nombre, p. ej. "DEBUG") de consola y raíz;
+    file_level: nivel del archivo (por defecto el mismo). Devuelve la ruta del archivo o None.
+    """
+    level = _level(level)
+    file_level = level if file_level is None else _level(file_level)
+    root = logging.getLogger()
+    for handler in [h for h in root.handlers if getattr(h, "_billread", False)]:
+        root.removeHandler(handler)
+        handler.close()
+    root.setLevel(min(level, file_level) if workspace is not None else level)
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    console = logging.StreamHandler()
+    console.setLevel(level)
+    console.setFormatter(formatter)
+    console._billread = True
+    root.addHandler(console)
+
+    if workspace is None:
+        return None
+    logs_dir = Path(workspace) / "logs"
+    logs_dir.mkdir(parents=True, exist_ok=True)
+    path = logs_dir / LOG_FILENAME
+    sink = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+    sink.setLevel(file_level)
+    sink.setFormatter(formatter)
+    sink._billread = True
+    root.addHandler(sink)
+    return path
@@ -1,4 +1,13 @@
 ﻿# ...existing code...
+import os
 from pathlib import Path
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_WORKSPACE_ROOT = Path.home() / "Downloads"
+# Lector CSV: "pandas" (por defecto) o "arrow" (pyarrow multihilo); la variable de entorno permite comparar
+CSV_BACKEND = os.environ.get("BILLREAD_CSV_BACKEND", "pandas")
+# Presupuesto de memoria de resultados en MB (0 = sin límite): al pasarlo, los meses ya
+# analizados se vuelcan a Parquet en <workspace>/cache/spill (requiere pyarrow)
+MEMORY_BUDGET_MB = float(os.environ.get("BILLREAD_MEMORY_BUDGET_MB", "0") or 0)
+# Logging: nivel (DEBUG muestra el detalle por archivo/columna) y archivo rotativo en <workspace>/logs
+LOG_LEVEL = os.environ.get("BILLREAD_LOG_LEVEL", "INFO")
+LOG_TO_FILE = os.environ.get("BILLREAD_LOG_FILE", "1") != "0"
@@ -1,10 +1,19 @@
+import argparse
+import multiprocessing
 import tkinter as tk
 from ui.ui_form import CSVUploaderApp
 
 def main():
+    parser = argparse.ArgumentParser(description="Lecturas KV2C / KV2A analyzer")
+    parser.add_argument("--profile", action="store_true",
+                        help="perfilar análisis y exportaciones (.prof + resumen en workspace/logs)")
+    # Sin salir por argumentos ajenos (el ejecutable empaquetado puede recibir otros)
+    args, _ = parser.parse_known_args()
     root = tk.Tk()
-    CSVUploaderApp(root)
+    CSVUploaderApp(root, profile=args.profile)
     root.mainloop()
 
 if __name__ == "__main__":
+    # Ejecutable congelado: un proceso hijo corre su tarea en vez de abrir otra ventana
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -2,4 +2,4 @@
 """
 pa - paquete principal del proyecto.
 """
-__all__ = ["csv_processor", "utils", "ui_components"]
+__all__ = ["column_roles", "combined_index", "csv_backends", "csv_processor", "dedup", "downsample", "energy_units", "events", "excel_exports", "header_detection", "interval_grid", "interval_store", "multipliers", "prefetch", "preview", "profiling", "readers", "reports", "session_store", "sources", "spill", "time_index", "utils", "ui_components"]
@@ -0,0 +1,79 @@
+"""
+Caché de roles de columnas por firma de encabezado.
+- Todos los archivos de un mismo modelo de medidor traen el mismo encabezado
+- La detección (nombres + muestreo de contenido) corre solo para encabezados nuevos
+- El mapeo se guarda en JSON en el workspace y sirve entre sesiones
+"""
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Optional
+
+
+COLUMN_ROLES_FILENAME = "roles_columnas.json"
+ROLE_KEYS = ("timestamp", "kwh", "kvarh", "flags")
+
+_SPACES = re.compile(r"\s+")
+
+
+def header_signature(columns) -> str:
+    """Hash del encabezado normalizado (minúsculas, espacios colapsados)."""
+    norm = [_SPACES.sub(" ", str(c)).strip().lower() for c in columns]
+    return hashlib.sha1("\x1f".join(norm).encode("utf-8")).hexdigest()[:16]
+
+
+class ColumnRoleResolver:
+    """
+    Roles por firma de encabezado:
+    {'timestamp': col, 'kwh': [cols], 'kvarh': [cols], 'flags': [cols], 'source': 'nombre'|'contenido'}
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path is not None else None
+        self._roles: dict = {}
+        self.hits = 0
+        self.misses = 0
+        if self.path is not None and self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._roles = json.load(f).get("layouts", {})
+            except (OSError, ValueError):
+                # Caché corrupta: se reconstruye sola
+                self._roles = {}
+
+    @classmethod
+    def for_workspace(cls, cache_dir: Path) -> "ColumnRoleResolver":
+        return cls(Path(cache_dir) / COLUMN_ROLES_FILENAME)
+
+    def __len__(self) -> int:
+        return len(self._roles)
+
+    def get(self, columns) -> Optional[dict]:
+        """Roles cacheados para este encabezado, o None si es un encabezado nuevo."""
+        roles = self._roles.get(header_signature(columns))
+        if roles is not None:
+            # Defensa: el encabezado debe seguir teniendo las columnas cacheadas
+            present = set(columns)
+            wanted = [roles.get("timestamp")] + list(roles.get("kwh") or []) + list(roles.get("kvarh") or [])
+            if any(c is not None and c not in present for c in wanted):
+                roles = None
+        if roles is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return roles
+
+    def put(self, columns, roles: dict):
+        self._roles[header_signature(columns)] = {k: roles.get(k) for k in ROLE_KEYS + ("source",)}
+        self.save()
+
+    def save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "layouts": self._roles}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
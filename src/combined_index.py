@@ -0,0 +1,152 @@
+"""
+Índice sobre combined_df para leer por empresa y rango de tiempo.
+- Se arma una vez: frame ordenado por (empresa, timestamp) con timestamp datetime
+- empresa -> rango de filas contiguo; el tiempo se corta con searchsorted
+- Cada consulta es O(log n) y devuelve un corte posicional (sin máscaras booleanas)
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_COMPANY = "General"
+
+
+def _sort_key(col: pd.Series) -> pd.Series:
+    # Empresas comparadas como texto (igual que las claves del índice)
+    return col.astype(str) if col.name == "company" else col
+
+
+def _needs_sort(keys: np.ndarray, ts: np.ndarray) -> bool:
+    if len(keys) < 2:
+        return False
+    same = keys[1:] == keys[:-1]
+    if np.any(keys[1:][~same] < keys[:-1][~same]):
+        return True
+    # Dentro de cada empresa el tiempo debe crecer (NaT al final: se ordena igual que sort_values)
+    ns = ts.view("int64")
+    nat = np.iinfo("int64").min
+    prev, cur = ns[:-1][same], ns[1:][same]
+    return bool(np.any((cur < prev) & (cur != nat)) or np.any((prev == nat) & (cur != nat)))
+
+
+def _company_ranges(df: pd.DataFrame, keys: Optional[np.ndarray] = None) -> dict:
+    """empresa -> (inicio, fin) de su tramo contiguo en un frame ordenado por empresa."""
+    if keys is None:
+        keys = df["company"].astype(str).to_numpy()
+    if not len(keys):
+        return {}
+    bounds = np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1, [len(keys)]))
+    return {keys[lo]: (int(lo), int(hi)) for lo, hi in zip(bounds[:-1], bounds[1:])}
+
+
+def concat_sorted(frames: list) -> pd.DataFrame:
+    """
+    Une frames ya ordenados por (empresa, timestamp) y consecutivos en el tiempo
+    (p. ej. un análisis por mes) intercalando los tramos de cada empresa.
+    Una sola copia (la del concat) y el resultado ya queda ordenado: no hace falta sort.
+    """
+    frames = [f for f in frames if f is not None and len(f)]
+    if len(frames) == 1:
+        return frames[0]
+    if not frames or any("company" not in f.columns for f in frames):
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    ranges = [_company_ranges(f) for f in frames]
+    companies = sorted(set().union(*ranges))
+    pieces = [f.iloc[r[c][0]:r[c][1]] for c in companies for f, r in zip(frames, ranges) if c in r]
+    return pd.concat(pieces, ignore_index=True)
+
+
+class CombinedIndex:
+    """Frame consolidado ordenado + rangos por empresa + timestamps para searchsorted."""
+
+    def __init__(self, df: pd.DataFrame):
+        if "company" not in df.columns:
+            df = df.assign(company=DEFAULT_COMPANY)
+        if "timestamp" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
+            df = df.assign(timestamp=pd.to_datetime(df["timestamp"].astype(str).str.strip(),
+                                                    errors="coerce", dayfirst=True))
+        keys = df["company"].astype(str).to_numpy()
+        if "timestamp" in df.columns:
+            ts = df["timestamp"].to_numpy("datetime64[ns]")
+            if _needs_sort(keys, ts):
+                df = df.sort_values(["company", "timestamp"], kind="stable", key=_sort_key).reset_index(drop=True)
+                keys = df["company"].astype(str).to_numpy()
+                ts = df["timestamp"].to_numpy("datetime64[ns]")
+        else:
+            ts = None
+            if len(keys) > 1 and np.any(keys[1:] < keys[:-1]):
+                df = df.sort_values("company", kind="stable", key=_sort_key).reset_index(drop=True)
+                keys = df["company"].astype(str).to_numpy()
+
+        self.df = df
+        self._ts = ts
+        self._ranges = _company_ranges(df, keys)
+        self.valid_rows = int(np.count_nonzero(~np.isnat(ts))) if ts is not None else len(df)
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    @property
+    def companies(self) -> list:
+        return list(self._ranges)
+
+    def __contains__(self, company) -> bool:
+        return str(company) in self._ranges
+
+    def time_range(self, company: Optional[str] = None):
+        """(primer, último) timestamp válido de una empresa o de todas; (None, None) si no hay."""
+        if self._ts is None:
+            return None, None
+        spans = [self._ranges[str(company)]] if company is not None and str(company) in self._ranges else (
+            [] if company is not None else list(self._ranges.values()))
+        firsts, lasts = [], []
+        for lo, hi in spans:
+            seg = self._ts[lo:hi]
+            n = hi - lo - int(np.count_nonzero(np.isnat(seg)))
+            if n:
+                firsts.append(seg[0])
+                lasts.append(seg[n - 1])
+        if not firsts:
+            return None, None
+        return pd.Timestamp(min(firsts)), pd.Timestamp(max(lasts))
+
+    def rows(self, company: str, start=None, end=None) -> tuple:
+        """Rango posicional [lo, hi) de una empresa entre start y end (inclusive)."""
+        lo, hi = self._ranges.get(str(company), (0, 0))
+        if self._ts is None or lo == hi:
+            return lo, hi
+        seg = self._ts[lo:hi]
+        a = np.searchsorted(seg, np.datetime64(pd.Timestamp(start), "ns"), "left") if start is not None else 0
+        if end is not None:
+            b = np.searchsorted(seg, np.datetime64(pd.Timestamp(end), "ns"), "right")
+        else:
+            b = len(seg)
+        return lo + int(a), lo + int(b)
+
+    def slice(self, company: Optional[str] = None, start=None, end=None) -> pd.DataFrame:
+        """Filas de una empresa (o de todas) en el rango; con empresa es un corte contiguo."""
+        if company is not None:
+            lo, hi = self.rows(company, start, end)
+            return self.df.iloc[lo:hi]
+        if start is None and end is None:
+            return self.df
+        spans = [self.rows(c, start, end) for c in self._ranges]
+        if sum(hi - lo for lo, hi in spans) == len(self.df):
+            # La ventana cubre todo: el mismo frame, sin copia
+            return self.df
+        if len(spans) == 1:
+            return self.df.iloc[spans[0][0]:spans[0][1]]
+        positions = np.concatenate([np.arange(lo, hi) for lo, hi in spans]) if spans else np.array([], dtype=int)
+        return self.df.take(positions)
+
+    def groups(self, start=None, end=None):
+        """(empresa, filas) por empresa en orden."""
+        for company in self._ranges:
+            yield company, self.slice(company, start, end)
+
+    def batches(self, start=None, end=None):
+        """(empresas, filas) en bloques de empresas completas: en memoria, un solo bloque."""
+        if self._ranges:
+            yield self.companies, self.slice(None, start, end)
@@ -0,0 +1,119 @@
+"""
+Lectores CSV intercambiables para archivos KV2C.
+- "pandas": pd.read_csv (motor C y, si falla, python): el comportamiento de siempre
+- "arrow": lector CSV multihilo de pyarrow; columnas Arrow (las numéricas ya tipadas)
+- Mismo salto hasta el encabezado, descarte de filas mal formadas y codificaciones
+- Se elige con CSV_BACKEND en config/settings.py (o BILLREAD_CSV_BACKEND) para comparar
+"""
+import logging
+from typing import Optional
+
+import pandas as pd
+
+try:
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow es opcional
+    pa_csv = None
+
+
+LOG = logging.getLogger("csv_backends")
+
+CSV_BACKENDS = ("pandas", "arrow")
+DEFAULT_CSV_BACKEND = "pandas"
+
+
+class ShortRowsError(ValueError):
+    """Filas con menos campos que el encabezado: pandas las completa con NaN, Arrow no."""
+
+
+def arrow_available() -> bool:
+    return pa_csv is not None
+
+
+def resolve_backend(name: Optional[str]) -> str:
+    """Nombre de backend válido; 'arrow' sin pyarrow instalado vuelve a 'pandas'."""
+    name = (name or DEFAULT_CSV_BACKEND).strip().lower()
+    if name not in CSV_BACKENDS:
+        raise ValueError(f"Backend CSV desconocido: {name} (opciones: {', '.join(CSV_BACKENDS)})")
+    if name == "arrow" and not arrow_available():
+        LOG.warning("pyarrow no está instalado; se usa el lector de pandas")
+        return "pandas"
+    return name
+
+
+def _arrow_encoding(encoding: str) -> str:
+    # Arrow lee UTF-8 nativo (y salta el BOM); otras codificaciones se transcodifican
+    return "utf8" if encoding.lower().replace("_", "-") in ("utf-8", "utf-8-sig", "utf8") else encoding
+
+
+def read_arrow_table(source, encoding: str, header_index: int):
+    """
+    Tabla Arrow desde la fila de encabezado (skip_rows cuenta líneas, igual que skiprows).
+    Las filas con campos de más se descartan (on_bad_lines="skip"); si hay filas con
+    campos de menos se lanza ShortRowsError para que el llamador use pandas.
+    """
+    if pa_csv is None:
+        raise ImportError("pyarrow no está instalado")
+    short = []
+
+    def on_invalid(row):
+        if row.actual_columns < row.expected_columns:
+            short.append(row.number)
+        return "skip"
+
+    table = pa_csv.read_csv(
+        str(source) if not hasattr(source, "read") else source,
+        read_options=pa_csv.ReadOptions(skip_rows=header_index, encoding=_arrow_encoding(encoding),
+                                        use_threads=True),
+        parse_options=pa_csv.ParseOptions(invalid_row_handler=on_invalid),
+        convert_options=pa_csv.ConvertOptions(strings_can_be_null=True),
+    )
+    if short:
+        raise ShortRowsError(f"{len(short)} filas con campos de menos")
+    return table
+
+
+def table_to_frame(table, offset: int = 0) -> pd.DataFrame:
+    """DataFrame con columnas Arrow (sin copiar a object); índice continuo desde 'offset'."""
+    df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    df.index = pd.RangeIndex(offset, offset + len(df))
+    return df
+
+
+class ArrowChunkReader:
+    """Tabla Arrow entregada en bloques de DataFrame (misma interfaz que el lector por bloques de pandas)."""
+
+    def __init__(self, table, chunksize: int):
+        self._table = table
+        self._chunksize = max(1, int(chunksize))
+        self._offset = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> pd.DataFrame:
+        if self._table is None or self._offset >= self._table.num_rows:
+            raise StopIteration
+        chunk = table_to_frame(self._table.slice(self._offset, self._chunksize), self._offset)
+        self._offset += len(chunk)
+        return chunk
+
+    def close(self):
+        self._table = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_kv2c_arrow(source, encoding: str, header_index: int, chunksize: Optional[int] = None):
+    """
+    Equivalente Arrow de CSVProcessor._read_kv2c: DataFrame, o lector por bloques con chunksize.
+    El archivo (o la ventana indexada) se parsea completo en memoria Arrow, en varios hilos.
+    """
+    table = read_arrow_table(source, encoding, header_index)
+    if chunksize:
+        return ArrowChunkReader(table, chunksize)
+    return table_to_frame(table)
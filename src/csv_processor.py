@@ -6,20 +6,46 @@ CSV processor para archivos KV2C - VERSIÓN ARREGLADA
 """
 from pathlib import Path
 from typing import Optional, Tuple, List
+import codecs
+import gzip
+import io
 import logging
+import time
+from collections import Counter
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import re
 
+from . import session_store
+from .column_roles import ColumnRoleResolver
+from .combined_index import CombinedIndex, _company_ranges, concat_sorted
+from .csv_backends import DEFAULT_CSV_BACKEND, read_kv2c_arrow, resolve_backend
+from .dedup import FilePlan, grid_totals, merge_max, plan_files
+from .energy_units import frame_to_display, frame_to_fixed
+from .events import AnalysisFinished, AnalysisStarted, FileCompleted, FileFailed, emit
+from .header_detection import HEADER_PREFIX_BYTES, HeaderDetector, find_header_index, read_prefix, split_prefix
+from .interval_grid import INTERVAL, IntervalGrid
+from .interval_store import IntervalStore
+from .readers import PRNReader, ReaderRegistry
+from .spill import SpillStore
+from .prefetch import PREFETCH_DEPTH, PREFETCH_MAX_BYTES, PrefetchReader
+from .preview import PREVIEW_MAX_FILES, preview_folder
+from .sources import as_source, discover_sources
+from .time_index import TimeIndexCache
+from .utils import Cancelled, atomic_write, check_cancel, format_timestamp_series
+
 
 # Logger simple (si ya tienes otro, puedes reemplazarlo)
+# Sin handlers propios: la salida (consola / archivo rotativo) la arma config.logging_config
 LOG = logging.getLogger("csv_processor")
-if not LOG.handlers:
-    handler = logging.StreamHandler()
-    formatter = logging.Formatter("[%(levelname)s] %(message)s")
-    handler.setFormatter(formatter)
-    LOG.addHandler(handler)
-LOG.setLevel(logging.INFO)
+
+# Filas por bloque al exportar CSV (memoria acotada en exportaciones grandes)
+EXPORT_CHUNK_ROWS = 250_000
+# Filas por bloque al leer archivos de medidor (memoria acotada en archivos grandes)
+READ_CHUNK_ROWS = 100_000
+# Bloque para validar la codificación de un archivo completo antes de leerlo por bloques
+DECODE_CHECK_BYTES = 1024 * 1024
 
 
 # Stubs utilitarios para evitar NameError (ajusta si ya existen en otro módulo)
@@ -75,8 +101,139 @@ def parse_datetime_series(date_series: pd.Series,
 
 class CSVProcessor:
     def __init__(self, workspace: Path = None):
-        self.workspace = workspace
+        self.workspace = Path(workspace) if workspace is not None else None
+        self._combined_df = None
+        self._combined_index = None
+        # Resultados particionados con volcado a disco (ver set_partitions)
+        self._partitions = None
+        # Organización del workspace: input / output / logs
+        self.input_dir = self.output_dir = self.logs_dir = self.cache_dir = None
+        if self.workspace is not None:
+            self.input_dir = self.workspace / "input"
+            self.output_dir = self.workspace / "output"
+            self.logs_dir = self.workspace / "logs"
+            self.cache_dir = self.workspace / "cache"
+            for d in (self.workspace, self.input_dir, self.output_dir, self.logs_dir, self.cache_dir):
+                d.mkdir(parents=True, exist_ok=True)
+        # Historial local opcional (SQLite); ver enable_interval_store
+        self.interval_store = None
+        # Filas por bloque al leer CSV grandes (ver iter_csv_chunks)
+        self.read_chunk_rows = READ_CHUNK_ROWS
+        # Encabezados KV2C ya vistos (por huella de preámbulo)
+        self.header_detector = HeaderDetector()
+        # Roles de columnas por firma de encabezado (persistente si hay workspace)
+        self.column_roles = (ColumnRoleResolver.for_workspace(self.cache_dir)
+                             if self.cache_dir is not None else ColumnRoleResolver())
+        # Índice de bytes por día para saltar a la ventana en archivos grandes
+        self.time_index = TimeIndexCache(self.cache_dir)
+        # Lectura anticipada de los próximos archivos (0 = desactivada)
+        self.prefetch_depth = PREFETCH_DEPTH
+        self.prefetch_max_bytes = PREFETCH_MAX_BYTES
+        # Formatos de medidor conocidos (KV2C, PRN); el resto usa la detección genérica
+        self.readers = ReaderRegistry()
+        # Lector CSV: "pandas" o "arrow" (ver src/csv_backends.py)
+        self.csv_backend = DEFAULT_CSV_BACKEND
+        # Energía en punto fijo (None = float64; "Int64"/"Int32" = milésimas de kWh enteras)
+        self.fixed_point_dtype = None
+        # Presupuesto de memoria de resultados en MB (None/0 = sin límite; ver src/spill.py)
+        self.memory_budget_mb = None
+        # Pre-paso: omitir copias exactas y unir archivos del mismo medidor (ver src/dedup.py)
+        self.deduplicate = True
+        # Último plan de deduplicación: (firmas de los archivos, plan); un análisis de varios
+        # meses recorre la misma carpeta y no vuelve a hashear si nada cambió
+        self._plan_cache = None
+
+    # ---------------- Datos consolidados + índice ----------------
+    @property
+    def combined_df(self) -> Optional[pd.DataFrame]:
+        return self._combined_df
+
+    @combined_df.setter
+    def combined_df(self, df: Optional[pd.DataFrame]):
+        # Un frame nuevo invalida el índice (se reconstruye al primer uso) y descarta particiones
+        if self._partitions is not None:
+            self._partitions.cleanup()
+            self._partitions = None
+        self._combined_df = df
+        self._combined_index = None
+
+    @property
+    def combined_index(self):
+        """
+        Índice empresa/tiempo sobre combined_df (se arma una vez por frame).
+        Al armarlo combined_df queda ordenado por (empresa, timestamp) con timestamp datetime.
+        Si se modifica combined_df en el lugar, llamar a invalidate_index().
+        Con resultados volcados a disco es el SpillStore (misma interfaz de lectura).
+        """
+        if self._partitions is not None:
+            return self._partitions
+        if self._combined_index is None and self._combined_df is not None:
+            index = CombinedIndex(self._combined_df)
+            self._combined_df = index.df
+            self._combined_index = index
+        return self._combined_index
+
+    def invalidate_index(self):
+        self._combined_index = None
+
+    def has_data(self) -> bool:
+        """Hay resultados (en combined_df o en particiones volcadas)."""
+        if self._partitions is not None:
+            return len(self._partitions) > 0
+        return self._combined_df is not None and not self._combined_df.empty
+
+    # ---------------- Resultados particionados (presupuesto de memoria) ----------------
+    def new_result_store(self) -> SpillStore:
+        """Almacén de particiones con el presupuesto actual; volcados en <workspace>/cache/spill."""
+        return SpillStore.for_workspace(self.cache_dir, self.memory_budget_mb)
+
+    def set_partitions(self, store: SpillStore):
+        """
+        Adopta los resultados de varias particiones (p. ej. un análisis por mes).
+        Si todo quedó en memoria se unen en combined_df; si hubo volcado, combined_df queda
+        en None y las lecturas (combined_index, get_slice, exportaciones) van al almacén.
+        """
+        if not store.spilled:
+            self.combined_df = concat_sorted(list(store.frames()))
+            store.cleanup()
+            return
         self.combined_df = None
+        self._partitions = store
+        LOG.info("Resultados en %d particiones (%d filas, %.1f MB en memoria)",
+                 store.partitions, len(store), store.memory_bytes / 2**20)
+
+    # ---------------- Historial local (SQLite) ----------------
+    def enable_interval_store(self, path: Path = None) -> IntervalStore:
+        """Activa el historial local; por defecto en <workspace>/historial.sqlite."""
+        if path is None:
+            if self.workspace is None:
+                raise ValueError("Se necesita un workspace o una ruta para el historial")
+            self.interval_store = IntervalStore.for_workspace(self.workspace)
+        else:
+            self.interval_store = IntervalStore(path)
+        return self.interval_store
+
+    def disable_interval_store(self):
+        self.interval_store = None
+
+    def get_slice(self, company: str = None, start=None, end=None) -> pd.DataFrame:
+        """
+        Filas 'company,timestamp,kwh,kvarh' de una empresa y rango.
+        Usa combined_df si tiene la empresa y cubre el rango pedido para ella; si no,
+        consulta el historial local (solo se lee el tramo empresa/rango solicitado).
+        """
+        index = self.combined_index if self.has_data() else None
+        covered = index is not None and (company is None or company in index)
+        if covered and self.interval_store is not None:
+            first, last = index.time_range(company)
+            # Rejilla de 15 min: un fin 23:59 queda cubierto por el último slot (23:45)
+            last_slot = pd.Timestamp(end).floor(INTERVAL) if end is not None else None
+            covered = first is not None and (start is None or start >= first) and (last_slot is None or last_slot <= last)
+        if not covered and self.interval_store is not None:
+            return self.interval_store.query(company, start, end)
+        if index is None:
+            return pd.DataFrame(columns=["company", "timestamp", "kwh", "kvarh"])
+        return index.slice(company, start, end)
 
     # ---------------- HEADER KV2C CORRECTO (evitar Scale Factor) ----------------
     def _find_kv2c_header_index(self, lines: list[int | str]) -> int:
@@ -85,81 +242,217 @@ class CSVProcessor:
         Preferir: 'Read Date Time','Channel 1','Channel 2','Status Flags'
         Penalizar: '(Scale Factor)'
         """
-        best_idx, best_score = 0, -10_000
-        for i, raw in enumerate(lines[:200]):
-            line = raw.lower()
-            # Debe lucir como encabezado con comas suficientes
-            if line.count(",") < 4:
-                continue
-            score = 0
-            score += 3 if "read date time" in line else 0
-            score += 2 if "channel 1" in line else 0
-            score += 2 if "channel 2" in line else 0
-            score += 1 if "status flags" in line else 0
-            score -= 4 if "scale factor" in line else 0  # penaliza encabezados de factor
-            # Fuerte preferencia a la fila que tenga ambos canales sin factor
-            if ("channel 1" in line and "channel 2" in line) and ("scale factor" not in line):
-                score += 6
-            if score > best_score:
-                best_idx, best_score = i, score
+        return find_header_index([str(l) for l in lines])
 
-        # Si el mejor contiene 'scale factor', intenta buscar hacia arriba una versión sin él
-        if "scale factor" in str(lines[best_idx]).lower():
-            for j in range(max(0, best_idx - 5), best_idx):
-                l = str(lines[j]).lower()
-                if ("read date time" in l and "channel 1" in l and "channel 2" in l and "scale factor" not in l):
-                    return j
-        return best_idx
+    @staticmethod
+    def _tidy_frame(df: pd.DataFrame) -> pd.DataFrame:
+        df.columns = df.columns.str.strip()
+        # Columnas sin nombre: 'Unnamed: n' en pandas, '' en Arrow
+        df = df.loc[:, ~(df.columns.str.match(r"^Unnamed", na=False) | (df.columns == ""))]
+        return df.dropna(how="all")
+
+    def _engines(self) -> tuple:
+        """Motores a probar en orden; con el backend Arrow, pandas queda como respaldo."""
+        if resolve_backend(self.csv_backend) == "arrow":
+            return ("arrow", None, "python")
+        return (None, "python")
+
+    @staticmethod
+    def _read_kv2c(path, encoding: str, header_index: int, engine: str | None = None,
+                   chunksize: int | None = None):
+        """
+        pd.read_csv desde la fila de encabezado; con chunksize devuelve un lector por bloques.
+        engine="arrow" usa el lector de pyarrow (src.csv_backends) con la misma interfaz.
+        """
+        if engine == "arrow":
+            return read_kv2c_arrow(path, encoding, header_index, chunksize=chunksize)
+        kwargs = dict(
+            filepath_or_buffer=path,
+            encoding=encoding,
+            skiprows=header_index,
+            header=0,
+        )
+        if engine:
+            kwargs["engine"] = engine
+        if chunksize:
+            kwargs["chunksize"] = chunksize
+        try:
+            # pandas >= 1.3
+            return pd.read_csv(on_bad_lines="skip", **kwargs)
+        except TypeError:
+            # pandas viejos no tienen on_bad_lines
+            return pd.read_csv(**kwargs)
 
     def load_csv(self, path: Path) -> pd.DataFrame:
-        """Carga CSV KV2C detectando el encabezado correcto. Sin low_memory."""
+        """Carga CSV KV2C completo detectando el encabezado correcto. Sin low_memory."""
         encodings = ["utf-8-sig", "cp1252", "latin1"]
         last_err = None
+        # Solo se lee un prefijo acotado para ubicar el encabezado
+        prefix = read_prefix(path)
 
         for enc in encodings:
             try:
-                with open(path, "r", encoding=enc, errors="ignore") as f:
-                    lines = f.readlines()
-
-                hdr_idx = self._find_kv2c_header_index(lines)
-
-                def _read_at(idx: int, engine: str | None = None) -> pd.DataFrame:
-                    kwargs = dict(
-                        filepath_or_buffer=path,
-                        encoding=enc,
-                        skiprows=idx,
-                        header=0,
-                    )
-                    if engine:
-                        kwargs["engine"] = engine
+                hdr_idx = self.header_detector.detect(prefix, enc)["header_index"]
+                # Arrow (si está elegido), luego engine por defecto (C) y por último
+                # el fallback robusto con engine='python' (SIN low_memory)
+                *first_engines, last_engine = self._engines()
+                df = None
+                for engine in first_engines:
                     try:
-                        # pandas >= 1.3
-                        df = pd.read_csv(on_bad_lines="skip", **kwargs)
-                    except TypeError:
-                        # pandas viejos no tienen on_bad_lines
-                        df = pd.read_csv(**kwargs)
-                    df.columns = df.columns.str.strip()
-                    df = df.loc[:, ~df.columns.str.match(r"^Unnamed", na=False)]
-                    df = df.dropna(how="all")
-                    return df
-
-                # 1) Intento con engine por defecto (C)
-                try:
-                    df = _read_at(hdr_idx, engine=None)
-                except Exception:
-                    # 2) Fallback robusto con engine='python' (SIN low_memory)
-                    df = _read_at(hdr_idx, engine="python")
+                        df = self._read_kv2c(path, enc, hdr_idx, engine=engine)
+                        break
+                    except Exception as e:
+                        LOG.debug("load_csv: %s/%s falló: %s", enc, engine or "c", e)
+                if df is None:
+                    df = self._read_kv2c(path, enc, hdr_idx, engine=last_engine)
+                df = self._tidy_frame(df)
 
-                LOG.info(f"Archivo cargado: {path.name}, header en línea {hdr_idx}, columnas: {list(df.columns)}")
+                if LOG.isEnabledFor(logging.DEBUG):
+                    LOG.debug("Archivo cargado: %s, header en línea %d, columnas: %s", path.name, hdr_idx, list(df.columns))
                 return df
 
             except Exception as e:
                 last_err = e
-                LOG.debug(f"load_csv fallo con {enc}: {e}")
+                LOG.debug("load_csv falló con %s: %s", enc, e)
                 continue
 
         raise ValueError(f"No se pudo cargar el archivo: {path} ({last_err})")
 
+    @staticmethod
+    def _parse_day(text: str):
+        """Fecha (date) de un timestamp de texto, o None si no se puede parsear."""
+        ts = pd.to_datetime(normalize_am_pm(text), errors="coerce", dayfirst=True)
+        return None if pd.isna(ts) else ts.date()
+
+    def _window_slice(self, path: Path, encoding: str, layout: dict, window) -> Optional[dict]:
+        """
+        Bytes del encabezado + filas de la ventana (±1 día) usando el índice por día.
+        None si el archivo no se puede indexar (chico, desordenado, sin columna de fecha).
+        """
+        columns = layout["columns"]
+        date_col = self.detect_date_column(pd.DataFrame(columns=[c for c in columns if c]))
+        if not date_col:
+            return None
+        index = self.time_index.get(path, layout["header_index"], columns.index(date_col), self._parse_day)
+        if index is None:
+            return None
+        lo, hi = index.byte_range(*window)
+        with open(path, "rb") as f:
+            f.seek(index.header_offset)
+            header = f.read(index.data_offset - index.header_offset)
+            # El encabezado debe ser el que detectó el prefijo (saltos de línea raros, etc.)
+            if date_col not in header.decode(encoding, errors="ignore"):
+                return None
+            f.seek(lo)
+            body = f.read(max(0, hi - lo))
+        return {"data": header + body, "has_dates": bool(index.days), "bytes": len(body)}
+
+    def _detect_layout(self, prefix: bytes, encoding: str, reader=None) -> dict:
+        """Encabezado declarado por el formato (src.readers) o, si no, el detector KV2C."""
+        if reader is not None:
+            lines = split_prefix(prefix, encoding)
+            idx = reader.header_index(lines)
+            if idx is not None and idx < len(lines):
+                return {"header_index": idx, "columns": [c.strip() for c in lines[idx].split(",")],
+                        "fingerprint": None, "cached": False}
+        return self.header_detector.detect(prefix, encoding)
+
+    @staticmethod
+    def _decodes(stream, encoding: str) -> bool:
+        """True si todo el flujo de bytes es válido en 'encoding' (decodificación incremental, sin acumular)."""
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            for block in iter(lambda: stream.read(DECODE_CHECK_BYTES), b""):
+                decoder.decode(block)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return False
+        return True
+
+    def iter_csv_chunks(self, path, chunk_rows: int = None, window=None, info: dict = None,
+                        data: bytes = None, reader=None):
+        """
+        Igual que load_csv pero entrega el archivo en bloques de 'chunk_rows' filas.
+        La memoria queda acotada al tamaño del bloque, no al del archivo.
+        'path' es una ruta o un origen de src.sources (p. ej. miembro de un .zip, leído en streaming).
+        Con window=(inicio, fin) y un archivo indexable solo se leen las filas de ese rango;
+        'info' (opcional) recibe {'indexed', 'has_dates', 'bytes'} en ese caso.
+        'data' son los bytes del archivo ya leídos (lectura anticipada): no se toca el disco.
+        'reader' (src.readers) puede declarar la fila de encabezado de su formato.
+        La codificación se valida sobre todos los bytes antes de leer: un byte inválido
+        más allá del primer bloque no deja el archivo a medio entregar.
+        """
+        src = as_source(path)
+        chunk_rows = chunk_rows or self.read_chunk_rows
+        encodings = ["utf-8-sig", "cp1252", "latin1"]
+        last_err = None
+        prefix = data[:HEADER_PREFIX_BYTES] if data is not None else src.read_prefix(HEADER_PREFIX_BYTES)
+
+        for enc in encodings:
+            layout = self._detect_layout(prefix, enc, reader)
+            hdr_idx = layout["header_index"]
+            sliced = None
+            if window is not None and data is None and src.path is not None:
+                try:
+                    sliced = self._window_slice(src.path, enc, layout, window)
+                except Exception as e:
+                    LOG.debug("Índice por día no disponible para %s: %s", src.label, e)
+            if enc != encodings[-1]:
+                # latin1 decodifica cualquier byte: solo se validan las anteriores
+                if sliced is not None:
+                    stream = io.BytesIO(sliced["data"])
+                elif data is not None:
+                    stream = io.BytesIO(data)
+                else:
+                    stream = src.open()
+                with stream:
+                    valid = self._decodes(stream, enc)
+                if not valid:
+                    last_err = ValueError(f"bytes inválidos en {enc}")
+                    LOG.debug("%s no es %s válido", src.label, enc)
+                    continue
+            for engine in self._engines():
+                if sliced is not None:
+                    source, skip = io.BytesIO(sliced["data"]), 0
+                elif data is not None:
+                    source, skip = io.BytesIO(data), hdr_idx
+                elif src.path is not None:
+                    source, skip = src.path, hdr_idx
+                else:
+                    source, skip = src.open(), hdr_idx
+                try:
+                    chunks = self._read_kv2c(source, enc, skip, engine=engine, chunksize=chunk_rows)
+                    first = next(chunks, None)
+                    if first is None:
+                        if sliced is None:
+                            raise ValueError("archivo sin filas de datos")
+                        # Ventana sin filas: solo el encabezado
+                        source.seek(0)
+                        first = self._read_kv2c(source, enc, skip, engine=engine)
+                except Exception as e:
+                    last_err = e
+                    LOG.debug("iter_csv_chunks falló con %s/%s: %s", enc, engine or "c", e)
+                    if hasattr(source, "close"):
+                        source.close()
+                    continue
+                if sliced is not None:
+                    LOG.debug("Archivo indexado: %s, %d bytes en la ventana", src.label, sliced["bytes"])
+                    if info is not None:
+                        info.update(indexed=True, has_dates=sliced["has_dates"], bytes=sliced["bytes"])
+                else:
+                    LOG.debug("Archivo abierto por bloques: %s, header en línea %d", src.label, hdr_idx)
+                try:
+                    with chunks:
+                        yield self._tidy_frame(first)
+                        for chunk in chunks:
+                            yield self._tidy_frame(chunk)
+                finally:
+                    if hasattr(source, "close"):
+                        source.close()
+                return
+
+        raise ValueError(f"No se pudo cargar el archivo: {src.label} ({last_err})")
+
     def detect_date_column(self, df: pd.DataFrame) -> Optional[str]:
         """Detecta la columna de fecha/hora."""
         date_keywords = ["read date time", "date time", "datetime", "timestamp", "fecha", "hora"]
@@ -168,7 +461,7 @@ class CSVProcessor:
         for keyword in date_keywords:
             for col in df.columns:
                 if keyword.lower() in str(col).lower():
-                    LOG.info(f"Columna de fecha detectada por nombre: {col}")
+                    LOG.debug("Columna de fecha detectada por nombre: %s", col)
                     return col
         
         # Buscar por contenido
@@ -178,12 +471,12 @@ class CSVProcessor:
                 date_pattern = re.compile(r'\d{1,2}/\d{1,2}/\d{4}')
                 matches = sample.str.contains(date_pattern, regex=True).sum()
                 if matches >= 10:
-                    LOG.info(f"Columna de fecha detectada por contenido: {col}")
+                    LOG.debug("Columna de fecha detectada por contenido: %s", col)
                     return col
             except:
                 continue
         
-        LOG.warning("No se encontró columna de fecha")
+        LOG.debug("No se encontró columna de fecha")
         return None
 
     def _detect_energy_columns(self, df: pd.DataFrame) -> Tuple[Optional[str], Optional[str]]:
@@ -205,7 +498,7 @@ class CSVProcessor:
             if not kvar_col and "kvarh" in col_lower:
                 kvar_col = col
         
-        LOG.info(f"Detección por nombre - kWh: {kwh_col}, kvarh: {kvar_col}")
+        LOG.debug("Detección por nombre - kWh: %s, kvarh: %s", kwh_col, kvar_col)
         
         # 2. Buscar Channel 1/2
         if not kwh_col or not kvar_col:
@@ -216,7 +509,7 @@ class CSVProcessor:
                 if not kvar_col and "channel 2" in col_lower:
                     kvar_col = col
         
-        LOG.info(f"Detección por Channel - kWh: {kwh_col}, kvarh: {kvar_col}")
+        LOG.debug("Detección por Channel - kWh: %s, kvarh: %s", kwh_col, kvar_col)
         
         # 3. Buscar columnas numéricas
         if not kwh_col or not kvar_col:
@@ -243,13 +536,16 @@ class CSVProcessor:
             if not kvar_col and len(numeric_cols) > 1:
                 kvar_col = numeric_cols[1]
         
-        LOG.info(f"Detección final - kWh: {kwh_col}, kvarh: {kvar_col}")
+        LOG.debug("Detección final - kWh: %s, kvarh: %s", kwh_col, kvar_col)
         return kwh_col, kvar_col
 
     def _clean_numeric(self, series: pd.Series) -> pd.Series:
         """Limpia y convierte columna a numérico, preservando todos los valores válidos."""
         if series is None or series.empty:
             return pd.Series(dtype="float64")
+        fast = self._numeric_fast_path(series)
+        if fast is not None:
+            return fast
         
         # Convertir a string y limpiar
         cleaned = (series.astype(str)
@@ -261,14 +557,27 @@ class CSVProcessor:
         # Convertir a numérico
         numeric = pd.to_numeric(cleaned, errors='coerce')
         
-        valid_count = numeric.notna().sum()
-        LOG.info(f"Limpieza numérica: {valid_count}/{len(series)} valores válidos")
+        # El conteo recorre la columna: solo si el detalle DEBUG está activo
+        if LOG.isEnabledFor(logging.DEBUG):
+            LOG.debug("Limpieza numérica: %d/%d valores válidos", numeric.notna().sum(), len(series))
         
         return numeric
 
     # ==================== KV DETECCIÓN Y LIMPIEZA ====================
 
+    @staticmethod
+    def _numeric_fast_path(series: pd.Series) -> Optional[pd.Series]:
+        """Columna ya numérica (Arrow o C engine): float64 directo, sin pasar por texto."""
+        dtype = series.dtype
+        if not pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+            return None
+        values = pd.to_numeric(series, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        return pd.Series(values, index=series.index, name=series.name)
+
     def _clean_numeric_column(self, series: pd.Series) -> pd.Series:
+        fast = self._numeric_fast_path(series)
+        if fast is not None:
+            return fast
         s = (series.astype(str).str.strip()
              .str.replace("\xa0", " ", regex=False)
              .str.replace(" ", "", regex=False)
@@ -354,75 +663,161 @@ class CSVProcessor:
 
         return best
 
-    def _aggregate_energy(self, df: pd.DataFrame, ts_col: str) -> pd.DataFrame:
+    def _detect_energy_roles(self, df: pd.DataFrame) -> dict:
         """
-        Consolida kWh/kvarh por timestamp sin perder datos.
-        - Usa Channel 1 → kWh y Channel 2 → kvarh cuando existan.
-        - Si hay múltiples columnas/filas por timestamp, toma el valor máximo válido.
+        Roles de energía de un encabezado nuevo: candidatos por nombre y, si falta
+        alguno, el mejor par por contenido. Es lo que se guarda en la caché de roles.
         """
         kwh_names, kvar_names = self._kv_name_candidates(df)
+        source = "nombre"
+        if not kwh_names or not kvar_names:
+            kc, qc, _, _ = self._select_best_energy_pair(df)
+            if not kwh_names and kc is not None:
+                kwh_names = [kc]
+            if not kvar_names and qc is not None:
+                kvar_names = [qc]
+            source = "contenido"
+        flags = [c for c in df.columns if "flag" in str(c).lower()]
+        return {"kwh": kwh_names, "kvarh": kvar_names, "flags": flags, "source": source}
 
-        def stack_and_agg(col_list, new_col):
-            frames = []
-            for c in col_list or []:
-                if c in df.columns:
-                    s = self._clean_numeric_column(df[c])
-                    frames.append(pd.DataFrame({ts_col: df[ts_col], new_col: s}))
-            if not frames:
-                return pd.DataFrame(columns=[ts_col, new_col])
-            long = pd.concat(frames, ignore_index=True)
-            return long.groupby(ts_col, as_index=False)[new_col].max()
-
-        kwh_agg = stack_and_agg(kwh_names, "kwh_val")
-        kvar_agg = stack_and_agg(kvar_names, "kvar_val")
-
-        # Fallback robusto: escoger mejor par si falta alguno
-        if kwh_agg.empty or kvar_agg.empty:
-            kc, qc, ks, qs = self._select_best_energy_pair(df)
-            if kwh_agg.empty and kc is not None:
-                kwh_agg = pd.DataFrame({ts_col: df[ts_col], "kwh_val": ks}).groupby(ts_col, as_index=False)["kwh_val"].max()
-            if kvar_agg.empty and qc is not None:
-                kvar_agg = pd.DataFrame({ts_col: df[ts_col], "kvar_val": qs}).groupby(ts_col, as_index=False)["kvar_val"].max()
-
-        out = pd.merge(kwh_agg, kvar_agg, on=ts_col, how="outer")
-        return out
-
+    def _fold_energy(self, df: pd.DataFrame, slots: np.ndarray, grid: IntervalGrid,
+                     kwh_cols: List[str], kvar_cols: List[str]) -> int:
+        """
+        Consolida kWh/kvarh directamente en la rejilla sin perder datos.
+        - Usa Channel 1 → kWh y Channel 2 → kvarh (roles ya resueltos).
+        - Si hay múltiples columnas/filas por slot, toma el valor máximo válido.
+        - slots: grid.slots(timestamps) de las filas de df.
+        Devuelve cuántos valores numéricos válidos tenía df (dentro o fuera del mes).
+        """
+        seen = 0
+        for cols, role in ((kwh_cols, "kwh"), (kvar_cols, "kvarh")):
+            for c in cols or []:
+                if c not in df.columns:
+                    continue
+                values = self._clean_numeric_column(df[c]).to_numpy(dtype="float64")
+                seen += int(np.count_nonzero(~np.isnan(values)))
+                grid.fold(slots, **{role: values})
+        return seen
 
     def export_excel_multi_sheet(self, filename: str):
         """Exporta a Excel con una hoja por empresa + resumen combinado"""
-        if self.combined_df is None:
+        if not self.has_data():
             return False, "No hay datos procesados para exportar"
         try:
-            df = self.combined_df.copy()
-            df["timestamp"] = df["timestamp"].dt.strftime("%d/%m/%Y %H:%M:%S")
-            
+            index = self.combined_index
+
+            def formatted(df):
+                df = frame_to_display(df)
+                return df.assign(timestamp=format_timestamp_series(df["timestamp"], "%d/%m/%Y %H:%M:%S"))
+
             with pd.ExcelWriter(filename, engine="openpyxl") as writer:
-                for company in df["company"].unique():
-                    company_df = df[df["company"] == company].copy()
-                    sheet_name = str(company)[:31]
-                    company_df.to_excel(writer, sheet_name=sheet_name, index=False)
-                
-                df.to_excel(writer, sheet_name="RESUMEN_COMBINADO", index=False)
+                # Un frame formateado por bloque de empresas (en memoria: uno solo);
+                # las hojas por empresa son cortes contiguos del bloque (sin copias)
+                for companies, df in index.batches():
+                    df = formatted(df)
+                    ranges = _company_ranges(df)
+                    for company in companies:
+                        lo, hi = ranges.get(str(company), (0, 0))
+                        df.iloc[lo:hi].to_excel(writer, sheet_name=str(company)[:31], index=False)
+
+                row = 0
+                for _, df in index.batches():
+                    formatted(df).to_excel(writer, sheet_name="RESUMEN_COMBINADO", index=False,
+                                           header=(row == 0), startrow=row + (row > 0))
+                    row += len(df)
             
             return True, f"Excel exportado: {filename}"
         except Exception as e:
             return False, f"Error exportando Excel: {e}"
 
-    def export_combined_csv(self, filename: str):
-        """Exporta a CSV combinado (formato ISO para fechas)"""
-        if self.combined_df is None:
+    def export_combined_csv(self, filename: str, chunk_rows: int = EXPORT_CHUNK_ROWS,
+                            compress: Optional[bool] = None, progress_cb=None, cancel=None, index=None):
+        """
+        Exporta a CSV combinado (formato ISO para fechas) escribiendo por bloques.
+        - No copia combined_df completo: cada bloque se formatea y se vuelca al archivo
+        - Con resultados volcados a disco se leen por bloques de empresas (mismo orden)
+        - compress=None → gzip si el nombre termina en .gz
+        - Se escribe en un temporal y se renombra al final (cancel: threading.Event)
+        - index: índice a exportar (por defecto el actual; la UI lo captura al lanzar el trabajo)
+        """
+        if index is None and not self.has_data():
             return False, "No hay datos procesados"
         try:
-            df = self.combined_df.copy()
-            df["timestamp"] = df["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S")
-            df.to_csv(filename, index=False, encoding="utf-8-sig")
+            index = index if index is not None else self.combined_index
+            total = len(index)
+            if compress is None:
+                compress = str(filename).lower().endswith(".gz")
+            chunk_rows = max(1, int(chunk_rows))
+
+            with atomic_write(filename) as tmp:
+                if compress:
+                    f = gzip.open(tmp, "wt", compresslevel=5, encoding="utf-8-sig", newline="")
+                else:
+                    f = open(tmp, "w", encoding="utf-8-sig", newline="")
+                with f:
+                    written = 0
+                    for _, df in index.batches():
+                        is_dt = "timestamp" in df.columns and pd.api.types.is_datetime64_any_dtype(df["timestamp"])
+                        for start in range(0, len(df), chunk_rows):
+                            check_cancel(cancel)
+                            if progress_cb:
+                                progress_cb(f"CSV: filas {written + 1}-{written + min(chunk_rows, len(df) - start)} de {total}")
+                            # Punto fijo → kWh solo al escribir
+                            chunk = frame_to_display(df.iloc[start:start + chunk_rows])
+                            if is_dt:
+                                chunk = chunk.assign(timestamp=format_timestamp_series(chunk["timestamp"], "%Y-%m-%d %H:%M:%S"))
+                            chunk.to_csv(f, index=False, header=(written == 0))
+                            written += len(chunk)
             return True, f"CSV exportado: {filename}"
+        except Cancelled:
+            return False, "Exportación cancelada"
         except Exception as e:
             return False, f"Error: {e}"
 
+    def export_session(self, filename: str, results: dict = None, multipliers: dict = None,
+                       compression: str = "zstd"):
+        """Guarda combined_df + resultados + multiplos en Parquet/Feather (según extensión)."""
+        if not self.has_data():
+            return False, "No hay datos procesados para exportar"
+        try:
+            # Con particiones en disco se escribe por bloques (sin reunir todo en memoria)
+            data = self.combined_df if self._partitions is None else (df for _, df in self._partitions.batches())
+            session_store.save_session(data, filename, results=results,
+                         multipliers=multipliers, compression=compression)
+            return True, f"Sesión guardada: {filename}"
+        except Exception as e:
+            return False, f"Error guardando sesión: {e}"
+
+    def load_session(self, filename: str):
+        """
+        Reabre una sesión guardada con export_session.
+        Devuelve (ok, msg, {"results": ..., "multipliers": ...}).
+        """
+        try:
+            df, results, multipliers = session_store.load_session(filename)
+        except Exception as e:
+            return False, f"Error abriendo sesión: {e}", None
+        self.combined_df = df
+        return True, f"Sesión cargada: {Path(filename).name} ({len(df)} filas)", {
+            "results": results,
+            "multipliers": multipliers,
+        }
+
     def clear_data(self):
         self.combined_df = None
 
+    def preview_folder(self, folder_path: Path, start_dt: datetime, end_dt: datetime,
+                       max_files: int = PREVIEW_MAX_FILES, progress_cb=None):
+        """
+        Vista previa rápida antes de analyze_folder: inicio y final de una muestra de archivos
+        (encabezado, roles, formato de fecha, cobertura del rango, tiempo estimado).
+        Devuelve (ok, msg, resultados); no modifica combined_df (ver src/preview.py).
+        """
+        try:
+            return preview_folder(self, folder_path, start_dt, end_dt, max_files=max_files, progress_cb=progress_cb)
+        except Exception as e:
+            return False, f"Error en la vista previa: {e}", None
+
     def analyze_folder(
         self,
         folder_path: Path,
@@ -430,11 +825,13 @@ class CSVProcessor:
         año_usuario=None,
         start_time: str = "00:00",
         end_time: str = "00:15",
-        progress_cb=None
+        progress_cb=None,
+        event_cb=None
     ):
         """
         Procesa todos los CSV en folder_path y construye 'company,timestamp,kwh,kvarh'.
         No modifica la lógica de FECHAS del UI; aquí solo parseamos para poder agrupar.
+        event_cb recibe eventos de src.events (un FileCompleted/FileFailed por archivo).
         """
         def report(msg: str):
             if progress_cb:
@@ -443,7 +840,9 @@ class CSVProcessor:
                 except Exception:
                     pass
 
-        csv_files = list(Path(folder_path).glob("*.csv"))
+        t0 = time.perf_counter()
+        # Carpeta o archivo comprimido; los .zip/.gz/.tar.gz se leen sin extraer
+        csv_files = discover_sources(folder_path, (".csv",))
         if not csv_files:
             return False, "No se encontraron archivos CSV en la carpeta", None
 
@@ -467,89 +866,50 @@ class CSVProcessor:
         if len(full_range) < expected_rows:
             last_minute = datetime(start_dt.year, start_dt.month, dias_mes, 23, 45)
             full_range = pd.date_range(start_dt, last_minute, freq="15min")
-            LOG.info(f"Rejilla extendida a {len(full_range)} filas (mes de {dias_mes} días).")
+            LOG.debug("Rejilla extendida a %d filas (mes de %d días).", len(full_range), dias_mes)
         elif len(full_range) > expected_rows:
             full_range = full_range[:expected_rows]
-            LOG.info(f"Rejilla recortada a {expected_rows} filas (mes de {dias_mes} días).")
+            LOG.debug("Rejilla recortada a %d filas (mes de %d días).", expected_rows, dias_mes)
         start_str = full_range.min().strftime("%d/%m/%Y %H:%M")
         end_str = full_range.max().strftime("%d/%m/%Y %H:%M")
 
         processed = []
         details = []
         errors = []
+        parsed = 0
 
         report(f"Archivos detectados: {len(csv_files)}")
+        period = f"{int(mes_usuario):02d}/{año_usuario}"
+        plan = self._plan_files(csv_files)
+        for dup, original in plan.duplicates:
+            report(f"Copia omitida: {dup.label} (igual a {original.label})")
+            details.append({"filename": dup.name, "rows": 0, "success": True, "duplicate_of": original.name,
+                            "kwh_values": 0, "kvar_values": 0, "start_date": start_str, "end_date": end_str})
+        emit(event_cb, AnalysisStarted(period, str(folder_path), len(plan)))
 
-        for i, csv_path in enumerate(csv_files, start=1):
-            report(f"[{i}/{len(csv_files)}] Procesando {csv_path.name}")
-            try:
-                df = self.load_csv(csv_path)
-
-                # Detectar columna fecha sin cambiar tu lógica global
-                date_col = self.detect_date_column(df)
-                if not date_col:
-                    # Rejilla vacía si no hay fecha
-                    out = pd.DataFrame({
-                        "company": csv_path.stem,
-                        "timestamp": full_range,
-                        "kwh": pd.NA,
-                        "kvarh": pd.NA
-                    })
-                    processed.append(out)
-                    details.append({
-                        "filename": csv_path.name,
-                        "rows": len(out),
-                        "success": True,
-                        "note": "sin fecha",
-                        "start_date": start_str,
-                        "end_date": end_str
-                    })
-                    continue
-
-                # Parseo local para poder agrupar; no toca tu UI
-                date_series = df[date_col].astype(str).apply(normalize_am_pm)
-                ts = parse_datetime_series(date_series)
-                df = df.copy()
-                df["__ts__"] = ts
-                df = df.dropna(subset=["__ts__"])
-                if df.empty:
-                    details.append({"filename": csv_path.name, "rows": 0, "success": False, "error": "fechas inválidas"})
-                    continue
-
-                # Consolidar energía por timestamp (usa helpers ya añadidos)
-                energy = self._aggregate_energy(df, "__ts__")
+        # Empresas con varios archivos: la rejilla se funde en float y se guarda con el último
+        pending = Counter(plan.company_of(src) for src in plan.files)
+        merged = {}
 
-                # Filtrar al rango y reindexar a rejilla completa
-                in_month = energy[(energy["__ts__"] >= full_range.min()) &
-                                  (energy["__ts__"] <= full_range.max())].copy()
-                if not in_month.empty:
-                    in_month = in_month.set_index("__ts__")
-                    kwh_full = in_month["kwh_val"].reindex(full_range)
-                    kvar_full = in_month["kvar_val"].reindex(full_range)
+        for i, (csv_path, data) in enumerate(self._prefetch(plan.files), start=1):
+            company = plan.company_of(csv_path)
+            report(f"[{i}/{len(plan)}] Procesando {csv_path.label}")
+            try:
+                final_df, detail = self._process_csv_file(csv_path, full_range, data, company=company)
+                detail.update(start_date=start_str, end_date=end_str)
+                if final_df is not None:
+                    previous = merged.get(company)
+                    merged[company] = final_df if previous is None else merge_max(previous, final_df)
+                    parsed += 1
+                    if event_cb is not None:
+                        emit(event_cb, self._file_event(period, i, len(plan), merged[company], detail, previous))
                 else:
-                    kwh_full = pd.Series(index=full_range, dtype="float64")
-                    kvar_full = pd.Series(index=full_range, dtype="float64")
-
-                final_df = pd.DataFrame({
-                    "company": csv_path.stem,
-                    "timestamp": full_range,
-                    "kwh": kwh_full.values,
-                    "kvarh": kvar_full.values
-                })
-
-                processed.append(final_df)
-                details.append({
-                    "filename": csv_path.name,
-                    "rows": len(final_df),
-                    "success": True,
-                    "kwh_values": int(pd.notna(final_df["kwh"]).sum()),
-                    "kvar_values": int(pd.notna(final_df["kvarh"]).sum()),
-                    "start_date": start_str,
-                    "end_date": end_str
-                })
+                    emit(event_cb, FileFailed(period, csv_path.name, i, len(plan), detail.get("error", "")))
+                details.append(detail)
 
             except Exception as e:
-                LOG.exception(f"Error procesando {csv_path.name}")
+                LOG.exception("Error procesando %s", csv_path.label)
+                emit(event_cb, FileFailed(period, csv_path.name, i, len(plan), str(e)))
                 errors.append({"filename": csv_path.name, "error": str(e)})
                 details.append({
                     "filename": csv_path.name,
@@ -559,18 +919,36 @@ class CSVProcessor:
                     "start_date": start_str,
                     "end_date": end_str
                 })
+            finally:
+                pending[company] -= 1
+                if not pending[company] and company in merged:
+                    processed.append(self._energy_storage(merged.pop(company)))
 
+        run = f"Análisis {period}"
         if not processed:
+            self._log_run_summary(run, details, 0, time.perf_counter() - t0)
+            emit(event_cb, AnalysisFinished(period, 0, len(errors), 0, time.perf_counter() - t0))
             err = "\n".join([f"- {e['filename']}: {e['error']}" for e in errors]) or "Sin detalles"
             return False, f"No se procesaron archivos\n{err}", None
 
-        combined = pd.concat(processed, ignore_index=True).sort_values(["company", "timestamp"])
+        # Cada archivo ya viene ordenado por tiempo (rejilla): basta ordenar la lista
+        # por empresa y concatenar una vez, sin sort_values sobre todo el frame
+        processed.sort(key=lambda f: str(f["company"].iat[0]) if len(f) else "")
+        companies = [str(f["company"].iat[0]) for f in processed if len(f)]
+        combined = pd.concat(processed, ignore_index=True)
+        processed.clear()
         self.combined_df = combined
+        if self.interval_store is not None:
+            try:
+                stored = self.interval_store.append(combined)
+                report(f"Historial local: {stored} intervalos guardados")
+            except Exception as e:
+                LOG.warning("No se pudo actualizar el historial local: %s", e)
 
         results = {
             "folder": str(folder_path),
             "total_files": len(csv_files),
-            "processed_files": len(processed),
+            "processed_files": parsed,
             "error_files": len(errors),
             "date_range": {
                 "start": start_str,
@@ -583,50 +961,203 @@ class CSVProcessor:
                 "total_kvar_values": int(pd.notna(combined["kvarh"]).sum()),
             },
             "file_details": details,
-            "errors": errors
+            "errors": errors,
+            "duplicate_files": [{"filename": d.name, "duplicate_of": o.name} for d, o in plan.duplicates],
+            "merged_companies": plan.merged,
         }
-        return True, f"Procesamiento completado: {len(processed)} archivos procesados", results
+        self._log_run_summary(run, details, len(combined), time.perf_counter() - t0)
+        emit(event_cb, AnalysisFinished(period, parsed, len(errors), len(combined),
+                                        time.perf_counter() - t0, companies))
+        return True, f"Procesamiento completado: {parsed} archivos procesados", results
+
+    def _plan_files(self, sources: list) -> FilePlan:
+        """Pre-paso de deduplicación; si falla (o está desactivado) se procesan todos los archivos."""
+        if not self.deduplicate or len(sources) < 2:
+            return FilePlan(list(sources), {}, [])
+        key = tuple(src.signature for src in sources)
+        if self._plan_cache is not None and self._plan_cache[0] == key:
+            return self._plan_cache[1].rebind(sources)
+        try:
+            plan = plan_files(sources, self.readers)
+        except Exception as e:
+            LOG.warning("No se pudo deduplicar los archivos: %s", e)
+            return FilePlan(list(sources), {}, [])
+        self._plan_cache = (key, plan)
+        if plan.duplicates or plan.merged:
+            LOG.info("Deduplicación: %d copias omitidas, %d empresas unidas desde varios archivos",
+                     len(plan.duplicates), len(plan.merged))
+        return plan
 
-    def load_prn(self, path: Path) -> pd.DataFrame:
+    @staticmethod
+    def _file_event(period: str, index: int, total: int, final_df: pd.DataFrame, detail: dict,
+                    previous: Optional[pd.DataFrame] = None) -> FileCompleted:
         """
-        Intenta leer un archivo PRN (generalmente separado por espacios o tabulaciones).
-        Se limpia encabezado y normaliza nombres.
+        Resultado parcial de un archivo (rejilla en float, antes del punto fijo).
+        Si la empresa ya tenía rejilla ('previous'), se informa solo lo que el archivo agrega.
+        """
+        now, before = grid_totals(final_df), grid_totals(previous)
+        kwh, kvarh, kwh_values, kvar_values = (a - b for a, b in zip(now, before))
+        return FileCompleted(
+            period, detail.get("filename", ""), str(final_df["company"].iat[0]) if len(final_df) else "",
+            index, total, kwh=kwh, kvarh=kvarh, kwh_values=kwh_values, kvar_values=kvar_values,
+            rows=len(final_df), format=detail.get("format"),
+        )
+
+    @staticmethod
+    def _log_run_summary(run: str, details: list, rows: int, elapsed: float):
+        """Una línea por corrida (el detalle por archivo/columna queda en DEBUG)."""
+        if not LOG.isEnabledFor(logging.INFO):
+            return
+        ok = sum(1 for d in details if d.get("success"))
+        formats = Counter(d["format"] for d in details if d.get("format"))
+        LOG.info("%s: %d/%d archivos procesados, %d con error, %d filas en %.2f s (formatos: %s; indexados: %d)",
+                 run, ok, len(details), len(details) - ok, rows, elapsed,
+                 ", ".join(f"{k}={v}" for k, v in sorted(formats.items())) or "-",
+                 sum(1 for d in details if d.get("indexed")))
+        duplicates = sum(1 for d in details if d.get("duplicate_of"))
+        if duplicates:
+            LOG.info("%s: %d copias exactas omitidas", run, duplicates)
+        off_grid = [d for d in details if d.get("off_grid")]
+        if off_grid:
+            LOG.warning("%s: %d lecturas fuera de la rejilla de 15 min en %d archivos",
+                        run, sum(d["off_grid"] for d in off_grid), len(off_grid))
+
+    @staticmethod
+    def _parse_timestamps(values: pd.Series, reader) -> pd.Series:
         """
+        Fechas de un bloque. Con el formato fijo del lector se parsea vectorizado;
+        solo las filas que no calzan pasan por el parseo genérico (AM/PM, día primero).
+        """
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return values
+        if reader.timestamp_format:
+            ts = pd.to_datetime(values, format=reader.timestamp_format, errors="coerce")
+            rest = ts.isna() & values.notna()
+            if rest.any():
+                ts[rest] = parse_datetime_series(values[rest].astype(str).apply(normalize_am_pm))
+            return ts
+        return parse_datetime_series(values.astype(str).apply(normalize_am_pm))
+
+    def _energy_storage(self, df: pd.DataFrame) -> pd.DataFrame:
+        """kwh/kvarh en la representación configurada (ver fixed_point_dtype)."""
+        if self.fixed_point_dtype is None:
+            return df
         try:
-            df = pd.read_csv(path, sep=None, engine="python", header=0)
-        except Exception:
-            # Fallback a whitespace
-            df = pd.read_csv(path, delim_whitespace=True, header=0)
-        df.columns = [c.strip().lower() for c in df.columns]
-        # Normalizar columnas esperadas si existen
-        for maybe in ["fecha", "date"]:
-            if maybe in df.columns and "timestamp" not in df.columns:
-                # Intento parsear fecha y hora si hay columna hora
-                if "hora" in df.columns:
-                    df["timestamp"] = pd.to_datetime(df[maybe] + " " + df["hora"], errors="coerce", dayfirst=True)
-                else:
-                    df["timestamp"] = pd.to_datetime(df[maybe], errors="coerce", dayfirst=True)
-        if "timestamp" not in df.columns:
-            # Busca combinaciones
-            for f_col in ["date", "fecha"]:
-                for h_col in ["time", "hora"]:
-                    if f_col in df.columns and h_col in df.columns:
-                        df["timestamp"] = pd.to_datetime(df[f_col] + " " + df[h_col], errors="coerce", dayfirst=True)
-        df = df.dropna(subset=["timestamp"])
-        df = df.sort_values("timestamp")
-        df.reset_index(drop=True, inplace=True)
-        return df
+            return frame_to_fixed(df, dtype=self.fixed_point_dtype)
+        except OverflowError:
+            # Lecturas demasiado grandes para Int32: ese archivo queda en Int64
+            return frame_to_fixed(df, dtype="Int64")
+
+    def _prefetch(self, paths: list):
+        """(ruta, bytes | None) por archivo; los próximos se leen mientras se procesa el actual."""
+        if self.prefetch_depth <= 0 or len(paths) < 2:
+            return ((p, None) for p in paths)
+        # Los archivos indexables no se adelantan: se lee solo su ventana
+        return PrefetchReader(paths, depth=self.prefetch_depth, max_bytes=self.prefetch_max_bytes,
+                              max_file_bytes=self.time_index.min_bytes)
+
+    def _process_csv_file(self, csv_path, full_range: pd.DatetimeIndex, data: bytes = None,
+                          company: Optional[str] = None):
+        """
+        Lee un CSV (ruta u origen de src.sources) por bloques, filtra cada bloque
+        a la ventana y lo vuelca en la rejilla.
+        'data' son los bytes ya leídos por la lectura anticipada (None = leer del disco).
+        'company' es la empresa del archivo (por defecto, el nombre del archivo).
+        Devuelve (final_df | None, detalle).
+        """
+        src = as_source(csv_path)
+        # Formato por firma del prefijo: roles conocidos y fechas con formato fijo
+        prefix = data[:HEADER_PREFIX_BYTES] if data is not None else src.read_prefix(HEADER_PREFIX_BYTES)
+        reader = self.readers.detect(prefix, src.name)
+        grid = IntervalGrid.from_range(full_range)
+        roles = header_cols = date_col = None
+        cached_roles = roles_checked = False
+        valid_rows = 0
+        # Solo las filas de la ventana (±1 día) si el archivo tiene índice por día
+        window = (full_range[0], full_range[-1])
+        info = {}
+
+        for n, chunk in enumerate(self.iter_csv_chunks(src, window=window, info=info, data=data, reader=reader)):
+            if n == 0:
+                # Roles de columnas: caché por firma de encabezado; detección solo si es nuevo
+                header_cols = list(chunk.columns)
+                roles = reader.roles(header_cols) or self.column_roles.get(header_cols)
+                cached_roles = roles is not None
+                date_col = roles["timestamp"] if roles else self.detect_date_column(chunk)
+                if not date_col:
+                    break
+
+            # Parseo local para poder agrupar; no toca tu UI
+            ts = self._parse_timestamps(chunk[date_col], reader)
+            valid_ts = ts.notna()
+            if not valid_ts.any():
+                continue
+            valid_rows += int(valid_ts.sum())
+
+            if roles is None:
+                roles = dict(self._detect_energy_roles(chunk[valid_ts]), timestamp=date_col)
+                self.column_roles.put(header_cols, roles)
+            # Las filas fuera de la ventana o con NaT caen en slot -1 y se ignoran
+            slots = grid.slots(ts)
+            seen = self._fold_energy(chunk, slots, grid, roles["kwh"], roles["kvarh"])
+            if cached_roles and not roles_checked and seen == 0:
+                # Los roles cacheados no sirven para este archivo: redetectar
+                roles = dict(self._detect_energy_roles(chunk[valid_ts]), timestamp=date_col)
+                self.column_roles.put(header_cols, roles)
+                self._fold_energy(chunk, slots, grid, roles["kwh"], roles["kvarh"])
+            roles_checked = True
+
+        if not date_col:
+            # Rejilla vacía si no hay fecha
+            out = pd.DataFrame({
+                "company": company or csv_path.stem,
+                "timestamp": full_range,
+                "kwh": pd.NA,
+                "kvarh": pd.NA
+            })
+            return out, {"filename": csv_path.name, "rows": len(out), "success": True, "note": "sin fecha"}
+        if valid_rows == 0 and not info.get("has_dates"):
+            return None, {"filename": csv_path.name, "rows": 0, "success": False, "error": "fechas inválidas"}
+
+        final_df = grid.to_frame(company or csv_path.stem)
+        detail = {
+            "filename": csv_path.name,
+            "rows": len(final_df),
+            "success": True,
+            "kwh_values": int(np.count_nonzero(~np.isnan(grid.kwh))),
+            "kvar_values": int(np.count_nonzero(~np.isnan(grid.kvarh))),
+            "format": reader.name,
+        }
+        if info.get("indexed"):
+            detail["indexed"] = True
+        if grid.off_grid:
+            # Lecturas con minutos fuera de la rejilla de 15 min: no se asignan
+            detail["off_grid"] = grid.off_grid
+            LOG.debug("%s: %d lecturas fuera de la rejilla de 15 min", csv_path.name, grid.off_grid)
+        return final_df, detail
+
+    def load_prn(self, path) -> pd.DataFrame:
+        """
+        Intenta leer un archivo PRN (generalmente separado por espacios o tabulaciones).
+        Se limpia encabezado y normaliza nombres (ver src.readers.PRNReader).
+        'path' es una ruta o un origen de src.sources (miembro de un comprimido).
+        """
+        reader = self.readers.get(PRNReader.name) or PRNReader()
+        return reader.load(path)
 
     def analyze_folder_prn(self, folder: Path, mes_usuario: int, año_usuario: int,
-                           start_time: str, end_time: str, progress_cb=None):
+                           start_time: str, end_time: str, progress_cb=None, event_cb=None):
         """
         Similar a analyze_folder para CSV pero filtrando archivos .prn
-        (Reutiliza atributos combined_df y exportaciones).
+        (Reutiliza atributos combined_df y exportaciones; mismos eventos que analyze_folder).
         """
-        prn_files = list(folder.glob("*.prn"))
+        t0 = time.perf_counter()
+        prn_files = discover_sources(folder, (".prn",))
         details = []
         total_ok = 0
-        for f in prn_files:
+        period = f"{int(mes_usuario):02d}/{año_usuario}"
+        emit(event_cb, AnalysisStarted(period, str(folder), len(prn_files)))
+        for i, f in enumerate(prn_files, start=1):
             try:
                 df = self.load_prn(f)
                 # Filtro por mes/año y rango de hora dentro del mes
@@ -639,15 +1170,21 @@ class CSVProcessor:
                     details.append({"filename": f.name, "rows": 0, "success": True,
                                     "kwh_values": 0, "kvar_values": 0})
                     continue
-                # Intentar detectar columnas de energía
-                kwh_col = next((c for c in df.columns if "kwh" in c), None)
-                kvar_col = next((c for c in df.columns if "kvar" in c), None)
+                # Columnas de energía según el lector PRN
+                roles = (self.readers.get(PRNReader.name) or PRNReader()).roles(list(df.columns))
+                kwh_col = next(iter(roles["kwh"]), None)
+                kvar_col = next(iter(roles["kvarh"]), None)
                 if kwh_col and "kwh" not in df.columns:
                     df["kwh"] = pd.to_numeric(df[kwh_col], errors="coerce")
                 if kvar_col and "kvarh" not in df.columns:
                     df["kvarh"] = pd.to_numeric(df[kvar_col], errors="coerce")
 
                 df["company"] = f.stem  # etiqueta simple
+                if event_cb is not None and {"kwh", "kvarh"} <= set(df.columns):
+                    emit(event_cb, self._file_event(period, i, len(prn_files), df, {
+                        "filename": f.name, "format": PRNReader.name,
+                        "kwh_values": int(df["kwh"].notna().sum()), "kvar_values": int(df["kvarh"].notna().sum())}))
+                df = self._energy_storage(df)
                 self.combined_df = df if self.combined_df is None else pd.concat([self.combined_df, df], ignore_index=True)
                 details.append({
                     "filename": f.name,
@@ -662,12 +1199,17 @@ class CSVProcessor:
             except Exception as e:
                 details.append({"filename": f.name, "rows": 0, "success": False, "error": str(e),
                                 "kwh_values": 0, "kvar_values": 0})
+                emit(event_cb, FileFailed(period, f.name, i, len(prn_files), str(e)))
                 if progress_cb:
                     progress_cb(f"Error PRN: {f.name} - {e}")
 
         if self.combined_df is not None:
-            self.combined_df.sort_values(["company", "timestamp"], inplace=True)
-            self.combined_df.reset_index(drop=True, inplace=True)
+            self.combined_df = self.combined_df.sort_values(["company", "timestamp"]).reset_index(drop=True)
+        rows = len(self.combined_df) if self.combined_df is not None else 0
+        self._log_run_summary(f"Análisis PRN {mes_usuario}/{año_usuario}", details, rows, time.perf_counter() - t0)
+        emit(event_cb, AnalysisFinished(period, total_ok, len(prn_files) - total_ok, rows, time.perf_counter() - t0,
+                                        sorted(self.combined_df["company"].astype(str).unique())
+                                        if self.combined_df is not None else []))
 
         return True, "PRN analizado", {
             "folder": str(folder),
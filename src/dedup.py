@@ -0,0 +1,155 @@
+"""
+Pre-paso de deduplicación de archivos de medidor (antes de parsear).
+- Huella: tamaño + BLAKE2b de una muestra (inicio, medio y final); si dos huellas
+  coinciden, se confirma con el hash del contenido completo (en streaming)
+- Copias exactas (p. ej. 'medidor (1).csv' descargado dos veces) se omiten: queda el nombre más corto
+- Archivos del mismo medidor (número de serie del preámbulo, ver MeterReader.serial) van a una
+  sola empresa; las exportaciones superpuestas (mensual + semanal) se funden con máximo por
+  intervalo, la misma regla de la rejilla, así la energía no se cuenta dos veces
+- Sin serie reconocible cada archivo sigue siendo su propia empresa (nombre del archivo)
+"""
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .header_detection import HEADER_PREFIX_BYTES
+
+
+LOG = logging.getLogger("dedup")
+
+DEDUP_SAMPLE_BYTES = 64 * 1024
+_HASH_CHUNK = 1024 * 1024
+
+
+def _digest():
+    return hashlib.blake2b(digest_size=16)
+
+
+def sample_digest(src, size: Optional[int], sample_bytes: int = DEDUP_SAMPLE_BYTES) -> str:
+    """Hash de inicio, medio y final (archivo completo si es chico; solo el inicio en comprimidos)."""
+    h = _digest()
+    if src.path is None or size is None or size <= 3 * sample_bytes:
+        h.update(src.read_prefix(3 * sample_bytes))
+        return h.hexdigest()
+    with open(src.path, "rb") as f:
+        for offset in (0, (size - sample_bytes) // 2, size - sample_bytes):
+            f.seek(offset)
+            h.update(f.read(sample_bytes))
+    return h.hexdigest()
+
+
+def full_digest(src) -> str:
+    """Hash del contenido completo, leído por bloques."""
+    h = _digest()
+    with src.open() as f:
+        for block in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _canonical(sources: list):
+    # 'medidor.csv' antes que 'medidor (1).csv' o 'copia de medidor.csv'
+    return min(sources, key=lambda s: (len(s.stem), s.label))
+
+
+class FilePlan:
+    """Qué archivos parsear, con qué empresa, y cuáles se omiten por ser copias."""
+
+    def __init__(self, files: list, companies: dict, duplicates: list):
+        self.files = files
+        self._companies = companies
+        # [(copia omitida, original que se procesa)]
+        self.duplicates = duplicates
+
+    def company_of(self, src) -> str:
+        return self._companies.get(src.label, src.stem)
+
+    @property
+    def merged(self) -> dict:
+        """{empresa: [archivos]} de las empresas armadas con más de un archivo."""
+        groups = defaultdict(list)
+        for src in self.files:
+            groups[self.company_of(src)].append(src.name)
+        return {c: sorted(names) for c, names in groups.items() if len(names) > 1}
+
+    def rebind(self, sources: list) -> "FilePlan":
+        """El mismo plan sobre otra lista de orígenes con las mismas etiquetas (p. ej. otra pasada)."""
+        by_label = {src.label: src for src in sources}
+        return FilePlan([by_label[s.label] for s in self.files], self._companies,
+                        [(by_label[d.label], by_label[o.label]) for d, o in self.duplicates])
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+
+def plan_files(sources: list, readers, sample_bytes: int = DEDUP_SAMPLE_BYTES) -> FilePlan:
+    """
+    Huellas + series de 'sources' (orígenes de src.sources) en una pasada barata.
+    'readers' es el ReaderRegistry del procesador. El orden de los archivos se conserva.
+    """
+    sizes = {src.label: src.size for src in sources}
+    # 1) Copias exactas: tamaño + muestra; el hash completo solo para los candidatos
+    by_sample = defaultdict(list)
+    for src in sources:
+        try:
+            by_sample[(sizes[src.label], sample_digest(src, sizes[src.label], sample_bytes))].append(src)
+        except OSError as e:
+            LOG.debug("Sin huella para %s: %s", src.label, e)
+            by_sample[("sin huella", src.label)].append(src)
+    skip = {}
+    for (size, _), group in by_sample.items():
+        if len(group) < 2:
+            continue
+        sampled_all = size is not None and size <= 3 * sample_bytes and all(s.path is not None for s in group)
+        by_full = defaultdict(list)
+        for src in group:
+            by_full["muestra" if sampled_all else full_digest(src)].append(src)
+        for same in by_full.values():
+            keep = _canonical(same)
+            skip.update((s.label, keep) for s in same if s is not keep)
+    duplicates = [(src, skip[src.label]) for src in sources if src.label in skip]
+    files = [src for src in sources if src.label not in skip]
+
+    # 2) Mismo medidor: serie del preámbulo (por formato, para no mezclar series de otro fabricante)
+    by_meter = defaultdict(list)
+    for src in files:
+        try:
+            prefix = src.read_prefix(HEADER_PREFIX_BYTES)
+        except OSError:
+            continue
+        reader = readers.detect(prefix, src.name)
+        serial = reader.serial(prefix.decode("latin1"))
+        if serial:
+            by_meter[(reader.name, serial)].append(src)
+    companies = {}
+    for group in by_meter.values():
+        company = _canonical(group).stem
+        companies.update((s.label, company) for s in group)
+    return FilePlan(files, companies, duplicates)
+
+
+def _energy(df: pd.DataFrame, column: str) -> np.ndarray:
+    return df[column].to_numpy(dtype="float64", na_value=np.nan)
+
+
+def merge_max(current: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """
+    Funde dos rejillas de la misma empresa y ventana (mismos timestamps, kWh en float):
+    máximo por intervalo, un NaN no pisa un valor válido.
+    """
+    if len(current) != len(new):
+        raise ValueError("Las rejillas a fundir no tienen el mismo largo")
+    return current.assign(**{c: np.fmax(_energy(current, c), _energy(new, c)) for c in ("kwh", "kvarh")})
+
+
+def grid_totals(df: Optional[pd.DataFrame]) -> tuple:
+    """(kWh, kvarh, lecturas kWh, lecturas kvarh) de una rejilla en float."""
+    if df is None:
+        return 0.0, 0.0, 0, 0
+    kwh, kvarh = _energy(df, "kwh"), _energy(df, "kvarh")
+    return (float(np.nansum(kwh)), float(np.nansum(kvarh)),
+            int(np.count_nonzero(~np.isnan(kwh))), int(np.count_nonzero(~np.isnan(kvarh))))
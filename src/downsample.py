@@ -0,0 +1,90 @@
+"""
+Reducción de series para graficar la curva de carga.
+- minmax: mínimo y máximo de cada cubeta (un píxel ≈ una cubeta); conserva picos y huecos (NaN)
+- lttb: Largest-Triangle-Three-Buckets; conserva la forma con menos puntos (ignora los NaN)
+- Se aplica sobre el corte empresa/rango que devuelve el índice: al hacer zoom se vuelve
+  a pedir el rango visible y se reduce al ancho del gráfico
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .energy_units import to_display
+
+
+DOWNSAMPLE_METHODS = ("minmax", "lttb")
+DEFAULT_METHOD = "minmax"
+
+
+def minmax_indices(y: np.ndarray, buckets: int) -> np.ndarray:
+    """Índices (ordenados) del mínimo y el máximo de cada cubeta de tamaño fijo."""
+    n = len(y)
+    buckets = max(1, int(buckets))
+    if n <= 2 * buckets:
+        return np.arange(n)
+    size = -(-n // buckets)
+    pad = size * buckets - n
+    # Cubetas sin datos apuntan a un NaN: el hueco se conserva en el gráfico
+    low = np.pad(np.where(np.isnan(y), np.inf, y), (0, pad), constant_values=np.inf).reshape(buckets, size)
+    high = np.pad(np.where(np.isnan(y), -np.inf, y), (0, pad), constant_values=-np.inf).reshape(buckets, size)
+    base = np.arange(buckets) * size
+    pairs = np.sort(np.stack([base + low.argmin(axis=1), base + high.argmax(axis=1)], axis=1), axis=1)
+    return np.unique(np.minimum(pairs.ravel(), n - 1))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Índices elegidos por LTTB (primer y último punto incluidos) entre los valores finitos."""
+    valid = np.flatnonzero(~np.isnan(y))
+    n = len(valid)
+    if n_out >= n or n_out < 3:
+        return valid
+    xs = (x[valid] - x[valid[0]]).astype("float64")
+    ys = y[valid].astype("float64")
+    every = (n - 2) / (n_out - 2)
+    chosen = np.empty(n_out, dtype=np.int64)
+    chosen[0], chosen[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        nlo, nhi = hi, min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = xs[nlo:nhi].mean(), ys[nlo:nhi].mean()
+        # Área del triángulo (punto elegido anterior, candidato, promedio de la cubeta siguiente)
+        area = np.abs((xs[a] - avg_x) * (ys[lo:hi] - ys[a]) - (xs[a] - xs[lo:hi]) * (avg_y - ys[a]))
+        a = lo + int(area.argmax())
+        chosen[i + 1] = a
+    return valid[chosen]
+
+
+def downsample_indices(x: np.ndarray, y: np.ndarray, n_out: int, method: str = DEFAULT_METHOD) -> np.ndarray:
+    """Índices de los puntos a dibujar; n_out ≈ ancho en píxeles."""
+    if method == "lttb":
+        return lttb_indices(x, y, n_out)
+    if method == "minmax":
+        return minmax_indices(y, n_out // 2 or 1)
+    raise ValueError(f"Método desconocido: {method} (opciones: {', '.join(DOWNSAMPLE_METHODS)})")
+
+
+def curve_points(df: pd.DataFrame, column: str, n_out: int, method: str = DEFAULT_METHOD):
+    """
+    (timestamps datetime64[ns], valores kWh) reducidos de una columna de energía.
+    df son filas company/timestamp/... de una empresa, ordenadas por tiempo (p. ej. get_slice).
+    """
+    if df is None or df.empty or column not in df.columns or "timestamp" not in df.columns:
+        return np.array([], dtype="datetime64[ns]"), np.array([], dtype="float64")
+    ts = df["timestamp"].to_numpy("datetime64[ns]")
+    values = to_display(df[column]).to_numpy(dtype="float64", na_value=np.nan)
+    keep = ~np.isnat(ts)
+    if not keep.all():
+        ts, values = ts[keep], values[keep]
+    idx = downsample_indices(ts.view("int64"), values, n_out, method)
+    return ts[idx], values[idx]
+
+
+def finite_runs(x: np.ndarray, y: np.ndarray, min_len: Optional[int] = 1):
+    """Tramos (x, y) sin NaN: cada uno se dibuja como una línea; los NaN quedan como huecos."""
+    ok = ~np.isnan(y)
+    if not ok.any():
+        return []
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], ok, [False])).astype(np.int8)))
+    return [(x[lo:hi], y[lo:hi]) for lo, hi in zip(edges[::2], edges[1::2]) if hi - lo >= min_len]
@@ -0,0 +1,78 @@
+"""
+Energía en punto fijo: enteros en milésimas de kWh/kvarh (Wh/varh).
+- Un dtype entero (Int64/Int32 con NA) en kwh/kvarh marca la columna como punto fijo
+- Sumas y multiplos con aritmética entera: totales exactos, sin deriva de float
+- La conversión a kWh (float) se hace solo al exportar/mostrar
+"""
+import numpy as np
+import pandas as pd
+
+
+# Unidades enteras por kWh (1000 → milésimas de kWh = Wh)
+ENERGY_SCALE = 1000
+ENERGY_COLUMNS = ("kwh", "kvarh")
+# Int32 alcanza para lecturas de 15 min (hasta ~2.1 GWh por intervalo) y ocupa menos
+FIXED_DTYPES = ("Int64", "Int32")
+
+
+def is_fixed(series: pd.Series) -> bool:
+    """True si la columna de energía está en punto fijo (dtype entero)."""
+    return pd.api.types.is_integer_dtype(series.dtype)
+
+
+def to_fixed(values, scale: int = ENERGY_SCALE, dtype: str = "Int64") -> pd.Series:
+    """kWh (float, NaN = sin dato) → enteros escalados (NA = sin dato), redondeando a la unidad."""
+    if dtype not in FIXED_DTYPES:
+        raise ValueError(f"dtype de punto fijo no soportado: {dtype}")
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    if is_fixed(s):
+        return s.astype(dtype)
+    arr = pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    units = np.round(arr * scale)
+    if dtype == "Int32" and np.nanmax(np.abs(units), initial=0) >= 2**31:
+        raise OverflowError("Lecturas fuera de rango para Int32; use Int64")
+    out = pd.array(units, dtype="Float64").astype(dtype)
+    return pd.Series(out, index=s.index, name=s.name)
+
+
+def to_display(series: pd.Series, scale: int = ENERGY_SCALE) -> pd.Series:
+    """Columna de energía en kWh float (NaN = sin dato); las columnas float pasan igual."""
+    if not is_fixed(series):
+        return series
+    values = series.to_numpy(dtype="float64", na_value=np.nan) / scale
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def frame_to_fixed(df: pd.DataFrame, scale: int = ENERGY_SCALE, dtype: str = "Int64") -> pd.DataFrame:
+    cols = {c: to_fixed(df[c], scale, dtype) for c in ENERGY_COLUMNS if c in df.columns}
+    return df.assign(**cols) if cols else df
+
+
+def frame_to_display(df: pd.DataFrame, scale: int = ENERGY_SCALE) -> pd.DataFrame:
+    """kwh/kvarh en kWh float; sin copia si ninguna columna está en punto fijo."""
+    cols = {c: to_display(df[c], scale) for c in df.columns if c in ENERGY_COLUMNS and is_fixed(df[c])}
+    return df.assign(**cols) if cols else df
+
+
+def multiply_units(units: np.ndarray, multiplier) -> np.ndarray:
+    """
+    Enteros escalados (sin NA) x multiplo → enteros escalados.
+    Exacto si el multiplo es entero; si no, se redondea a la unidad fija.
+    """
+    mult = np.asarray(multiplier, dtype="float64")
+    if np.all(mult == np.round(mult)):
+        return np.asarray(units, dtype="int64") * mult.astype("int64")
+    return np.round(np.asarray(units, dtype="int64") * mult).astype("int64")
+
+
+def multiply(series: pd.Series, multiplier) -> pd.Series:
+    """
+    Energía x multiplo ('multiplier' escalar o Series alineada). En punto fijo el
+    resultado sigue siendo Int64 (ver multiply_units); en float, producto normal.
+    """
+    if not is_fixed(series):
+        return pd.to_numeric(series, errors="coerce") * multiplier
+    mult = multiplier.to_numpy(dtype="float64") if isinstance(multiplier, pd.Series) else multiplier
+    mask = series.isna().to_numpy()
+    units = multiply_units(series.to_numpy(dtype="int64", na_value=0), mult)
+    return pd.Series(pd.arrays.IntegerArray(units, mask), index=series.index, name=series.name)
@@ -0,0 +1,97 @@
+"""
+Eventos tipados del análisis (resultados parciales mientras corre).
+- analyze_folder(event_cb=...) emite un evento por archivo terminado, además de inicio y fin
+- Los totales son kWh/kvarh crudos del archivo en la ventana (sin multiplo)
+- El callback corre en el hilo del análisis: la UI debe pasar al hilo de Tk (root.after)
+- Un callback que falla no interrumpe el análisis
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+
+LOG = logging.getLogger("events")
+
+
+@dataclass(frozen=True)
+class AnalysisEvent:
+    """Base: 'period' identifica la corrida (p. ej. '10/2025')."""
+
+    period: str
+
+
+@dataclass(frozen=True)
+class AnalysisStarted(AnalysisEvent):
+    folder: str
+    total_files: int
+
+
+@dataclass(frozen=True)
+class FileCompleted(AnalysisEvent):
+    """Un archivo listo: empresa, totales y lecturas válidas en la rejilla."""
+
+    filename: str
+    company: str
+    index: int
+    total_files: int
+    kwh: float
+    kvarh: float
+    kwh_values: int
+    kvar_values: int
+    rows: int
+    format: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class FileFailed(AnalysisEvent):
+    filename: str
+    index: int
+    total_files: int
+    error: str
+
+
+@dataclass(frozen=True)
+class AnalysisFinished(AnalysisEvent):
+    processed_files: int
+    error_files: int
+    rows: int
+    elapsed: float
+    companies: list = field(default_factory=list)
+
+
+def emit(event_cb: Optional[Callable[[AnalysisEvent], None]], event: AnalysisEvent):
+    """Entrega el evento al callback (si hay); los errores del callback solo se registran."""
+    if event_cb is None:
+        return
+    try:
+        event_cb(event)
+    except Exception:
+        LOG.exception("Error en el callback de eventos (%s)", type(event).__name__)
+
+
+class CompanyTotals:
+    """Acumulador de eventos por empresa (sirve para la UI o para pruebas)."""
+
+    def __init__(self):
+        self.totals = {}
+        self.failed = []
+        # Archivos distintos por empresa: un análisis de varios meses emite un evento por archivo y mes
+        self._files = {}
+
+    def __call__(self, event: AnalysisEvent):
+        if isinstance(event, FileCompleted):
+            t = self.totals.setdefault(event.company, {"kwh": 0.0, "kvarh": 0.0, "kwh_values": 0,
+                                                       "kvar_values": 0, "files": 0})
+            t["kwh"] += event.kwh
+            t["kvarh"] += event.kvarh
+            t["kwh_values"] += event.kwh_values
+            t["kvar_values"] += event.kvar_values
+            names = self._files.setdefault(event.company, set())
+            names.add(event.filename)
+            t["files"] = len(names)
+        elif isinstance(event, FileFailed):
+            self.failed.append(event.filename)
+
+    @property
+    def companies(self) -> list:
+        return sorted(self.totals)
@@ -0,0 +1,298 @@
+"""
+Libros Excel de exportación (fuera de la UI para poder correrlos en segundo plano).
+- Reporte mensual de una empresa (Fecha/Hora/Kwh/Kvarh)
+- Libro multi-hoja: hoja 'total' + una hoja por empresa
+- Progreso por hoja / bloque de filas, cancelación con threading.Event
+- Escritura atómica: temporal + renombrado (el destino nunca queda a medias)
+"""
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .combined_index import CombinedIndex
+from .energy_units import ENERGY_COLUMNS, to_display
+from .utils import atomic_write, check_cancel, format_timestamp_series
+
+
+# Cada cuántas filas se reporta progreso y se revisa la cancelación
+ROW_BLOCK = 5_000
+
+
+def _report(progress_cb: Optional[Callable[[str], None]], msg: str):
+    if progress_cb:
+        try:
+            progress_cb(msg)
+        except Exception:
+            pass
+
+
+def _unique_title(base: str, used_titles: set) -> str:
+    """Nombre de hoja único (Excel limita a 31 caracteres)."""
+    t = str(base)[:31]
+    if t not in used_titles:
+        used_titles.add(t); return t
+    i = 2
+    while True:
+        cand = (str(base)[:31-len(str(i))-1] + f" {i}") if len(str(base)) >= 31 else f"{str(base)} {i}"
+        cand = cand[:31]
+        if cand not in used_titles:
+            used_titles.add(cand); return cand
+        i += 1
+
+
+def _fill_report_sheet(ws, report_df: pd.DataFrame, totals: dict, meta: dict,
+                       progress_cb=None, cancel=None):
+    """Hoja de reporte mensual: multiplo + totales arriba y la tabla Fecha/Hora/Kwh/Kvarh."""
+    from openpyxl.styles import Alignment, Font, PatternFill, Border, Side
+
+    # Encabezado
+    ws["A1"] = "Multiplo →"
+    ws["B1"] = int(meta.get("multiplo", 0))
+    ws["C1"] = "Kwh"
+    ws["D1"] = "Kvarh"
+    ws["C2"] = totals["kwh"]
+    ws["D2"] = totals["kvarh"]
+    ws["C2"].number_format = "#,##0.000"
+    ws["D2"].number_format = "#,##0.000"
+    ws["A1"].font = Font(bold=True, size=12)
+    ws["C2"].font = Font(bold=True, size=14)
+    ws["D2"].font = Font(bold=True, size=14)
+
+    # Cabecera de tabla
+    headers = ["Fecha", "Hora", "Kwh", "Kvarh"]
+    ws.append([])  # fila 3 vacía
+    ws.append(headers)  # fila 4
+    hdr_fill = PatternFill("solid", fgColor="D9EAF7")
+    for col, h in enumerate(headers, start=1):
+        cell = ws.cell(row=4, column=col)
+        cell.fill = hdr_fill
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal="center")
+
+    # Datos
+    thin = Side(style="thin", color="999999")
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    start_row = 5
+    n = len(report_df)
+    for idx, r in report_df.iterrows():
+        if idx % ROW_BLOCK == 0:
+            check_cancel(cancel)
+            _report(progress_cb, f"Reporte {meta.get('company', '')}: fila {idx + 1}/{n}")
+        row = start_row + idx
+        ws.cell(row=row, column=1, value=r["Fecha"])
+        ws.cell(row=row, column=2, value=int(r["Hora"]))
+        c3 = ws.cell(row=row, column=3, value=float(r["Kwh"]))
+        c4 = ws.cell(row=row, column=4, value=float(r["Kvarh"]))
+        c3.number_format = "#,##0.000"
+        c4.number_format = "#,##0.000"
+        for col in range(1, 5):
+            ws.cell(row=row, column=col).border = border
+        # Colorear columnas Kwh/Kvarh
+        ws.cell(row=row, column=3).fill = PatternFill("solid", fgColor="E9F5FE")
+        ws.cell(row=row, column=4).fill = PatternFill("solid", fgColor="E9F5FE")
+
+    # Anchos
+    ws.column_dimensions["A"].width = 14
+    ws.column_dimensions["B"].width = 8
+    ws.column_dimensions["C"].width = 14
+    ws.column_dimensions["D"].width = 14
+
+
+def write_report_excel(path, report_df: pd.DataFrame, totals: dict, meta: dict,
+                       progress_cb=None, cancel=None):
+    """Reporte mensual de una empresa con totales y multiplo en el encabezado."""
+    from openpyxl import Workbook
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Reporte"
+    _fill_report_sheet(ws, report_df, totals, meta, progress_cb, cancel)
+
+    check_cancel(cancel)
+    _report(progress_cb, "Reporte: guardando libro…")
+    with atomic_write(path) as tmp:
+        wb.save(tmp)
+
+
+def write_reports_workbook(path, reports: list, progress_cb=None, cancel=None):
+    """Varios reportes [(reporte, totales, meta)] en un libro, una hoja por empresa."""
+    from openpyxl import Workbook
+    wb = Workbook()
+    wb.remove(wb.active)
+    used_titles = set()
+    for i, (report_df, totals, meta) in enumerate(reports, start=1):
+        check_cancel(cancel)
+        _report(progress_cb, f"Reportes: hoja {i}/{len(reports)} ({meta.get('company', '')})")
+        ws = wb.create_sheet(title=_unique_title(meta.get("company") or "Reporte", used_titles))
+        _fill_report_sheet(ws, report_df, totals, meta, cancel=cancel)
+    if not reports:
+        wb.create_sheet(title="Reporte")
+
+    check_cancel(cancel)
+    _report(progress_cb, "Reportes: guardando libro…")
+    with atomic_write(path) as tmp:
+        wb.save(tmp)
+
+
+def _cell_arrays(cdf: pd.DataFrame) -> dict:
+    """Valores por columna para las celdas: kWh en unidades de display y timestamp como texto."""
+    arrays = {}
+    for name in cdf.columns:
+        col = cdf[name]
+        if name in ENERGY_COLUMNS:
+            col = to_display(col)
+        if name == "timestamp" and pd.api.types.is_datetime64_any_dtype(col) and col.notna().any():
+            text = format_timestamp_series(col, "%d/%m/%Y %H:%M:%S")
+            arrays[name] = np.where(text == "", None, text)
+        else:
+            arrays[name] = col.to_numpy()
+    return arrays
+
+
+def write_company_workbook(path, index: CombinedIndex, totals_by_company: pd.DataFrame,
+                           mult_by_company: pd.Series, default_multiplier: float,
+                           progress_cb=None, cancel=None):
+    """
+    Libro con hoja 'total' (hipervínculos + fórmulas) y una hoja por empresa.
+    totals_by_company: kwh/kvarh ya multiplicados por empresa; mult_by_company: multiplo vigente.
+    """
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Font, PatternFill, Border, Side
+
+    # Crear libro, estilos y hoja TOTAL (primera)
+    wb = Workbook()
+    hdr_fill = PatternFill("solid", fgColor="D9EAF7")
+    light_fill = PatternFill("solid", fgColor="E9F5FE")
+    thin = Side(style="thin", color="999999")
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+
+    ws_total = wb.active
+    ws_total.title = "total"
+
+    # Cabecera TOTAL
+    total_headers = ["No.", "Cliente", "Multiplo", "KWh", "KVARh", "KW"]
+    ws_total.append(total_headers)
+    for c in range(1, len(total_headers) + 1):
+        cell = ws_total.cell(row=1, column=c)
+        cell.fill = hdr_fill
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal="center")
+
+    # Preparar compañías y mapa nombre->hoja
+    companies = sorted(index.companies)
+
+    # Nombres de hoja únicos (cap Excel 31 chars)
+    used_titles = set([ws_total.title])
+
+    sheet_by_company = {}
+
+    # Crear hojas por empresa y recolectar totales + rango para KW
+    total_rows = []
+    for idx, company in enumerate(companies, start=1):
+        check_cancel(cancel)
+        _report(progress_cb, f"Excel: hoja {idx}/{len(companies)} ({company})")
+        # Multiplo vigente al final del rango (registro persistente o default)
+        m = float(mult_by_company.get(company, default_multiplier))
+        # Corte contiguo del índice (vista); las celdas se leen de arrays por columna, sin copiar el corte
+        cdf = index.slice(company)
+        arrays = _cell_arrays(cdf)
+
+        # Totales multiplicados para TOTAL
+        kwh_total = float(totals_by_company["kwh"].get(company, 0.0)) if "kwh" in totals_by_company.columns else 0.0
+        kvar_total = float(totals_by_company["kvarh"].get(company, 0.0)) if "kvarh" in totals_by_company.columns else 0.0
+
+        # Hoja empresa
+        sheet_name = _unique_title(company, used_titles)
+        ws = wb.create_sheet(title=sheet_name)
+        sheet_by_company[company] = sheet_name
+
+        # Encabezado Totales/Multiplo
+        ws["A1"] = "Multiplo →"; ws["A1"].font = Font(bold=True, size=12)
+        ws["B1"] = int(m)
+        # Colocar directamente los totales numéricos en D1 y E1 como solicitaste
+        ws["C1"] = "Kwh"; ws["C1"].font = Font(bold=True, size=12)
+        ws["D1"] = kwh_total; ws["D1"].number_format = "#,##0.000"; ws["D1"].font = Font(bold=True, size=14)
+        ws["E1"] = kvar_total; ws["E1"].number_format = "#,##0.000"; ws["E1"].font = Font(bold=True, size=14)
+
+        # Cabeceras de tabla
+        ws.append([])  # fila 3
+        cols = []
+        for name in ["timestamp", "Hora", "company", "kwh", "kvarh"]:
+            if name in cdf.columns and name not in cols:
+                cols.append(name)
+        for name in cdf.columns:
+            if name not in cols:
+                cols.append(name)
+        ws.append(cols)  # fila 4
+        for col_idx, h in enumerate(cols, start=1):
+            cell = ws.cell(row=4, column=col_idx)
+            cell.fill = hdr_fill
+            cell.font = Font(bold=True)
+            cell.alignment = Alignment(horizontal="center")
+
+        # Datos
+        start_row = 5
+        columns = [(arrays[c], c.lower() in ENERGY_COLUMNS) for c in cols]
+        for r in range(len(cdf)):
+            ridx = start_row + r
+            if r % ROW_BLOCK == 0 and r:
+                check_cancel(cancel)
+                _report(progress_cb, f"Excel: hoja {idx}/{len(companies)} ({company}), fila {r}/{len(cdf)}")
+            for cidx, (values, is_energy) in enumerate(columns, start=1):
+                val = values[r]
+                cell = ws.cell(row=ridx, column=cidx, value=val if pd.notna(val) else None)
+                cell.border = border
+                if is_energy:
+                    cell.number_format = "#,##0.000"
+                    cell.fill = light_fill
+
+        # Anchos
+        ws.column_dimensions["A"].width = max(14, min(28, len(str(cols[0])) + 6)) if cols else 14
+        ws.column_dimensions["B"].width = 10
+        ws.column_dimensions["C"].width = 16
+        ws.column_dimensions["D"].width = 16
+
+        # Guardar info para TOTAL (hipervínculo y fórmula KW)
+        last_row = start_row + max(len(cdf), 1) - 1
+        esc = sheet_name.replace("'", "''")
+        if len(cdf) <= 0:
+            kw_formula = 0
+        else:
+            # Kwh está en columna D por el orden definido
+            kw_formula = f"=MAX('{esc}'!$D${start_row}:$D${last_row})"
+        total_rows.append((idx, company, m, kwh_total, kvar_total, kw_formula, esc, start_row, last_row))
+
+    # Volcar TOTAL con hipervínculos
+    for r_idx, (no, company, m, kwh_t, kvar_t, kw_formula, esc, srow, lrow) in enumerate(total_rows, start=2):
+        ws_total.cell(row=r_idx, column=1, value=no)
+        c_name = ws_total.cell(row=r_idx, column=2, value=company)
+        sheet_name = sheet_by_company[company]
+        esc = sheet_name.replace("'", "''")
+        # Hipervínculo con nombre de hoja entre comillas simples
+        c_name.hyperlink = f"#'{esc}'!A1"
+        c_name.font = Font(color="0563C1", underline="single")
+        ws_total.cell(row=r_idx, column=3, value=int(m))
+        # KWh/KVARh en TOTAL con respaldo: si D1/E1 no son números, sumar columna de datos
+        c4 = ws_total.cell(row=r_idx, column=4)
+        c4.value = f"=IF(ISNUMBER('{esc}'!$D$1), '{esc}'!$D$1, SUM('{esc}'!$D${srow}:'{esc}'!$D${lrow}))"; c4.number_format = "#,##0.000"
+        c5 = ws_total.cell(row=r_idx, column=5)
+        c5.value = f"=IF(ISNUMBER('{esc}'!$E$1), MAX('{esc}'!$E$1), SUM('{esc}'!$E${srow}:'{esc}'!$E${lrow}))"; c5.number_format = "#,##0.000"
+        c6 = ws_total.cell(row=r_idx, column=6)
+        if isinstance(kw_formula, str):
+            c6.value = kw_formula
+        else:
+            c6.value = 0
+        c6.number_format = "#,##0.000"
+
+    # Anchos TOTAL
+    ws_total.column_dimensions["A"].width = 6
+    ws_total.column_dimensions["B"].width = 34
+    ws_total.column_dimensions["C"].width = 10
+    ws_total.column_dimensions["D"].width = 16
+    ws_total.column_dimensions["E"].width = 16
+    ws_total.column_dimensions["F"].width = 12
+
+    check_cancel(cancel)
+    _report(progress_cb, "Excel: guardando libro…")
+    with atomic_write(path) as tmp:
+        wb.save(tmp)
@@ -0,0 +1,125 @@
+"""
+Detección del encabezado KV2C sobre un prefijo acotado del archivo.
+- Lee solo los primeros KB (no el archivo completo)
+- Una sola pasada a minúsculas y un único patrón compilado para puntuar líneas
+- Cachea fila de encabezado + columnas por huella del preámbulo (modelo/firmware)
+  y la reutiliza en archivos posteriores del mismo medidor
+"""
+import hashlib
+import re
+from pathlib import Path
+from typing import Optional
+
+
+HEADER_PREFIX_BYTES = 16 * 1024
+MAX_HEADER_LINES = 200
+
+_HEADER_TOKENS = re.compile(r"read date time|channel 1|channel 2|status flags|scale factor")
+_TOKEN_SCORES = {"read date time": 3, "channel 1": 2, "channel 2": 2, "status flags": 1, "scale factor": -4}
+# Etiquetas del preámbulo cuyo VALOR identifica el formato (el resto solo aporta la etiqueta)
+_SIGNATURE_LABELS = re.compile(r"model|firmware|version|versión|modelo|tipo|type")
+
+
+def read_prefix(path: Path, size: int = HEADER_PREFIX_BYTES) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(size)
+
+
+def split_prefix(prefix: bytes, encoding: str, size: int = HEADER_PREFIX_BYTES) -> list:
+    """Decodifica el prefijo y lo separa en líneas como las cuenta pandas (\\n, \\r\\n, \\r)."""
+    text = prefix.decode(encoding, errors="ignore")
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    if len(prefix) >= size and len(lines) > 1:
+        lines = lines[:-1]  # última línea posiblemente cortada
+    return lines[:MAX_HEADER_LINES]
+
+
+def find_header_index(lines: list, lowered: Optional[list] = None) -> int:
+    """
+    Encuentra la fila de encabezados real de KV2C.
+    Preferir: 'Read Date Time','Channel 1','Channel 2','Status Flags'
+    Penalizar: '(Scale Factor)'
+    """
+    if lowered is None:
+        lowered = "\n".join(str(l) for l in lines[:MAX_HEADER_LINES]).lower().split("\n")
+    best_idx, best_score = 0, -10_000
+    tokens_by_line = {}
+    for i, line in enumerate(lowered[:MAX_HEADER_LINES]):
+        # Debe lucir como encabezado con comas suficientes
+        if line.count(",") < 4:
+            continue
+        found = set(_HEADER_TOKENS.findall(line))
+        tokens_by_line[i] = found
+        score = sum(_TOKEN_SCORES[t] for t in found)
+        # Fuerte preferencia a la fila que tenga ambos canales sin factor
+        if "channel 1" in found and "channel 2" in found and "scale factor" not in found:
+            score += 6
+        if score > best_score:
+            best_idx, best_score = i, score
+
+    # Si el mejor contiene 'scale factor', intenta buscar hacia arriba una versión sin él
+    if "scale factor" in tokens_by_line.get(best_idx, ()):
+        for j in range(max(0, best_idx - 5), best_idx):
+            found = tokens_by_line.get(j, ())
+            if {"read date time", "channel 1", "channel 2"} <= set(found) and "scale factor" not in found:
+                return j
+    return best_idx
+
+
+def preamble_fingerprint(lowered: list, header_index: int) -> str:
+    """
+    Huella del preámbulo hasta el encabezado (incluido).
+    Serie, cuenta y fechas no cuentan; modelo/firmware y el encabezado sí.
+    """
+    parts = []
+    for line in lowered[:header_index]:
+        cells = [c.strip() for c in line.split(",")]
+        label = cells[0] if cells else ""
+        if _SIGNATURE_LABELS.search(label):
+            parts.append(",".join(cells[:2]))
+        else:
+            parts.append(label)
+    parts.append(lowered[header_index].strip() if header_index < len(lowered) else "")
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class HeaderDetector:
+    """Detecta el encabezado y reutiliza el resultado por huella de preámbulo."""
+
+    def __init__(self):
+        # fila de encabezado -> {huella: layout}
+        self._cache: dict = {}
+        self.hits = 0
+        self.misses = 0
+
+    def detect(self, prefix: bytes, encoding: str, size: int = HEADER_PREFIX_BYTES) -> dict:
+        """
+        Devuelve el layout {'header_index', 'columns', 'fingerprint', 'cached'}.
+        'columns' son los nombres del encabezado tal cual (sin espacios alrededor).
+        """
+        lines = split_prefix(prefix, encoding, size)
+        lowered = "\n".join(lines).lower().split("\n")
+
+        for idx, known in self._cache.items():
+            if idx < len(lowered):
+                layout = known.get(preamble_fingerprint(lowered, idx))
+                if layout is not None:
+                    self.hits += 1
+                    return dict(layout, cached=True)
+
+        self.misses += 1
+        idx = find_header_index(lines, lowered)
+        layout = {
+            "header_index": idx,
+            "columns": [c.strip() for c in lines[idx].split(",")] if idx < len(lines) else [],
+            "fingerprint": preamble_fingerprint(lowered, idx),
+        }
+        self._cache.setdefault(idx, {})[layout["fingerprint"]] = layout
+        return dict(layout, cached=False)
+
+    def detect_file(self, path: Path, encoding: str) -> dict:
+        return self.detect(read_prefix(path), encoding)
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = self.misses = 0
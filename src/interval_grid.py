@@ -0,0 +1,70 @@
+"""
+Rejilla fija de intervalos (15 min) sobre arreglos preasignados.
+- El slot de cada lectura es aritmética entera sobre el timestamp
+- Reducción por máximo directa (np.fmax.at): sin concat/groupby/merge/reindex por archivo
+- Lecturas fuera de la rejilla (minutos no alineados) se descartan y se cuentan
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+INTERVAL = pd.Timedelta(minutes=15)
+
+
+class IntervalGrid:
+    """kWh/kvarh por slot de una rejilla regular que empieza en 'start'."""
+
+    def __init__(self, start, n_slots: int, step: pd.Timedelta = INTERVAL):
+        self.start = pd.Timestamp(start)
+        self.step = pd.Timedelta(step)
+        self.n_slots = int(n_slots)
+        self._start_ns = self.start.value
+        self._step_ns = self.step.value
+        self.kwh = np.full(self.n_slots, np.nan)
+        self.kvarh = np.full(self.n_slots, np.nan)
+        # Lecturas dentro de la ventana pero con minuto fuera de la rejilla
+        self.off_grid = 0
+
+    @classmethod
+    def from_range(cls, full_range: pd.DatetimeIndex) -> "IntervalGrid":
+        step = pd.Timedelta(full_range.freq) if full_range.freq is not None else INTERVAL
+        return cls(full_range[0], len(full_range), step)
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        return pd.date_range(self.start, periods=self.n_slots, freq=self.step)
+
+    def slots(self, ts) -> np.ndarray:
+        """
+        Slot de cada timestamp; -1 si es NaT, está fuera de la ventana o no cae
+        exactamente en la rejilla.
+        """
+        ns = np.asarray(ts, dtype="datetime64[ns]").view("int64")
+        offset = ns - self._start_ns
+        slot = offset // self._step_ns
+        inside = (ns != np.iinfo("int64").min) & (slot >= 0) & (slot < self.n_slots)
+        aligned = (offset % self._step_ns) == 0
+        self.off_grid += int(np.count_nonzero(inside & ~aligned))
+        return np.where(inside & aligned, slot, -1)
+
+    def fold(self, slots: np.ndarray, kwh: Optional[np.ndarray] = None,
+             kvarh: Optional[np.ndarray] = None):
+        """Reduce por máximo los valores en sus slots (NaN no pisa valores válidos)."""
+        valid = slots >= 0
+        if not valid.any():
+            return
+        idx = slots[valid]
+        if kwh is not None:
+            np.fmax.at(self.kwh, idx, np.asarray(kwh, dtype="float64")[valid])
+        if kvarh is not None:
+            np.fmax.at(self.kvarh, idx, np.asarray(kvarh, dtype="float64")[valid])
+
+    def to_frame(self, company: str) -> pd.DataFrame:
+        return pd.DataFrame({
+            "company": company,
+            "timestamp": self.index,
+            "kwh": self.kwh,
+            "kvarh": self.kvarh,
+        })
@@ -0,0 +1,124 @@
+"""
+Historial local de intervalos consolidados (SQLite embebido, sin servidor).
+- analyze_folder agrega los intervalos de 15 min indexados por (empresa, timestamp)
+- Las consultas leen solo el tramo empresa/rango pedido
+- La memoria no crece con la cantidad de historia guardada
+"""
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .energy_units import frame_to_display
+
+
+INTERVAL_STORE_FILENAME = "historial.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS intervals (
+    company TEXT NOT NULL,
+    ts      INTEGER NOT NULL,  -- segundos desde 1970 (hora local sin zona)
+    kwh     REAL,
+    kvarh   REAL,
+    PRIMARY KEY (company, ts)
+) WITHOUT ROWID
+"""
+
+# Un valor nulo nuevo no borra un valor ya guardado
+_UPSERT = """
+INSERT INTO intervals (company, ts, kwh, kvarh) VALUES (?, ?, ?, ?)
+ON CONFLICT (company, ts) DO UPDATE SET
+    kwh = COALESCE(excluded.kwh, intervals.kwh),
+    kvarh = COALESCE(excluded.kvarh, intervals.kvarh)
+"""
+
+
+def _to_epoch(value) -> int:
+    return int(pd.Timestamp(value).value // 10**9)
+
+
+class IntervalStore:
+    """Intervalos por (empresa, timestamp) en un archivo SQLite del workspace."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(_SCHEMA)
+            con.commit()
+
+    @classmethod
+    def for_workspace(cls, workspace: Path) -> "IntervalStore":
+        return cls(Path(workspace) / INTERVAL_STORE_FILENAME)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Conexión por operación: el análisis corre en un hilo distinto al de la UI
+        con = sqlite3.connect(str(self.path))
+        con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    def append(self, df: pd.DataFrame) -> int:
+        """Agrega/actualiza intervalos 'company,timestamp,kwh,kvarh'. Devuelve filas escritas."""
+        if df is None or df.empty:
+            return 0
+        ts = pd.to_datetime(df["timestamp"])
+        # El historial guarda kWh (REAL) aunque la sesión use punto fijo
+        df = frame_to_display(df)
+        kwh = pd.to_numeric(df["kwh"], errors="coerce") if "kwh" in df.columns else pd.Series(np.nan, index=df.index)
+        kvarh = pd.to_numeric(df["kvarh"], errors="coerce") if "kvarh" in df.columns else pd.Series(np.nan, index=df.index)
+        keep = ts.notna() & (kwh.notna() | kvarh.notna())
+        if not keep.any():
+            return 0
+
+        companies = df["company"].astype(str)[keep].to_numpy()
+        epochs = (ts[keep].to_numpy().astype("datetime64[s]").astype("int64")).tolist()
+        kwh_vals = kwh[keep].astype(object).where(kwh[keep].notna(), None).tolist()
+        kvar_vals = kvarh[keep].astype(object).where(kvarh[keep].notna(), None).tolist()
+        rows = zip(companies.tolist(), epochs, kwh_vals, kvar_vals)
+        with closing(self._connect()) as con:
+            with con:
+                con.executemany(_UPSERT, rows)
+        return int(keep.sum())
+
+    def query(self, company: Optional[str] = None, start=None, end=None) -> pd.DataFrame:
+        """Intervalos de una empresa (o todas) entre start y end (inclusive)."""
+        clauses, params = [], []
+        if company is not None:
+            clauses.append("company = ?")
+            params.append(str(company))
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(_to_epoch(start))
+        if end is not None:
+            clauses.append("ts <= ?")
+            params.append(_to_epoch(end))
+        sql = "SELECT company, ts, kwh, kvarh FROM intervals"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY company, ts"
+        with closing(self._connect()) as con:
+            df = pd.read_sql_query(sql, con, params=params)
+        df["ts"] = pd.to_datetime(df["ts"], unit="s")
+        df = df.rename(columns={"ts": "timestamp"})
+        return df.astype({"kwh": "float64", "kvarh": "float64"})
+
+    def companies(self) -> list:
+        with closing(self._connect()) as con:
+            return [r[0] for r in con.execute("SELECT DISTINCT company FROM intervals ORDER BY company")]
+
+    def time_range(self, company: Optional[str] = None):
+        """(primer, último) timestamp guardado, o (None, None) si no hay datos."""
+        sql = "SELECT MIN(ts), MAX(ts) FROM intervals"
+        params = []
+        if company is not None:
+            sql += " WHERE company = ?"
+            params.append(str(company))
+        with closing(self._connect()) as con:
+            lo, hi = con.execute(sql, params).fetchone()
+        if lo is None:
+            return None, None
+        return pd.to_datetime(lo, unit="s"), pd.to_datetime(hi, unit="s")
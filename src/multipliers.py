@@ -0,0 +1,225 @@
+"""
+Registro persistente de multiplos (CT/PT) por empresa.
+- Se guarda como JSON en el workspace (sobrevive reinicios)
+- Cada empresa tiene versiones por fecha de vigencia
+- Importación masiva desde CSV
+- apply(): multiplo por fila de combined_df con un solo join vectorizado
+"""
+import json
+import os
+from bisect import bisect_right
+from datetime import date, datetime
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+MULTIPLIERS_FILENAME = "multiplicadores.json"
+DEFAULT_MULTIPLIER = 80.0
+# Vigencia de las entradas sin fecha ("siempre")
+_ALWAYS = date(1900, 1, 1)
+
+_COMPANY_COLS = ("empresa", "company", "cliente", "medidor")
+_VALUE_COLS = ("multiplo", "múltiplo", "multiplier", "factor")
+_DATE_COLS = ("vigencia", "fecha", "effective", "desde")
+
+
+def _to_date(value) -> date:
+    if value is None or value == "":
+        return _ALWAYS
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        pass
+    ts = pd.to_datetime(text, errors="coerce", dayfirst=True)
+    if pd.isna(ts):
+        raise ValueError(f"Fecha de vigencia inválida: {value}")
+    return ts.date()
+
+
+class MultiplierStore:
+    """Multiplos por empresa con versiones por fecha de vigencia."""
+
+    def __init__(self, path: Optional[Path] = None, default: float = DEFAULT_MULTIPLIER):
+        self.path = Path(path) if path is not None else None
+        self.default = float(default)
+        # empresa -> [(vigencia, valor)] ordenado por vigencia
+        self._versions: dict = {}
+        # empresa -> valor vigente hoy (lookup O(1)); se recalcula al cambiar el día
+        self._current: dict = {}
+        self._current_day: Optional[date] = None
+        if self.path is not None and self.path.exists():
+            self.load()
+
+    @classmethod
+    def for_workspace(cls, workspace: Path, default: float = DEFAULT_MULTIPLIER) -> "MultiplierStore":
+        return cls(Path(workspace) / MULTIPLIERS_FILENAME, default=default)
+
+    # ---------------- Persistencia ----------------
+    def load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.default = float(data.get("default", self.default))
+        self._versions = {
+            str(company): sorted((_to_date(eff), float(val)) for eff, val in versions)
+            for company, versions in (data.get("companies") or {}).items()
+        }
+        self._refresh_current()
+
+    def save(self):
+        if self.path is None:
+            return
+        data = {
+            "version": 1,
+            "default": self.default,
+            "companies": {
+                company: [[None if eff == _ALWAYS else eff.isoformat(), val] for eff, val in versions]
+                for company, versions in sorted(self._versions.items())
+            },
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def _refresh_current(self):
+        today = date.today()
+        self._current = {}
+        self._current_day = today
+        for company, versions in self._versions.items():
+            value = self._lookup(versions, today)
+            if value is not None:
+                self._current[company] = value
+
+    def _current_values(self) -> dict:
+        # Una sesión abierta después de medianoche toma las vigencias del nuevo día
+        if self._current_day != date.today():
+            self._refresh_current()
+        return self._current
+
+    @staticmethod
+    def _lookup(versions, on: date) -> Optional[float]:
+        i = bisect_right(versions, (on, float("inf")))
+        return versions[i - 1][1] if i else None
+
+    # ---------------- Consulta / edición ----------------
+    def __contains__(self, company) -> bool:
+        return str(company) in self._versions
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def companies(self) -> list:
+        return sorted(self._versions)
+
+    def get(self, company, on=None, default: Optional[float] = None) -> float:
+        """Multiplo vigente de la empresa (hoy, o en la fecha 'on')."""
+        fallback = self.default if default is None else float(default)
+        company = str(company)
+        if on is None:
+            return self._current_values().get(company, fallback)
+        versions = self._versions.get(company)
+        value = self._lookup(versions, _to_date(on)) if versions else None
+        return fallback if value is None else value
+
+    def set(self, company, value: float, effective=None, autosave: bool = True):
+        """Registra un multiplo vigente desde 'effective' (None = siempre)."""
+        company = str(company)
+        eff = _to_date(effective)
+        versions = [v for v in self._versions.get(company, []) if v[0] != eff]
+        versions.append((eff, float(value)))
+        versions.sort()
+        self._versions[company] = versions
+        current = self._lookup(versions, date.today())
+        if current is not None:
+            self._current_values()[company] = current
+        if autosave:
+            self.save()
+
+    def as_dict(self, on=None) -> dict:
+        """{empresa: multiplo vigente} (hoy, o en la fecha 'on')."""
+        if on is None:
+            return dict(self._current_values())
+        return {c: self.get(c, on=on) for c in self._versions}
+
+    # ---------------- Importación masiva ----------------
+    def import_csv(self, path) -> Tuple[int, list]:
+        """
+        Importa multiplos desde CSV. Columnas reconocidas (sin importar mayúsculas):
+        empresa/company/cliente, multiplo/multiplier/factor (o CT y PT → CT*PT),
+        vigencia/fecha/effective (opcional, dd/mm/aaaa o ISO).
+        Devuelve (filas_importadas, errores).
+        """
+        df = pd.read_csv(path, sep=None, engine="python", dtype=str, encoding="utf-8-sig")
+        cols = {str(c).strip().lower(): c for c in df.columns}
+        company_col = next((cols[c] for c in _COMPANY_COLS if c in cols), None)
+        value_col = next((cols[c] for c in _VALUE_COLS if c in cols), None)
+        date_col = next((cols[c] for c in _DATE_COLS if c in cols), None)
+        if company_col is None:
+            raise ValueError("El CSV no tiene columna de empresa")
+
+        def num(col):
+            return pd.to_numeric(df[col].str.strip().str.replace(",", ".", regex=False), errors="coerce")
+
+        if value_col is not None:
+            values = num(value_col)
+        elif "ct" in cols and "pt" in cols:
+            values = num(cols["ct"]) * num(cols["pt"])
+        else:
+            raise ValueError("El CSV no tiene columna de multiplo (ni CT/PT)")
+
+        imported, errors = 0, []
+        for i, company in enumerate(df[company_col]):
+            line = i + 2  # encabezado = línea 1
+            if pd.isna(company) or not str(company).strip():
+                continue
+            if pd.isna(values.iloc[i]):
+                errors.append(f"Línea {line}: multiplo inválido")
+                continue
+            try:
+                eff = df[date_col].iloc[i] if date_col is not None else None
+                self.set(str(company).strip(), float(values.iloc[i]),
+                         effective=None if pd.isna(eff) else eff, autosave=False)
+                imported += 1
+            except ValueError as e:
+                errors.append(f"Línea {line}: {e}")
+        self.save()
+        return imported, errors
+
+    # ---------------- Aplicación vectorizada ----------------
+    def apply(self, df: pd.DataFrame, company_col: str = "company",
+              ts_col: str = "timestamp") -> pd.Series:
+        """
+        Multiplo por fila de df (alineado a df.index) según empresa y vigencia.
+        Un único merge_asof por empresa/fecha; empresas sin registro usan el default.
+        """
+        companies = df[company_col].astype(str)
+        if not self._versions or all(
+                len(v) == 1 and v[0][0] == _ALWAYS for v in self._versions.values()):
+            mapping = {c: v[0][1] for c, v in self._versions.items()}
+            return companies.map(mapping).fillna(self.default).astype("float64")
+
+        table = pd.DataFrame(
+            [(c, pd.Timestamp(eff), val) for c, versions in self._versions.items() for eff, val in versions],
+            columns=["__company__", "__effective__", "__mult__"],
+        ).astype({"__effective__": "datetime64[ns]"}).sort_values("__effective__")
+        ts = pd.to_datetime(df[ts_col]) if ts_col in df.columns else pd.Series(pd.NaT, index=df.index)
+        # Las dos claves del merge en ns (la columna puede venir en us/ms, p. ej. desde Parquet)
+        left = pd.DataFrame({
+            "__company__": companies.to_numpy(),
+            "__ts__": ts.fillna(pd.Timestamp.now()).to_numpy().astype("datetime64[ns]"),
+            "__pos__": np.arange(len(df)),
+        }).sort_values("__ts__", kind="stable")
+        merged = pd.merge_asof(left, table, left_on="__ts__", right_on="__effective__",
+                               by="__company__", direction="backward")
+        values = np.empty(len(df), dtype="float64")
+        values[merged["__pos__"].to_numpy()] = merged["__mult__"].fillna(self.default).to_numpy()
+        return pd.Series(values, index=df.index, name="multiplo")
@@ -0,0 +1,75 @@
+"""
+Lectura anticipada de archivos (read-ahead) mientras se parsea el actual.
+- Un pool chico de hilos trae los bytes de los próximos K archivos
+- Profundidad y memoria en vuelo acotadas (no se adelanta más de max_bytes)
+- Pensado para carpetas en red (SMB): la red y la CPU trabajan a la vez
+"""
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from .sources import as_source
+
+
+LOG = logging.getLogger("prefetch")
+
+PREFETCH_DEPTH = 4
+PREFETCH_WORKERS = 2
+PREFETCH_MAX_BYTES = 128 * 1024 * 1024
+
+
+class PrefetchReader:
+    """
+    Itera (origen, bytes | None) en el mismo orden de 'paths' (rutas u orígenes de
+    src.sources). None significa "leer como siempre": archivo más grande que
+    max_file_bytes, tamaño desconocido (p. ej. .gz) o error de lectura
+    (el error real aparece al abrirlo).
+    """
+
+    def __init__(self, paths: Iterable, depth: int = PREFETCH_DEPTH,
+                 max_bytes: int = PREFETCH_MAX_BYTES, workers: int = PREFETCH_WORKERS,
+                 max_file_bytes: Optional[int] = None):
+        self.paths = [as_source(p) for p in paths]
+        self.depth = max(1, int(depth))
+        self.max_bytes = int(max_bytes)
+        self.workers = max(1, int(workers))
+        self.max_file_bytes = self.max_bytes if max_file_bytes is None else min(max_file_bytes, self.max_bytes)
+        # Máximo de bytes en vuelo observado (diagnóstico)
+        self.peak_bytes = 0
+
+    def __iter__(self):
+        pending = deque()  # (ruta, future | None, tamaño)
+        in_flight = 0
+        todo = iter(self.paths)
+        nxt = next(todo, None)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch") as pool:
+            try:
+                while pending or nxt is not None:
+                    # Llenar la ventana de lectura anticipada sin pasar profundidad ni memoria
+                    while nxt is not None and len(pending) < self.depth:
+                        size = nxt.size
+                        if size is None or size > self.max_file_bytes:
+                            pending.append((nxt, None, 0))
+                        elif pending and in_flight + size > self.max_bytes:
+                            break
+                        else:
+                            pending.append((nxt, pool.submit(nxt.read_bytes), size))
+                            in_flight += size
+                            self.peak_bytes = max(self.peak_bytes, in_flight)
+                        nxt = next(todo, None)
+
+                    path, future, size = pending.popleft()
+                    data = None
+                    if future is not None:
+                        try:
+                            data = future.result()
+                        except Exception as e:
+                            LOG.debug("Lectura anticipada falló para %s: %s", path.label, e)
+                    in_flight -= size
+                    yield path, data
+                    data = None
+            finally:
+                for _, future, _ in pending:
+                    if future is not None:
+                        future.cancel()
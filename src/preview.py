@@ -0,0 +1,260 @@
+"""
+Vista previa rápida de una carpeta antes de un análisis largo.
+- Lee solo el inicio y el final de cada archivo (bytes acotados), o de una muestra de archivos
+- Informa fila de encabezado, roles de columnas, formato de fecha, cobertura del rango y una
+  estimación del tiempo del análisis completo (calibrada con un archivo mediano)
+- No arma rejillas ni toca combined_df: es solo diagnóstico
+"""
+import io
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .header_detection import HEADER_PREFIX_BYTES
+from .sources import as_source, discover_sources
+from .utils import DATE_FORMATS, normalize_am_pm
+
+
+PREVIEW_MAX_FILES = 25
+PREVIEW_HEAD_BYTES = 64 * 1024
+PREVIEW_TAIL_BYTES = 16 * 1024
+# Calibración: solo se procesa completo un archivo de hasta este tamaño
+PREVIEW_CALIBRATION_MAX_BYTES = 8 * 1024 * 1024
+# Sin calibración: rendimiento típico medido del análisis por bloques (bytes/s)
+PREVIEW_DEFAULT_BYTES_PER_SEC = 30 * 1024 * 1024
+_ENCODINGS = ("utf-8-sig", "cp1252", "latin1")
+
+
+def sample_files(files: list, max_files: int) -> list:
+    """Muestra repartida a lo largo de la lista (primero y último incluidos)."""
+    if max_files <= 0 or len(files) <= max_files:
+        return list(files)
+    picks = np.unique(np.linspace(0, len(files) - 1, max_files).round().astype(int))
+    return [files[i] for i in picks]
+
+
+def read_head_tail(src, head_bytes: Optional[int] = None, tail_bytes: Optional[int] = None):
+    """
+    (inicio, final, tamaño) del archivo. El final es None si el archivo entra entero en
+    el inicio o si el origen no permite saltar (miembros de comprimidos).
+    """
+    head_bytes = head_bytes or PREVIEW_HEAD_BYTES
+    tail_bytes = tail_bytes or PREVIEW_TAIL_BYTES
+    size = src.size
+    if src.path is None:
+        return src.read_prefix(head_bytes), None, size
+    with open(src.path, "rb") as f:
+        head = f.read(head_bytes)
+        if size is None or size <= head_bytes:
+            return head, None, size
+        f.seek(max(size - tail_bytes, head_bytes))
+        return head, f.read(), size
+
+
+def _complete_lines(data: bytes, drop_first: bool) -> bytes:
+    # El corte de bytes deja líneas partidas en los bordes
+    if drop_first:
+        data = data[data.find(b"\n") + 1:] if b"\n" in data else b""
+    end = data.rfind(b"\n")
+    return data[:end + 1] if end >= 0 else data
+
+
+def guess_timestamp_format(values: pd.Series, preferred: Optional[str] = None) -> Optional[str]:
+    """
+    Formato (de DATE_FORMATS o el del lector) que parsea la muestra; entre los que
+    parsean ≥90% gana el que deja las fechas en orden (resuelve día/mes ambiguos).
+    """
+    sample = values.dropna().astype(str).head(200).map(normalize_am_pm)
+    if sample.empty:
+        return None
+    best, best_score = None, None
+    for fmt in ([preferred] if preferred else []) + [f for f in DATE_FORMATS if f != preferred]:
+        parsed = pd.to_datetime(sample, format=fmt, errors="coerce")
+        rate = parsed.notna().mean()
+        if rate < 0.9:
+            continue
+        steps = np.diff(parsed.dropna().to_numpy("datetime64[ns]").view("int64"))
+        score = (rate, float(np.mean(steps >= 0)) if len(steps) else 1.0)
+        if best_score is None or score > best_score:
+            best, best_score = fmt, score
+    return best
+
+
+def _window_coverage(first, last, start, end) -> float:
+    if first is None or last is None:
+        return 0.0
+    lo, hi = max(first, start), min(last, end)
+    span = (end - start).total_seconds()
+    return max(0.0, (hi - lo).total_seconds()) / span if span > 0 else float(lo <= hi)
+
+
+def _months(start: datetime, end: datetime) -> int:
+    return (end.year - start.year) * 12 + end.month - start.month + 1
+
+
+def preview_file(processor, src, start: datetime, end: datetime) -> dict:
+    """Diagnóstico de un archivo a partir de su inicio y final."""
+    head, tail, size = read_head_tail(src)
+    reader = processor.readers.detect(head[:HEADER_PREFIX_BYTES], src.name)
+    out = {"filename": src.name, "format": reader.name, "bytes": size}
+    last_err = None
+    for enc in _ENCODINGS:
+        try:
+            hdr = processor._detect_layout(head[:HEADER_PREFIX_BYTES], enc, reader)["header_index"]
+            body = _complete_lines(head, drop_first=False) if len(head) >= PREVIEW_HEAD_BYTES else head
+            raw = pd.read_csv(io.BytesIO(body), skiprows=hdr, encoding=enc, on_bad_lines="skip")
+            raw_columns = list(raw.columns)
+            df = processor._tidy_frame(raw)
+            break
+        except Exception as e:
+            last_err = e
+    else:
+        out["error"] = f"no se pudo leer el inicio: {last_err}"
+        return out
+
+    columns = list(df.columns)
+    roles, roles_from = reader.roles(columns), "formato"
+    if roles is None:
+        roles, roles_from = processor.column_roles.get(columns), "caché"
+    if roles is None:
+        roles_from = "detectado"
+        date_col = processor.detect_date_column(df)
+        roles = {"timestamp": date_col}
+        if date_col:
+            valid = processor._parse_timestamps(df[date_col], reader).notna()
+            roles.update(processor._detect_energy_roles(df[valid]))
+    date_col = roles.get("timestamp")
+    out.update(encoding=enc, header_index=hdr, columns=len(columns), sampled_rows=len(df),
+               roles={k: roles.get(k) for k in ("timestamp", "kwh", "kvarh")}, roles_from=roles_from)
+    if not date_col or date_col not in df.columns:
+        out["error"] = "sin columna de fecha"
+        return out
+
+    out["timestamp_format"] = guess_timestamp_format(df[date_col], reader.timestamp_format)
+    ts = processor._parse_timestamps(df[date_col], reader)
+    if tail is not None:
+        try:
+            tail_df = pd.read_csv(io.BytesIO(_complete_lines(tail, drop_first=True)), header=None,
+                                  encoding=enc, on_bad_lines="skip")
+            if tail_df.shape[1] == len(raw_columns):
+                tail_df.columns = raw_columns
+                tail_df = processor._tidy_frame(tail_df)
+                ts = pd.concat([ts, processor._parse_timestamps(tail_df[date_col], reader)], ignore_index=True)
+        except Exception:
+            pass  # final ilegible: la cobertura queda con el inicio
+    ts = ts.dropna()
+    first = ts.min() if len(ts) else None
+    last = ts.max() if len(ts) else None
+    out.update(first=first, last=last, coverage=_window_coverage(first, last, pd.Timestamp(start), pd.Timestamp(end)))
+    return out
+
+
+def _calibrate(processor, sampled: list, previews: list, start: datetime, end: datetime) -> Optional[float]:
+    """Bytes/s procesando completo el archivo de tamaño mediano (si es chico)."""
+    candidates = [(p["bytes"], src) for src, p in zip(sampled, previews)
+                  if p.get("bytes") and "error" not in p and p["bytes"] <= PREVIEW_CALIBRATION_MAX_BYTES]
+    if not candidates:
+        return None
+    candidates.sort(key=lambda c: c[0])
+    size, src = candidates[len(candidates) // 2]
+    month_end = min(pd.Timestamp(end), pd.Timestamp(start) + pd.offsets.MonthEnd(0) + pd.Timedelta(hours=23, minutes=45))
+    full_range = pd.date_range(pd.Timestamp(start).floor("15min"), month_end, freq="15min")
+    t0 = time.perf_counter()
+    try:
+        processor._process_csv_file(src, full_range)
+    except Exception:
+        return None
+    elapsed = time.perf_counter() - t0
+    return size / elapsed if elapsed > 0 else None
+
+
+def preview_folder(processor, folder, start: datetime, end: datetime, max_files: int = PREVIEW_MAX_FILES,
+                   progress_cb=None):
+    """
+    Vista previa de la carpeta (o comprimido) para el rango [start, end].
+    Devuelve (ok, msg, resultados) como analyze_folder.
+    """
+    t0 = time.perf_counter()
+    files = discover_sources(folder, (".csv",))
+    if not files:
+        return False, "No se encontraron archivos CSV en la carpeta", None
+    sampled = sample_files(files, max_files)
+    previews = []
+    for i, src in enumerate(sampled, start=1):
+        if progress_cb:
+            progress_cb(f"Vista previa [{i}/{len(sampled)}] {src.label}")
+        try:
+            previews.append(preview_file(processor, as_source(src), start, end))
+        except Exception as e:
+            previews.append({"filename": src.name, "error": str(e)})
+
+    known = [f.size for f in files if f.size is not None]
+    # Tamaño de los que no lo informan: promedio de los conocidos
+    total_bytes = int(sum(known) + (len(files) - len(known)) * (np.mean(known) if known else 0))
+    rate = _calibrate(processor, sampled, previews, start, end)
+    months = _months(start, end)
+    estimated = total_bytes / (rate or PREVIEW_DEFAULT_BYTES_PER_SEC) * months
+
+    ok_previews = [p for p in previews if "error" not in p]
+    firsts = [p["first"] for p in ok_previews if p.get("first") is not None]
+    lasts = [p["last"] for p in ok_previews if p.get("last") is not None]
+    results = {
+        "folder": str(folder),
+        "total_files": len(files),
+        "sampled_files": len(sampled),
+        "total_bytes": total_bytes,
+        "window": {"start": pd.Timestamp(start), "end": pd.Timestamp(end)},
+        "formats": dict(Counter(p["format"] for p in previews if p.get("format"))),
+        "timestamp_formats": dict(Counter(p.get("timestamp_format") for p in ok_previews)),
+        "coverage": {
+            "first": min(firsts) if firsts else None,
+            "last": max(lasts) if lasts else None,
+            "files_in_window": sum(1 for p in ok_previews if p.get("coverage", 0) > 0),
+            "files_outside": sum(1 for p in ok_previews if p.get("coverage", 0) == 0),
+            "files_with_errors": len(previews) - len(ok_previews),
+        },
+        "calibrated": rate is not None,
+        "estimated_seconds": float(estimated),
+        "elapsed_seconds": time.perf_counter() - t0,
+        "files": previews,
+    }
+    msg = (f"Vista previa: {len(sampled)} de {len(files)} archivos, "
+           f"{results['coverage']['files_in_window']} con datos en el rango; "
+           f"análisis completo estimado en {estimated:.0f} s")
+    return True, msg, results
+
+
+def preview_lines(results: dict, max_files: int = 10) -> list:
+    """Resumen legible para el panel de información de la UI."""
+    fmt = "%d/%m/%Y %H:%M"
+    cov = results["coverage"]
+
+    def when(ts):
+        return ts.strftime(fmt) if ts is not None else "-"
+
+    ts_formats = ", ".join(f"{k or 'no reconocido'}={v}" for k, v in results["timestamp_formats"].items())
+    lines = [
+        f"Archivos: {results['total_files']} ({results['total_bytes'] / 2**20:.1f} MB), muestra de {results['sampled_files']}",
+        f"Formatos: {', '.join(f'{k}={v}' for k, v in sorted(results['formats'].items())) or '-'}",
+        f"Formato de fecha: {ts_formats or '-'}",
+        f"Cobertura: {when(cov['first'])} → {when(cov['last'])}; en el rango: {cov['files_in_window']}, "
+        f"fuera: {cov['files_outside']}, con error: {cov['files_with_errors']}",
+        f"Tiempo estimado del análisis: {results['estimated_seconds']:.0f} s"
+        f"{'' if results['calibrated'] else ' (sin calibrar)'}; vista previa en {results['elapsed_seconds']:.1f} s",
+    ]
+    for p in results["files"][:max_files]:
+        if "error" in p:
+            lines.append(f"  - {p['filename']}: ERROR {p['error']}")
+            continue
+        roles = p["roles"]
+        lines.append(f"  - {p['filename']}: {p['format']}, encabezado en línea {p['header_index']}, "
+                     f"fecha '{roles['timestamp']}' ({p.get('timestamp_format') or '?'}), "
+                     f"kWh {roles.get('kwh')}, kvarh {roles.get('kvarh')} [{p['roles_from']}], "
+                     f"{when(p.get('first'))} → {when(p.get('last'))} ({p.get('coverage', 0):.0%} del rango)")
+    if len(results["files"]) > max_files:
+        lines.append(f"  … {len(results['files']) - max_files} archivos más")
+    return lines
@@ -0,0 +1,95 @@
+"""
+Captura de perfiles de análisis y exportaciones (cProfile, determinista).
+- Perfila el hilo que corre el trabajo completo (un análisis de varios meses, una exportación)
+- Deja en <workspace>/logs un .prof (pstats / snakeviz) y un .txt con las funciones más costosas
+- Los hilos auxiliares (lectura anticipada) no se miden: su costo aparece como espera
+- Se activa desde el menú Herramientas de la UI o con run_app.py --profile
+"""
+import cProfile
+import io
+import logging
+import pstats
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+
+LOG = logging.getLogger("profiling")
+
+PROFILE_TOP = 30
+PROFILE_SORTS = ("cumulative", "tottime")
+
+
+def profile_paths(logs_dir: Optional[Path], label: str) -> tuple:
+    """(ruta .prof, ruta .txt) únicas para una etiqueta; sin workspace se usa ./logs."""
+    folder = Path(logs_dir) if logs_dir is not None else Path("logs")
+    folder.mkdir(parents=True, exist_ok=True)
+    slug = re.sub(r"[^\w.-]+", "_", label.strip()).strip("_") or "run"
+    stem = base = f"profile-{slug}-{datetime.now():%Y%m%d-%H%M%S}"
+    n = 1
+    while (folder / f"{stem}.prof").exists():
+        n += 1
+        stem = f"{base}-{n}"
+    return folder / f"{stem}.prof", folder / f"{stem}.txt"
+
+
+def summarize(stats: pstats.Stats, top: int = PROFILE_TOP) -> str:
+    """Tablas de pstats por tiempo acumulado y por tiempo propio (las 'top' primeras)."""
+    out = io.StringIO()
+    stats.stream = out
+    for key in PROFILE_SORTS:
+        out.write(f"\n=== Top {top} por {key} ===\n")
+        stats.sort_stats(key).print_stats(top)
+    return out.getvalue()
+
+
+class ProfileCapture:
+    """
+    with ProfileCapture(logs_dir, "analisis-csv"): ...
+    Al salir (también con error o cancelación) escribe el .prof y el resumen .txt.
+    """
+
+    def __init__(self, logs_dir: Optional[Path], label: str, top: int = PROFILE_TOP):
+        self.label = label
+        self.top = top
+        self.profile_path, self.summary_path = profile_paths(logs_dir, label)
+        self.elapsed = 0.0
+        self._profiler = cProfile.Profile()
+        self._t0 = 0.0
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        try:
+            self._profiler.enable()
+        except ValueError as e:
+            # Solo un perfilador activo por proceso: el trabajo corre igual, sin perfil
+            LOG.warning("No se pudo perfilar '%s': %s", self.label, e)
+            self._profiler = None
+        return self
+
+    @property
+    def active(self) -> bool:
+        return self._profiler is not None
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._profiler is None:
+            return False
+        self._profiler.disable()
+        self.elapsed = time.perf_counter() - self._t0
+        try:
+            self._profiler.dump_stats(str(self.profile_path))
+            stats = pstats.Stats(self._profiler).strip_dirs()
+            header = [
+                f"Perfil: {self.label}",
+                f"Fecha: {datetime.now().isoformat(timespec='seconds')}",
+                f"Duración: {self.elapsed:.3f} s",
+                f"Resultado: {'error: ' + exc_type.__name__ if exc_type else 'ok'}",
+                f"Archivo de perfil: {self.profile_path.name}",
+            ]
+            self.summary_path.write_text("\n".join(header) + "\n" + summarize(stats, self.top), encoding="utf-8")
+            LOG.info("Perfil '%s' (%.2f s) guardado en %s", self.label, self.elapsed, self.summary_path)
+        except Exception as e:
+            LOG.warning("No se pudo guardar el perfil '%s': %s", self.label, e)
+        return False
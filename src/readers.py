@@ -0,0 +1,151 @@
+"""
+Registro de formatos de medidor (lectores enchufables).
+- Cada formato declara una firma barata (prefijo del archivo + nombre) y sus roles
+  de columnas conocidos, más una ruta rápida para sus fechas
+- KV2C y PRN son los dos primeros; la detección genérica (candidatos numéricos,
+  búsqueda por pares) queda solo como último recurso
+- El número de serie del preámbulo (si el formato lo trae) agrupa archivos del mismo medidor
+- Formatos nuevos: subclase de MeterReader + ReaderRegistry.register
+"""
+import re
+from typing import Optional
+
+import pandas as pd
+
+from .sources import as_source
+
+
+class MeterReader:
+    """Formato genérico: sin firma ni roles conocidos (el procesador los detecta)."""
+
+    name = "genérico"
+    # Formato exacto de fecha/hora del medidor (None = parseo genérico fila a fila)
+    timestamp_format: Optional[str] = None
+
+    def matches(self, text: str, name: str) -> bool:
+        """Firma barata sobre el prefijo (texto en minúsculas) y el nombre del archivo."""
+        return True
+
+    def header_index(self, lines: list) -> Optional[int]:
+        """Fila de encabezado entre las primeras líneas; None = detector de encabezado KV2C."""
+        return None
+
+    def roles(self, columns: list) -> Optional[dict]:
+        """Roles {'timestamp', 'kwh', 'kvarh', 'flags'} si el encabezado es el esperado; si no, None."""
+        return None
+
+    def serial(self, text: str) -> Optional[str]:
+        """Número de serie del medidor en el prefijo (texto original); None si no se reconoce."""
+        return None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}()"
+
+
+class KV2CReader(MeterReader):
+    """KV2C: preámbulo + 'Read Date Time', 'Channel 1' (kWh), 'Channel 2' (kvarh)."""
+
+    name = "kv2c"
+    timestamp_format = "%m/%d/%Y %I:%M %p"
+    _SERIAL = re.compile(r'^\s*"?meter id"?\s*,\s*"?([^",\r\n]+?)"?\s*(?:,|$)', re.IGNORECASE | re.MULTILINE)
+
+    def matches(self, text: str, name: str) -> bool:
+        return "read date time" in text and "channel 1" in text
+
+    def roles(self, columns: list) -> Optional[dict]:
+        by_name = {str(c).strip().lower(): c for c in columns}
+        ts, kwh, kvar = by_name.get("read date time"), by_name.get("channel 1"), by_name.get("channel 2")
+        if ts is None or kwh is None or kvar is None:
+            return None
+        flags = [c for c in columns if "flag" in str(c).lower()]
+        return {"timestamp": ts, "kwh": [kwh], "kvarh": [kvar], "flags": flags, "source": self.name}
+
+    def serial(self, text: str) -> Optional[str]:
+        # Preámbulo: "Meter ID,<serie>"
+        m = self._SERIAL.search(text)
+        return m.group(1).strip() if m else None
+
+
+class PRNReader(MeterReader):
+    """PRN: tabla separada por espacios/tabulaciones con fecha + hora."""
+
+    name = "prn"
+
+    def matches(self, text: str, name: str) -> bool:
+        return name.lower().endswith(".prn")
+
+    def roles(self, columns: list) -> Optional[dict]:
+        if "timestamp" not in columns:
+            return None
+        kwh = [c for c in columns if "kwh" in str(c)][:1]
+        kvar = [c for c in columns if "kvar" in str(c)][:1]
+        return {"timestamp": "timestamp", "kwh": kwh, "kvarh": kvar, "flags": [], "source": self.name}
+
+    def load(self, path) -> pd.DataFrame:
+        """
+        Lee el archivo completo, normaliza nombres y arma 'timestamp' (fecha + hora).
+        'path' es una ruta o un origen de src.sources (miembro de un comprimido).
+        """
+        src = as_source(path)
+
+        def read(**kwargs):
+            if src.path is not None:
+                return pd.read_csv(src.path, **kwargs)
+            with src.open() as fh:
+                return pd.read_csv(fh, **kwargs)
+
+        try:
+            df = read(sep=None, engine="python", header=0)
+        except Exception:
+            # Fallback a whitespace
+            df = read(sep=r"\s+", header=0)
+        df.columns = [c.strip().lower() for c in df.columns]
+        # Normalizar columnas esperadas si existen
+        for maybe in ["fecha", "date"]:
+            if maybe in df.columns and "timestamp" not in df.columns:
+                # Intento parsear fecha y hora si hay columna hora
+                if "hora" in df.columns:
+                    df["timestamp"] = pd.to_datetime(df[maybe] + " " + df["hora"], errors="coerce", dayfirst=True)
+                else:
+                    df["timestamp"] = pd.to_datetime(df[maybe], errors="coerce", dayfirst=True)
+        if "timestamp" not in df.columns:
+            # Busca combinaciones
+            for f_col in ["date", "fecha"]:
+                for h_col in ["time", "hora"]:
+                    if f_col in df.columns and h_col in df.columns:
+                        df["timestamp"] = pd.to_datetime(df[f_col] + " " + df[h_col], errors="coerce", dayfirst=True)
+        df = df.dropna(subset=["timestamp"])
+        df = df.sort_values("timestamp")
+        df.reset_index(drop=True, inplace=True)
+        return df
+
+
+class ReaderRegistry:
+    """Formatos en orden de prioridad; el primero cuya firma coincide gana."""
+
+    def __init__(self, readers: Optional[list] = None, fallback: Optional[MeterReader] = None):
+        self._readers = list(readers) if readers is not None else [KV2CReader(), PRNReader()]
+        self.fallback = fallback or MeterReader()
+
+    @property
+    def names(self) -> list:
+        return [r.name for r in self._readers]
+
+    def register(self, reader: MeterReader, first: bool = True):
+        """Agrega un formato (por defecto con prioridad sobre los existentes)."""
+        self._readers = [r for r in self._readers if r.name != reader.name]
+        self._readers.insert(0 if first else len(self._readers), reader)
+
+    def get(self, name: str) -> Optional[MeterReader]:
+        return next((r for r in self._readers if r.name == name), None)
+
+    def detect(self, prefix: bytes, name: str = "") -> MeterReader:
+        # latin1 nunca falla y las firmas son ASCII
+        text = prefix.decode("latin1").lower()
+        for reader in self._readers:
+            try:
+                if reader.matches(text, name):
+                    return reader
+            except Exception:
+                continue
+        return self.fallback
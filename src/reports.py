@@ -0,0 +1,158 @@
+"""
+Reportes horarios (Fecha/Hora/Kwh/Kvarh) de todas las empresas en una sola pasada.
+- Un único groupby (empresa, hora) sobre combined_df y una rejilla días x 24 h
+- El reporte de una empresa (UI) usa el mismo cálculo
+- Escritura: un libro multi-hoja, o un libro por empresa en paralelo (procesos; hilos en el
+  ejecutable empaquetado con PyInstaller)
+"""
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import date, datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .energy_units import ENERGY_SCALE, is_fixed, multiply_units
+from .excel_exports import write_report_excel, write_reports_workbook
+from .utils import check_cancel
+
+
+MONTH_ABBR_ES = {
+    1: "ene", 2: "feb", 3: "mar", 4: "abr", 5: "may", 6: "jun",
+    7: "jul", 8: "ago", 9: "sep", 10: "oct", 11: "nov", 12: "dic"
+}
+
+REPORT_COLUMNS = ["Fecha", "Hora", "Kwh", "Kvarh"]
+_INVALID_FILENAME = str.maketrans({c: "_" for c in '<>:"/\\|?*'})
+
+
+def format_es_date(d: date) -> str:
+    # 1-ago-25
+    return f"{d.day}-{MONTH_ABBR_ES.get(d.month, '')}-{d.strftime('%y')}"
+
+
+def hourly_reports(df: pd.DataFrame, start_dt: datetime, end_dt: datetime, multipliers: dict,
+                   companies: Optional[list] = None, default_multiplier: float = 80.0) -> dict:
+    """
+    {empresa: (reporte, totales, meta)} con la rejilla de días [start_dt, end_dt] x 24 h.
+    Los valores por hora se multiplican por el multiplo de la empresa y se redondean a 3
+    decimales; los totales son la suma de esos valores (no se vuelve a multiplicar).
+    'df' son las filas company/timestamp/kwh/kvarh ya recortadas al rango. Si kwh/kvarh
+    están en punto fijo (src.energy_units) el multiplo y los totales se calculan en enteros.
+    """
+    days = pd.date_range(datetime(start_dt.year, start_dt.month, start_dt.day),
+                         datetime(end_dt.year, end_dt.month, end_dt.day), freq="D")
+    hours = pd.DatetimeIndex((days.values[:, None] + np.arange(24) * np.timedelta64(1, "h")).ravel())
+    energy = [c for c in ("kwh", "kvarh") if c in df.columns]
+
+    if "company" in df.columns:
+        keys = df["company"].astype(str)
+    else:
+        keys = pd.Series("General", index=df.index)
+    if companies is None:
+        companies = sorted(keys.dropna().unique().tolist())
+    companies = [str(c) for c in companies]
+
+    sums = None
+    if energy and "timestamp" in df.columns and not df.empty:
+        ts = df["timestamp"]
+        if not pd.api.types.is_datetime64_any_dtype(ts):
+            ts = pd.to_datetime(ts.astype(str), errors="coerce", dayfirst=True)
+        by = [keys.rename("company"), ts.dt.floor("h").rename("hour")]
+        if all(pd.api.types.is_numeric_dtype(df[c]) for c in energy):
+            # Columnas ya numéricas (float o punto fijo): se agrupan en su lugar, sin copiar el frame
+            sums = df.groupby(by)[energy].sum()
+        else:
+            values = pd.DataFrame({c: pd.to_numeric(df[c], errors="coerce") for c in energy})
+            sums = values.groupby(by).sum()
+    grid = pd.MultiIndex.from_product([companies, hours], names=["company", "hour"])
+    n_c, n_h = len(companies), len(hours)
+    mult = np.array([float(multipliers.get(c, default_multiplier)) for c in companies])[:, None]
+
+    def scaled(col: str):
+        # (valores por hora, total por empresa)
+        if sums is None or col not in sums.columns:
+            return np.zeros((n_c, n_h)), np.zeros(n_c)
+        raw = sums[col].reindex(grid, fill_value=0)
+        if is_fixed(raw):
+            # Punto fijo: multiplo y suma en enteros; a kWh solo al final
+            units = multiply_units(raw.to_numpy(dtype="int64").reshape(n_c, n_h), mult)
+            return units / ENERGY_SCALE, units.sum(axis=1) / ENERGY_SCALE
+        values = np.round(raw.to_numpy(dtype="float64").reshape(n_c, n_h) * mult, 3)
+        return values, values.sum(axis=1)
+
+    (kwh, kwh_tot), (kvarh, kvarh_tot) = scaled("kwh"), scaled("kvarh")
+    fechas = np.repeat([format_es_date(d.date()) for d in days], 24)
+    horas = np.tile(np.arange(1, 25), len(days))
+
+    out = {}
+    for i, company in enumerate(companies):
+        report = pd.DataFrame({"Fecha": fechas, "Hora": horas, "Kwh": kwh[i], "Kvarh": kvarh[i]},
+                              columns=REPORT_COLUMNS)
+        totals = {"kwh": float(kwh_tot[i]), "kvarh": float(kvarh_tot[i])}
+        meta = {"company": company, "multiplo": float(mult[i, 0])}
+        out[company] = (report, totals, meta)
+    return out
+
+
+def report_filename(company: str, start_dt: datetime) -> str:
+    return f"reporte_{str(company).translate(_INVALID_FILENAME)}_{start_dt:%Y-%m}.xlsx"
+
+
+def _report_paths(companies, folder: Path, start_dt: datetime) -> dict:
+    """{empresa: ruta}; nombres que colisionan al sanearse ('A/B' y 'A:B') llevan sufijo -2, -3..."""
+    paths, used = {}, set()
+    for company in companies:
+        name = report_filename(company, start_dt)
+        stem, n = name[:-len(".xlsx")], 1
+        # Sin distinguir mayúsculas: en Windows 'A' y 'a' son el mismo archivo
+        while name.lower() in used:
+            n += 1
+            name = f"{stem}-{n}.xlsx"
+        used.add(name.lower())
+        paths[company] = str(folder / name)
+    return paths
+
+
+def _write_one(path: str, report: pd.DataFrame, totals: dict, meta: dict) -> str:
+    # Nivel de módulo: se ejecuta en otro proceso
+    write_report_excel(path, report, totals, meta)
+    return path
+
+
+def write_report_files(reports: dict, folder, start_dt: datetime, workers: Optional[int] = None,
+                       progress_cb=None, cancel=None) -> list:
+    """Un libro por empresa en 'folder', repartidos entre procesos. Devuelve las rutas escritas."""
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    workers = workers or min(len(reports), os.cpu_count() or 1) or 1
+    written = []
+    paths = _report_paths(reports, folder, start_dt)
+    # Congelado (PyInstaller, spawn): los procesos hijos relanzarían la app; se usan hilos.
+    # Si no, spawn explícito: la UI llama desde un hilo y fork copiaría el estado de Tk
+    if getattr(sys, "frozen", False):
+        pool = ThreadPoolExecutor(max_workers=workers)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    with pool:
+        futures = {pool.submit(_write_one, paths[c], *reports[c]): c for c in reports}
+        try:
+            for n, fut in enumerate(as_completed(futures), start=1):
+                written.append(fut.result())
+                if progress_cb:
+                    progress_cb(f"Reportes: {n}/{len(futures)} ({futures[fut]})")
+                check_cancel(cancel)
+        except BaseException:
+            for fut in futures:
+                fut.cancel()
+            raise
+    return written
+
+
+def write_report_book(reports: dict, path, progress_cb=None, cancel=None):
+    """Todas las empresas en un solo libro, una hoja por empresa."""
+    write_reports_workbook(path, [reports[c] for c in reports], progress_cb=progress_cb, cancel=cancel)
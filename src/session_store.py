@@ -0,0 +1,95 @@
+"""
+Sesiones de análisis en formato columnar (Parquet / Feather).
+- Guarda combined_df + metadatos de resultados + multiplos en UN archivo
+- Reabrir un mes ya analizado no requiere volver a escanear la carpeta
+- Requiere pyarrow (opcional); sin él se informa con un error claro
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except Exception:
+    pa = feather = pq = None
+
+
+SESSION_META_KEY = b"billread.session"
+SESSION_VERSION = 1
+# Extensión → formato en disco
+SESSION_FORMATS = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+}
+DEFAULT_COMPRESSION = "zstd"
+
+
+def session_format(path) -> str:
+    """Devuelve 'parquet' o 'feather' según la extensión (Parquet por defecto)."""
+    return SESSION_FORMATS.get(Path(path).suffix.lower(), "parquet")
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow no está instalado: no se pueden usar sesiones Parquet/Feather")
+
+
+def save_session(df: pd.DataFrame, path, results: Optional[dict] = None,
+                 multipliers: Optional[dict] = None,
+                 compression: Optional[str] = DEFAULT_COMPRESSION) -> Path:
+    """
+    Escribe df en formato columnar con los metadatos de sesión dentro del esquema.
+    df también puede ser un iterable de frames (p. ej. particiones volcadas a disco):
+    en Parquet se escriben de a uno, sin reunirlos en memoria.
+    compression: 'zstd', 'lz4' (solo Feather), 'snappy'/'gzip' (solo Parquet) o None.
+    """
+    _require_pyarrow()
+    path = Path(path)
+    meta = {
+        "version": SESSION_VERSION,
+        "saved_at": datetime.now().isoformat(timespec="seconds"),
+        "results": results or {},
+        "multipliers": multipliers or {},
+    }
+    frames = [df] if isinstance(df, pd.DataFrame) else df
+    tables = (pa.Table.from_pandas(f, preserve_index=False) for f in frames)
+    table = next(tables, None)
+    if table is None:
+        table = pa.Table.from_pandas(pd.DataFrame(), preserve_index=False)
+    schema_meta = dict(table.schema.metadata or {})
+    schema_meta[SESSION_META_KEY] = json.dumps(meta, default=str).encode("utf-8")
+    table = table.replace_schema_metadata(schema_meta)
+
+    if session_format(path) == "feather":
+        table = pa.concat_tables([table] + [t.cast(table.schema) for t in tables])
+        feather.write_feather(table, str(path), compression=compression or "uncompressed")
+    else:
+        with pq.ParquetWriter(str(path), table.schema, compression=compression or "none") as writer:
+            writer.write_table(table)
+            for t in tables:
+                writer.write_table(t.cast(table.schema))
+    return path
+
+
+def load_session(path) -> Tuple[pd.DataFrame, dict, dict]:
+    """Lee una sesión guardada. Devuelve (df, results, multipliers)."""
+    _require_pyarrow()
+    path = Path(path)
+    if session_format(path) == "feather":
+        table = feather.read_table(str(path))
+    else:
+        table = pq.read_table(str(path))
+
+    raw = (table.schema.metadata or {}).get(SESSION_META_KEY)
+    meta = json.loads(raw.decode("utf-8")) if raw else {}
+    df = table.to_pandas()
+    if "timestamp" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    return df, meta.get("results") or {}, meta.get("multipliers") or {}
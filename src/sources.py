@@ -0,0 +1,240 @@
+"""
+Orígenes de archivos de medidor: disco o dentro de archivos comprimidos.
+- Carpeta con *.csv / *.prn (como siempre) y además .zip, .gz, .tar, .tar.gz/.tgz
+- También se puede pasar directamente un archivo comprimido en vez de carpeta
+- Los miembros se leen en streaming, sin extraerlos al disco
+"""
+import gzip
+import io
+import tarfile
+import threading
+import zipfile
+from collections import OrderedDict
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Optional
+
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tgz", ".tar.gz", ".gz")
+# Miembros de .tar(.gz) ya descomprimidos que se conservan (mismo tope que src.prefetch)
+TAR_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+
+def is_archive(path: Path) -> bool:
+    name = Path(path).name.lower()
+    return any(name.endswith(s) for s in ARCHIVE_SUFFIXES)
+
+
+def _stat(path: Path) -> tuple:
+    try:
+        st = path.stat()
+    except OSError:
+        return None, None
+    return st.st_size, st.st_mtime_ns
+
+
+class FileSource:
+    """Archivo de medidor en disco (único origen con ruta real: permite índice por día)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.name = self.path.name
+
+    @property
+    def stem(self) -> str:
+        return PurePosixPath(self.name).stem
+
+    @property
+    def label(self) -> str:
+        """Nombre para mensajes (incluye el archivo comprimido si corresponde)."""
+        return self.name
+
+    @property
+    def size(self) -> Optional[int]:
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return None
+
+    @property
+    def signature(self) -> tuple:
+        """(nombre, tamaño, mtime) para saber si el archivo cambió entre dos pasadas."""
+        return (self.label,) + _stat(self.path)
+
+    def open(self) -> BinaryIO:
+        return open(self.path, "rb")
+
+    def read_bytes(self) -> bytes:
+        with self.open() as f:
+            return f.read()
+
+    def read_prefix(self, size: int) -> bytes:
+        with self.open() as f:
+            return f.read(size)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.label!r})"
+
+
+class _MemberSource(FileSource):
+    """Miembro de un archivo comprimido: sin ruta propia en disco."""
+
+    def __init__(self, archive: Path, member: str, size: Optional[int] = None):
+        self.archive = Path(archive)
+        self.member = member
+        self.name = PurePosixPath(member).name
+        self.path = None
+        self._size = size
+
+    @property
+    def label(self) -> str:
+        return f"{self.archive.name}/{self.member}"
+
+    @property
+    def size(self) -> Optional[int]:
+        return self._size
+
+    @property
+    def signature(self) -> tuple:
+        # El miembro cambia solo si cambia el archivo comprimido
+        return (self.label, self._size) + _stat(self.archive)
+
+
+class ZipMemberSource(_MemberSource):
+    def open(self) -> BinaryIO:
+        # El miembro abierto mantiene vivo el archivo aunque se cierre el ZipFile
+        with zipfile.ZipFile(self.archive) as zf:
+            return zf.open(self.member)
+
+
+class GzipSource(_MemberSource):
+    """Un solo archivo comprimido con gzip (medidor.csv.gz)."""
+
+    def __init__(self, archive: Path):
+        super().__init__(archive, Path(archive).name[:-3])
+
+    @property
+    def label(self) -> str:
+        return self.archive.name
+
+    def open(self) -> BinaryIO:
+        return gzip.open(self.archive, "rb")
+
+
+class _TarReader:
+    """
+    Lector secuencial compartido de un .tar(.gz): en un tar comprimido no se puede
+    saltar a un miembro sin descomprimir lo anterior, así que se avanza en orden
+    y solo se reabre si piden un miembro ya pasado. Los miembros pedidos que se
+    descomprimen (el solicitado y los que se saltan por llegar fuera de orden) se
+    guardan hasta 'max_bytes': las pasadas de deduplicación (muestra, serie) y la
+    de proceso leen el mismo miembro sin volver a descomprimir el archivo.
+    """
+
+    def __init__(self, archive: Path, max_bytes: int = TAR_CACHE_MAX_BYTES):
+        self.archive = Path(archive)
+        self.wanted = set()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._tar = self._members = None
+        self._seen = set()
+        self._cache = OrderedDict()
+        self._cached = 0
+
+    def read(self, member: str) -> bytes:
+        with self._lock:
+            data = self._cache.get(member)
+            if data is not None:
+                self._cache.move_to_end(member)
+                return data
+            if self._tar is None or member in self._seen:
+                self._reopen()
+            for info in self._members:
+                self._seen.add(info.name)
+                if info.name == member:
+                    data = self._keep(member, self._extract(info))
+                    if self.wanted <= self._seen:
+                        self.close()
+                    return data
+                if info.name in self.wanted and info.name not in self._cache:
+                    self._keep(info.name, self._extract(info))
+            self.close()
+            raise FileNotFoundError(f"{member} no está en {self.archive.name}")
+
+    def _extract(self, info) -> bytes:
+        f = self._tar.extractfile(info)
+        return f.read() if f is not None else b""
+
+    def _keep(self, member: str, data: bytes) -> bytes:
+        # Se descartan los más antiguos; el recién leído siempre queda (aunque supere el tope)
+        self._cache[member] = data
+        self._cached += len(data)
+        while self._cached > self.max_bytes and len(self._cache) > 1:
+            _, old = self._cache.popitem(last=False)
+            self._cached -= len(old)
+        return data
+
+    def _reopen(self):
+        self.close()
+        self._tar = tarfile.open(self.archive, "r|*")
+        # Un solo iterador: iterar de nuevo el TarFile vuelve a los miembros ya pasados
+        self._members = iter(self._tar)
+        self._seen = set()
+
+    def close(self):
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = self._members = None
+
+
+class TarMemberSource(_MemberSource):
+    def __init__(self, archive: Path, member: str, size: Optional[int], reader: _TarReader):
+        super().__init__(archive, member, size)
+        self._reader = reader
+
+    def open(self) -> BinaryIO:
+        return io.BytesIO(self._reader.read(self.member))
+
+
+def _wanted(member: str, suffixes) -> bool:
+    p = PurePosixPath(member)
+    return p.suffix.lower() in suffixes and not p.name.startswith(".") and "__MACOSX" not in p.parts
+
+
+def archive_sources(archive: Path, suffixes=(".csv",)) -> list:
+    """Miembros del archivo comprimido con alguna de las extensiones pedidas."""
+    archive = Path(archive)
+    name = archive.name.lower()
+    if name.endswith(".zip"):
+        with zipfile.ZipFile(archive) as zf:
+            return [ZipMemberSource(archive, i.filename, i.file_size)
+                    for i in zf.infolist() if not i.is_dir() and _wanted(i.filename, suffixes)]
+    if name.endswith((".tar", ".tgz", ".tar.gz")):
+        reader = _TarReader(archive)
+        with tarfile.open(archive, "r|*") as tf:
+            members = [TarMemberSource(archive, i.name, i.size, reader)
+                       for i in tf if i.isfile() and _wanted(i.name, suffixes)]
+        reader.wanted = {m.member for m in members}
+        return members
+    if name.endswith(".gz"):
+        return [GzipSource(archive)] if _wanted(archive.name[:-3], suffixes) else []
+    return []
+
+
+def discover_sources(location: Path, suffixes=(".csv",)) -> list:
+    """
+    Archivos de medidor de una carpeta (sueltos y dentro de comprimidos)
+    o de un archivo comprimido pasado directamente.
+    """
+    location = Path(location)
+    suffixes = tuple(s.lower() for s in suffixes)
+    if location.is_file():
+        return archive_sources(location, suffixes) if is_archive(location) else [FileSource(location)]
+    sources = [FileSource(p) for suffix in suffixes for p in location.glob(f"*{suffix}")]
+    for p in sorted(location.iterdir()):
+        if p.is_file() and is_archive(p):
+            sources.extend(archive_sources(p, suffixes))
+    return sources
+
+
+def as_source(value) -> FileSource:
+    return value if isinstance(value, FileSource) else FileSource(value)
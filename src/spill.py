@@ -0,0 +1,246 @@
+"""
+Resultados particionados con presupuesto de memoria (volcado a disco).
+- Cada análisis mensual (o por archivo) es una partición ya ordenada por (empresa, timestamp)
+- Mientras la suma de particiones en memoria pasa el presupuesto, las más antiguas se
+  vuelcan a Parquet en <workspace>/cache/spill y se leen de nuevo solo cuando se piden
+- Misma interfaz de lectura que CombinedIndex (companies, time_range, slice, groups)
+  más batches(): bloques de empresas completas acotados por el presupuesto
+- Requiere pyarrow (opcional); sin él no se vuelca nada y todo queda en memoria
+"""
+import logging
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .combined_index import CombinedIndex, _company_ranges, concat_sorted
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional
+    pa = pq = None
+
+
+LOG = logging.getLogger("spill")
+
+SPILL_DIRNAME = "spill"
+SPILL_COMPRESSION = "zstd"
+# Filas por row group: los filtros por empresa saltan grupos enteros al releer
+SPILL_ROW_GROUP = 64_000
+
+
+def spill_available() -> bool:
+    return pq is not None
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    """Memoria ocupada por el frame (texto incluido)."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class Partition:
+    """Una partición: frame en memoria o archivo Parquet + resumen por empresa."""
+
+    def __init__(self, df: pd.DataFrame, key: str = ""):
+        self.key = key
+        self.df = df
+        self.path: Optional[Path] = None
+        self.rows = len(df)
+        self.nbytes = frame_bytes(df)
+        self.columns = list(df.columns)
+        # empresa -> (filas, primer timestamp válido, último timestamp válido)
+        self.spans = {}
+        ts = df["timestamp"].to_numpy("datetime64[ns]") if "timestamp" in df.columns else None
+        for company, (lo, hi) in _company_ranges(df).items():
+            first = last = None
+            if ts is not None:
+                seg = ts[lo:hi][~np.isnat(ts[lo:hi])]
+                if len(seg):
+                    first, last = pd.Timestamp(seg[0]), pd.Timestamp(seg[-1])
+            self.spans[company] = (hi - lo, first, last)
+        self.valid_rows = int(np.count_nonzero(~np.isnat(ts))) if ts is not None else self.rows
+
+    @property
+    def spilled(self) -> bool:
+        return self.df is None
+
+    def overlaps(self, company: Optional[str], start=None, end=None) -> bool:
+        spans = [self.spans[company]] if company is not None and company in self.spans else (
+            [] if company is not None else list(self.spans.values()))
+        for _, first, last in spans:
+            if first is None:
+                return True
+            if (start is None or last >= pd.Timestamp(start)) and (end is None or first <= pd.Timestamp(end)):
+                return True
+        return False
+
+    def spill(self, folder: Path):
+        """Escribe el frame en Parquet y suelta la memoria."""
+        self.path = folder / f"part-{self.key}.parquet"
+        table = pa.Table.from_pandas(self.df, preserve_index=False)
+        pq.write_table(table, str(self.path), compression=SPILL_COMPRESSION, row_group_size=SPILL_ROW_GROUP)
+        self.df = None
+
+    def load(self, companies: Optional[list] = None) -> pd.DataFrame:
+        """Filas de la partición (solo las empresas pedidas, si se indican)."""
+        if self.df is not None:
+            if companies is None:
+                return self.df
+            ranges = _company_ranges(self.df)
+            pieces = [self.df.iloc[ranges[c][0]:ranges[c][1]] for c in companies if c in ranges]
+            return pd.concat(pieces, ignore_index=True) if pieces else self.df.iloc[0:0]
+        filters = [("company", "in", list(companies))] if companies is not None else None
+        df = pq.read_table(str(self.path), filters=filters).to_pandas()
+        if "timestamp" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
+            df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+        return df
+
+
+class SpillStore:
+    """
+    Particiones de resultados con presupuesto de memoria.
+    budget_bytes=None (o 0) = sin límite: nada se vuelca y frames() devuelve lo agregado.
+    """
+
+    def __init__(self, budget_bytes: Optional[int] = None, folder: Optional[Path] = None):
+        if budget_bytes and not spill_available():
+            LOG.warning("pyarrow no está instalado: se ignora el presupuesto de memoria")
+            budget_bytes = None
+        self.budget_bytes = int(budget_bytes) if budget_bytes else None
+        self._root = Path(folder) if folder is not None else None
+        self._folder: Optional[Path] = None
+        self._parts: list = []
+
+    @classmethod
+    def for_workspace(cls, cache_dir: Optional[Path], budget_mb: Optional[float]) -> "SpillStore":
+        """Presupuesto en MB; los volcados van a <cache>/spill (o al temporal del sistema)."""
+        budget = int(float(budget_mb) * 1024 * 1024) if budget_mb else None
+        return cls(budget, Path(cache_dir) / SPILL_DIRNAME if cache_dir is not None else None)
+
+    # ---------------- Escritura ----------------
+    def add(self, df: pd.DataFrame, key: Optional[str] = None):
+        """Agrega una partición ordenada por (empresa, timestamp); vuelca si se pasa del presupuesto."""
+        if df is None or not len(df):
+            return
+        if "company" not in df.columns:
+            df = CombinedIndex(df).df
+        part = Partition(df, key or f"{len(self._parts):04d}")
+        self._parts.append(part)
+        if self.budget_bytes is None:
+            return
+        for old in self._parts:
+            if self.memory_bytes <= self.budget_bytes:
+                break
+            if not old.spilled:
+                old.spill(self._spill_folder())
+                LOG.info("Partición %s volcada a disco (%d filas, %.1f MB)", old.key, old.rows, old.nbytes / 2**20)
+
+    def _spill_folder(self) -> Path:
+        if self._folder is None:
+            if self._root is not None:
+                self._root.mkdir(parents=True, exist_ok=True)
+            self._folder = Path(tempfile.mkdtemp(prefix="run-", dir=str(self._root) if self._root else None))
+        return self._folder
+
+    def cleanup(self):
+        """Borra los archivos volcados (las particiones en disco dejan de estar disponibles)."""
+        if self._folder is not None:
+            shutil.rmtree(self._folder, ignore_errors=True)
+            self._folder = None
+        self._parts = []
+
+    # ---------------- Estado ----------------
+    @property
+    def spilled(self) -> bool:
+        return any(p.spilled for p in self._parts)
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(p.nbytes for p in self._parts if not p.spilled)
+
+    @property
+    def partitions(self) -> int:
+        return len(self._parts)
+
+    def __len__(self) -> int:
+        return sum(p.rows for p in self._parts)
+
+    @property
+    def valid_rows(self) -> int:
+        return sum(p.valid_rows for p in self._parts)
+
+    @property
+    def columns(self) -> list:
+        return self._parts[0].columns if self._parts else []
+
+    @property
+    def companies(self) -> list:
+        return sorted(set().union(*(p.spans for p in self._parts)))
+
+    def __contains__(self, company) -> bool:
+        return any(str(company) in p.spans for p in self._parts)
+
+    def time_range(self, company: Optional[str] = None):
+        """(primer, último) timestamp válido de una empresa o de todas; (None, None) si no hay."""
+        firsts, lasts = [], []
+        for p in self._parts:
+            spans = [p.spans[str(company)]] if company is not None and str(company) in p.spans else (
+                [] if company is not None else list(p.spans.values()))
+            for _, first, last in spans:
+                if first is not None:
+                    firsts.append(first)
+                    lasts.append(last)
+        if not firsts:
+            return None, None
+        return min(firsts), max(lasts)
+
+    # ---------------- Lectura ----------------
+    def frames(self):
+        """Particiones completas en orden de llegada (las volcadas se leen de a una)."""
+        for p in self._parts:
+            yield p.load()
+
+    def _read(self, companies: Optional[list], start=None, end=None) -> pd.DataFrame:
+        wanted = companies if companies is not None else [None]
+        frames = [p.load(companies) for p in self._parts if any(p.overlaps(c, start, end) for c in wanted)]
+        if not frames:
+            return pd.DataFrame(columns=self.columns or ["company", "timestamp", "kwh", "kvarh"])
+        return CombinedIndex(concat_sorted(frames)).slice(None, start, end)
+
+    def slice(self, company: Optional[str] = None, start=None, end=None) -> pd.DataFrame:
+        """Filas de una empresa (o de todas) en el rango; solo se leen las particiones que se solapan."""
+        return self._read([str(company)] if company is not None else None, start, end)
+
+    def batches(self, start=None, end=None):
+        """
+        (empresas, filas) por bloques de empresas completas, en orden de empresa.
+        Cada bloque ocupa a lo sumo ~la mitad del presupuesto (sin presupuesto: un solo bloque).
+        """
+        companies = self.companies
+        if not companies:
+            return
+        if self.budget_bytes is None:
+            yield companies, self._read(None, start, end)
+            return
+        rows = {c: sum(p.spans[c][0] for p in self._parts if c in p.spans) for c in companies}
+        row_bytes = sum(p.nbytes for p in self._parts) / max(len(self), 1)
+        limit = max(1, int(self.budget_bytes / 2 / max(row_bytes, 1)))
+        batch, batch_rows = [], 0
+        for c in companies:
+            if batch and batch_rows + rows[c] > limit:
+                yield batch, self._read(batch, start, end)
+                batch, batch_rows = [], 0
+            batch.append(c)
+            batch_rows += rows[c]
+        yield batch, self._read(batch, start, end)
+
+    def groups(self, start=None, end=None):
+        """(empresa, filas) por empresa en orden, leyendo por bloques."""
+        for batch, df in self.batches(start, end):
+            index = CombinedIndex(df)
+            for company in batch:
+                yield company, index.slice(company)
@@ -0,0 +1,146 @@
+"""
+Índice de bytes por día para archivos de medidor (sidecar en el workspace).
+- Se construye una vez por archivo (ruta + tamaño + fecha de modificación)
+- Mapea cada día al byte donde empiezan sus filas, más la posición del encabezado
+- analyze_folder salta directo a las filas del rango pedido y solo parsea esas
+"""
+import hashlib
+import json
+import os
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+
+TIME_INDEX_DIRNAME = "indices"
+# Archivos más chicos se leen completos: indexarlos no compensa
+INDEX_MIN_BYTES = 2 * 1024 * 1024
+# Margen en días alrededor de la ventana (lecturas de 00:00 del día siguiente, etc.)
+_MARGIN = timedelta(days=1)
+
+
+def _file_key(path: Path) -> str:
+    st = path.stat()
+    raw = f"{path.resolve()}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+class TimeIndex:
+    """Offsets de inicio por día de un archivo ordenado en el tiempo."""
+
+    def __init__(self, header_offset: int, data_offset: int, size: int, days: list,
+                 monotonic: bool = True):
+        self.header_offset = header_offset
+        self.data_offset = data_offset
+        self.size = size
+        # [(fecha ISO, offset)] en orden creciente
+        self.days = days
+        self.monotonic = monotonic
+
+    @classmethod
+    def build(cls, path: Path, header_index: int, ts_position: int,
+              parse_day: Callable[[str], Optional[date]]) -> Optional["TimeIndex"]:
+        """
+        Recorre el archivo una vez en binario. parse_day(texto_timestamp) -> date | None.
+        Devuelve None si el encabezado no está donde se esperaba; un índice con
+        monotonic=False si las fechas no vienen ordenadas (no se puede usar para saltar).
+        """
+        path = Path(path)
+        size = path.stat().st_size
+        days = []
+        with open(path, "rb") as f:
+            for _ in range(header_index):
+                if not f.readline():
+                    return None
+            header_offset = f.tell()
+            if not f.readline():
+                return None
+            offset = data_offset = f.tell()
+            last_key = last_day = None
+            for line in f:
+                fields = line.split(b",", ts_position + 1)
+                if len(fields) > ts_position:
+                    field = fields[ts_position].strip()
+                    key = field.split(b" ", 1)[0]
+                    # Solo se parsea cuando cambia la parte de fecha (~1 vez por día)
+                    if key and key != last_key:
+                        last_key = key
+                        day = parse_day(field.decode("latin1"))
+                        if day is not None and day != last_day:
+                            if last_day is not None and day < last_day:
+                                return cls(header_offset, data_offset, size, [], monotonic=False)
+                            days.append((day.isoformat(), offset))
+                            last_day = day
+                offset += len(line)
+        return cls(header_offset, data_offset, size, days)
+
+    def byte_range(self, start, end) -> Tuple[int, int]:
+        """[lo, hi) de bytes que contienen las filas entre start y end (con margen de un día)."""
+        first = (start.date() - _MARGIN).isoformat()
+        last = (end.date() + _MARGIN).isoformat()
+        lo = hi = None
+        for day, offset in self.days:
+            if lo is None and day >= first:
+                lo = offset
+            if day > last:
+                hi = offset
+                break
+        if lo is None:
+            return self.size, self.size
+        return lo, self.size if hi is None else hi
+
+    def to_dict(self) -> dict:
+        return {
+            "header_offset": self.header_offset,
+            "data_offset": self.data_offset,
+            "size": self.size,
+            "days": self.days,
+            "monotonic": self.monotonic,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TimeIndex":
+        return cls(data["header_offset"], data["data_offset"], data["size"],
+                   [tuple(d) for d in data["days"]], data.get("monotonic", True))
+
+
+class TimeIndexCache:
+    """Índices por archivo; en disco si hay carpeta de caché, si no solo en memoria."""
+
+    def __init__(self, cache_dir: Optional[Path] = None, min_bytes: int = INDEX_MIN_BYTES):
+        self.dir = Path(cache_dir) / TIME_INDEX_DIRNAME if cache_dir is not None else None
+        self.min_bytes = min_bytes
+        self._memory: dict = {}
+
+    def get(self, path: Path, header_index: int, ts_position: int,
+            parse_day: Callable[[str], Optional[date]]) -> Optional[TimeIndex]:
+        """Índice utilizable del archivo (lo construye si falta o cambió), o None."""
+        path = Path(path)
+        if path.stat().st_size < self.min_bytes:
+            return None
+        key = f"{_file_key(path)}-{header_index}-{ts_position}"
+        index = self._memory.get(key)
+        if index is None and self.dir is not None:
+            sidecar = self.dir / f"{key}.json"
+            if sidecar.exists():
+                try:
+                    with open(sidecar, "r", encoding="utf-8") as f:
+                        index = TimeIndex.from_dict(json.load(f))
+                except (OSError, ValueError, KeyError):
+                    index = None
+        if index is None:
+            index = TimeIndex.build(path, header_index, ts_position, parse_day)
+            if index is None:
+                return None
+            self._store(key, index)
+        self._memory[key] = index
+        return index if index.monotonic else None
+
+    def _store(self, key: str, index: TimeIndex):
+        if self.dir is None:
+            return
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.dir / f"{key}.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index.to_dict(), f)
+        os.replace(tmp, self.dir / f"{key}.json")
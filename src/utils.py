@@ -1,5 +1,10 @@
 ﻿from typing import Optional
 from datetime import datetime
+from contextlib import contextmanager
+from pathlib import Path
+import os
+import tempfile
+import numpy as np
 import pandas as pd
 
 DATE_FORMATS = [
@@ -55,3 +60,66 @@ def to_numeric(series: pd.Series) -> pd.Series:
     s = s.str.replace(".", "", regex=False) if s.str.contains(r"\d\.\d{3}", regex=True).any() else s
     s = s.str.replace(",", ".", regex=False)
     return pd.to_numeric(s, errors="coerce")
+
+class Cancelled(Exception):
+    """Trabajo en segundo plano cancelado por el usuario."""
+
+def check_cancel(cancel) -> None:
+    """Lanza Cancelled si el evento de cancelación (threading.Event) está activo."""
+    if cancel is not None and cancel.is_set():
+        raise Cancelled()
+
+def _read_umask() -> int:
+    # os.umask solo se puede leer cambiándola: se hace una vez, al importar (antes de
+    # que haya hilos de exportación), y no en cada escritura
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+_UMASK = _read_umask()
+
+
+def _target_mode(path: Path) -> int:
+    """Permisos del destino si existe; si no, los de un archivo nuevo (0666 menos la umask)."""
+    try:
+        return path.stat().st_mode & 0o7777
+    except OSError:
+        return 0o666 & ~_UMASK
+
+
+@contextmanager
+def atomic_write(path):
+    """
+    Entrega una ruta temporal junto al destino; al salir sin error la renombra
+    sobre el destino (os.replace). Con error o cancelación el destino queda
+    intacto y el temporal se borra.
+    El resultado conserva los permisos del destino (mkstemp crea el temporal en 0600).
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.stem}.", suffix=path.suffix, dir=path.parent or ".")
+    os.close(fd)
+    try:
+        yield Path(tmp)
+        os.chmod(tmp, _target_mode(path))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def format_timestamp_series(ts: pd.Series, fmt: str) -> np.ndarray:
+    """
+    Formatea timestamps a texto aplicando strftime solo a los valores únicos.
+    En la rejilla de 15 min todas las empresas comparten los mismos instantes,
+    así que se formatean unos pocos miles de valores en vez de millones de filas.
+    NaT se devuelve como cadena vacía.
+    """
+    codes, uniques = pd.factorize(ts)
+    labels = np.empty(len(uniques) + 1, dtype=object)
+    labels[:-1] = pd.DatetimeIndex(uniques).strftime(fmt)
+    labels[-1] = ""  # código -1 (NaT) → último elemento
+    return labels[codes]
@@ -0,0 +1,26 @@
+from src.column_roles import ColumnRoleResolver, header_signature
+
+ROLES = {"timestamp": "Read Date Time", "kwh": ["Channel 1"], "kvarh": ["Channel 2"],
+         "flags": ["Status Flags"], "source": "nombre"}
+
+
+def test_signature_ignores_case_and_spacing():
+    assert header_signature(["Read Date Time", "Channel 1"]) == header_signature([" read  date time", "CHANNEL 1 "])
+
+
+def test_roles_persist_between_sessions(tmp_path):
+    cols = ["Set Number", "Read Date Time", "Channel 1", "Channel 2", "Status Flags"]
+    first = ColumnRoleResolver.for_workspace(tmp_path)
+    assert first.get(cols) is None
+    first.put(cols, ROLES)
+
+    second = ColumnRoleResolver.for_workspace(tmp_path)
+    assert second.get(cols)["kwh"] == ["Channel 1"]
+    assert (second.hits, second.misses) == (1, 0)
+
+
+def test_cached_roles_require_columns_to_exist(tmp_path):
+    resolver = ColumnRoleResolver()
+    resolver.put(["Read Date Time", "Channel 1", "Channel 2"], ROLES)
+    # Misma firma normalizada, pero los nombres reales difieren: no se reutiliza
+    assert resolver.get(["read date time", "channel 1", "channel 2"]) is None
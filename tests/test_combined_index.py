@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from src.combined_index import CombinedIndex, concat_sorted
+from src.csv_processor import CSVProcessor
+
+
+def _frame():
+    parts = []
+    for company in ("B", "A", "C"):
+        ts = pd.date_range("2025-10-01", periods=8, freq="15min")
+        parts.append(pd.DataFrame({"company": company, "timestamp": ts, "kwh": np.arange(8.0)}))
+    # Meses concatenados: empresas no contiguas y timestamps como texto
+    df = pd.concat(parts + [parts[1].assign(timestamp=parts[1]["timestamp"] + pd.Timedelta(days=31))], ignore_index=True)
+    return df.assign(timestamp=df["timestamp"].dt.strftime("%d/%m/%Y %H:%M"))
+
+
+def test_slices_match_boolean_filters():
+    raw = _frame()
+    index = CombinedIndex(raw)
+    df = index.df
+    assert index.companies == ["A", "B", "C"]
+    assert pd.api.types.is_datetime64_any_dtype(df["timestamp"])
+
+    start, end = pd.Timestamp("2025-10-01 00:30"), pd.Timestamp("2025-11-01 00:15")
+    got = index.slice("A", start, end)
+    mask = (df["company"] == "A") & (df["timestamp"] >= start) & (df["timestamp"] <= end)
+    assert got.equals(df[mask])
+    assert len(got) == 8
+    assert len(index.slice(None, start, end)) == int(((df["timestamp"] >= start) & (df["timestamp"] <= end)).sum())
+    assert index.time_range("A") == (pd.Timestamp("2025-10-01"), pd.Timestamp("2025-11-01 01:45"))
+    assert index.slice("Z").empty
+
+
+def test_processor_setter_invalidates_index():
+    proc = CSVProcessor()
+    proc.combined_df = _frame()
+    assert proc.combined_index.companies == ["A", "B", "C"]
+    assert proc.get_slice("B")["kwh"].tolist() == list(np.arange(8.0))
+    proc.combined_df = _frame()[lambda d: d["company"] == "C"]
+    assert proc.combined_index.companies == ["C"]
+
+
+def test_concat_sorted_interleaves_months_without_resort():
+    months = []
+    for start in ("2025-10-01", "2025-11-01"):
+        ts = pd.date_range(start, periods=4, freq="15min")
+        months.append(pd.concat([pd.DataFrame({"company": c, "timestamp": ts, "kwh": 1.0}) for c in ("A", "B")],
+                                ignore_index=True))
+    months[1] = months[1][months[1]["company"] == "B"].reset_index(drop=True)
+    combined = concat_sorted(months)
+    expected = pd.concat(months, ignore_index=True).sort_values(["company", "timestamp"], kind="stable")
+    assert combined.equals(expected.reset_index(drop=True))
+    index = CombinedIndex(combined)
+    assert index.df is combined
+    # Ventana que cubre todo: el mismo frame, sin copia
+    assert index.slice(None, "2025-09-30", "2025-12-01") is combined
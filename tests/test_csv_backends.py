@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from src.csv_processor import CSVProcessor
+from tests.test_csv_processor import _write_kv2c
+
+pytest.importorskip("pyarrow")
+
+from src.csv_backends import ShortRowsError, read_arrow_table, resolve_backend  # noqa: E402
+
+
+def test_arrow_backend_matches_pandas(tmp_path):
+    folder = tmp_path / "datos"
+    folder.mkdir()
+    _write_kv2c(folder / "a.csv")
+    path = _write_kv2c(folder / "b.csv", serial="2")
+    # Fila con campos de más (se descarta) y fila corta (Arrow cede a pandas)
+    path.write_text(path.read_text() + "1,10/01/2025 03:00 AM,9.5,0.5,,,,\n1,10/01/2025 03:15 AM,7.5\n",
+                    encoding="utf-8")
+
+    frames = {}
+    for backend in ("pandas", "arrow"):
+        proc = CSVProcessor()
+        proc.csv_backend = backend
+        proc.read_chunk_rows = 5
+        ok, _, _ = proc.analyze_folder(folder, 10, 2025, "00:00", "23:59")
+        assert ok
+        frames[backend] = proc.combined_df.reset_index(drop=True)
+    pd.testing.assert_frame_equal(frames["arrow"], frames["pandas"])
+    b = frames["arrow"][frames["arrow"]["company"] == "b"].set_index("timestamp")
+    assert b.loc["2025-10-01 03:15", "kwh"] == 7.5 and pd.isna(b.loc["2025-10-01 03:00", "kwh"])
+
+    proc = CSVProcessor()
+    proc.csv_backend = "arrow"
+    chunk = next(proc.iter_csv_chunks(folder / "a.csv"))
+    assert isinstance(chunk["Channel 1"].dtype, pd.ArrowDtype)
+    assert proc._clean_numeric_column(chunk["Channel 1"]).tolist()[:2] == [1.5, 2.5]
+
+
+def test_arrow_reader_rejects_short_rows(tmp_path):
+    path = _write_kv2c(tmp_path / "m.csv")
+    path.write_text(path.read_text() + "1,10/01/2025 03:00 AM\n", encoding="utf-8")
+    with pytest.raises(ShortRowsError):
+        read_arrow_table(path, "utf-8-sig", 6)
+    with pytest.raises(ValueError):
+        resolve_backend("polars")
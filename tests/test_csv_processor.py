@@ -9,3 +9,150 @@ def test_init(tmp_path):
     assert proc.workspace.exists()
     assert proc.input_dir.exists()
     assert proc.output_dir.exists()
+
+
+def _sample_combined():
+    import pandas as pd
+    ts = pd.date_range("2025-10-01", periods=8, freq="15min")
+    return pd.concat([
+        pd.DataFrame({"company": "A", "timestamp": ts, "kwh": range(8), "kvarh": 0.5}),
+        pd.DataFrame({"company": "B", "timestamp": ts, "kwh": 1.25, "kvarh": float("nan")}),
+    ], ignore_index=True)
+
+
+@pytest.mark.parametrize("ext", [".parquet", ".feather"])
+def test_session_roundtrip(tmp_path, ext):
+    pytest.importorskip("pyarrow")
+    import pandas as pd
+    proc = CSVProcessor(tmp_path / "ws")
+    proc.combined_df = _sample_combined()
+    results = {"processed_files": 2, "date_range": {"start": "01/10/2025 00:00"}}
+    ok, _ = proc.export_session(str(tmp_path / f"sesion{ext}"), results=results, multipliers={"A": 120.0})
+    assert ok
+
+    other = CSVProcessor(tmp_path / "ws")
+    ok, _, session = other.load_session(str(tmp_path / f"sesion{ext}"))
+    assert ok
+    assert session["results"] == results
+    assert session["multipliers"] == {"A": 120.0}
+    pd.testing.assert_frame_equal(other.combined_df, proc.combined_df)
+
+
+def test_export_combined_csv_chunked_gzip(tmp_path):
+    import gzip
+    import pandas as pd
+    proc = CSVProcessor()
+    proc.combined_df = _sample_combined()
+    ok, _ = proc.export_combined_csv(str(tmp_path / "plano.csv"), chunk_rows=3)
+    assert ok
+    ok, _ = proc.export_combined_csv(str(tmp_path / "comprimido.csv.gz"), chunk_rows=5)
+    assert ok
+
+    plain = (tmp_path / "plano.csv").read_bytes()
+    assert gzip.decompress((tmp_path / "comprimido.csv.gz").read_bytes()) == plain
+    back = pd.read_csv(tmp_path / "plano.csv", encoding="utf-8-sig")
+    assert len(back) == 16
+    assert back["timestamp"].iloc[1] == "2025-10-01 00:15:00"
+
+
+def _write_kv2c(path, start="09/30/2025 11:00 PM", periods=12, serial="1"):
+    import pandas as pd
+    stamps = pd.date_range(pd.to_datetime(start, format="%m/%d/%Y %I:%M %p"), periods=periods, freq="15min")
+    lines = [f"Meter ID,{serial}", "Meter Model,KV2C", "Firmware Version,5.1", "",
+             "Set Number,Read Date Time,Channel 1 (Scale Factor),Channel 2 (Scale Factor),Common Flags,",
+             "1,,1.0,1.0,,",
+             "Set Number,Read Date Time,Channel 1,Channel 2,Status Flags,Common Flags"]
+    lines += [f"1,{t:%m/%d/%Y %I:%M %p},{i + 1}.5,0.25,," for i, t in enumerate(stamps)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def test_analyze_folder_streams_chunks(tmp_path):
+    folder = tmp_path / "datos"
+    folder.mkdir()
+    _write_kv2c(folder / "medidor.csv")
+    proc = CSVProcessor()
+    proc.read_chunk_rows = 3
+    assert len(list(proc.iter_csv_chunks(folder / "medidor.csv"))) == 4
+
+    ok, _, results = proc.analyze_folder(folder, 10, 2025, "00:00", "23:59")
+    assert ok
+    df = proc.combined_df
+    assert len(df) == 31 * 96
+    # 23:00 y 23:15 del 30/09 quedan fuera; 00:00 del 01/10 es la 5ª lectura
+    assert df["kwh"].iloc[0] == 5.5
+    assert results["file_details"][0]["kwh_values"] == 8
+
+
+def test_analyze_folder_uses_time_index(tmp_path):
+    folder = tmp_path / "datos"
+    folder.mkdir()
+    _write_kv2c(folder / "medidor.csv", start="09/01/2025 12:00 AM", periods=96 * 91)
+
+    plain = CSVProcessor()
+    plain.time_index.min_bytes = 10**12
+    assert plain.analyze_folder(folder, 10, 2025, "00:00", "23:59")[0]
+
+    proc = CSVProcessor(tmp_path / "ws")
+    proc.time_index.min_bytes = 0
+    ok, _, results = proc.analyze_folder(folder, 10, 2025, "00:00", "23:59")
+    assert ok and results["file_details"][0]["indexed"]
+    assert list((proc.cache_dir / "indices").glob("*.json"))
+    assert proc.combined_df.equals(plain.combined_df)
+
+    # Mes sin lecturas: rejilla vacía, igual que sin índice
+    ok, _, results = proc.analyze_folder(folder, 3, 2026, "00:00", "23:59")
+    assert ok and proc.combined_df["kwh"].isna().all()
+
+
+def _write_kv2c_cp1252(path, periods=20_000):
+    # Preámbulo y una lectura en cp1252 ("Señal" no es UTF-8 válido), lejos del inicio del archivo
+    lines = _write_kv2c(path, start="10/01/2025 12:00 AM", periods=periods).read_text(encoding="utf-8").splitlines()
+    lines.insert(3, "Ubicación,Señal norte")
+    lines[8 + periods * 3 // 4] += "Señal"
+    path.write_bytes(("\n".join(lines) + "\n").encode("cp1252"))
+    return path
+
+
+def test_encoding_retry_keeps_format_reader(tmp_path, monkeypatch):
+    # Si el primer bloque falla con una codificación, la siguiente usa el mismo lector de formato
+    path = _write_kv2c(tmp_path / "medidor.csv", start="10/01/2025 12:00 AM", periods=96)
+    proc = CSVProcessor()
+    real = proc._read_kv2c
+
+    def flaky(source, encoding, header_index, engine=None, chunksize=None):
+        if encoding == "utf-8-sig" and chunksize:
+            def failing():
+                raise UnicodeDecodeError("utf-8", b"\xf1", 0, 1, "invalid continuation byte")
+                yield
+            return failing()
+        return real(source, encoding, header_index, engine=engine, chunksize=chunksize)
+
+    monkeypatch.setattr(proc, "_read_kv2c", flaky)
+    reader = proc.readers.detect(path.read_bytes(), path.name)
+    assert sum(len(c) for c in proc.iter_csv_chunks(path, reader=reader)) == 96
+
+
+def test_analyze_folder_reads_cp1252_preamble(tmp_path):
+    folder = tmp_path / "datos"
+    folder.mkdir()
+    _write_kv2c_cp1252(folder / "medidor.csv")
+    proc = CSVProcessor()
+    ok, msg, results = proc.analyze_folder(folder, 10, 2025, "00:00", "23:59")
+    assert ok, msg
+    assert results["combined_stats"]["total_kwh_values"] == 96 * 31
+
+
+
+def test_non_utf8_byte_past_first_chunk(tmp_path):
+    path = _write_kv2c(tmp_path / "medidor.csv", start="10/01/2025 12:00 AM", periods=2000)
+    lines = path.read_text(encoding="utf-8").splitlines()
+    # Solo la fila 1500 trae un byte cp1252 (ñ): el primer bloque de 500 filas es UTF-8 válido
+    lines[7 + 1500] += "Señal"
+    path.write_bytes(("\n".join(lines) + "\n").encode("cp1252"))
+    proc = CSVProcessor()
+    proc.read_chunk_rows = 500
+    assert sum(len(c) for c in proc.iter_csv_chunks(path)) == 2000
+    ok, msg, results = proc.analyze_folder(tmp_path, 10, 2025, "00:00", "23:59")
+    assert ok, msg
+    assert results["combined_stats"]["total_kwh_values"] == 2000
@@ -0,0 +1,97 @@
+import shutil
+
+import pytest
+
+from src.csv_processor import CSVProcessor
+from src.dedup import plan_files
+from src.energy_units import to_display
+from src.events import CompanyTotals
+from src.readers import KV2CReader, ReaderRegistry
+from src.sources import discover_sources
+from tests.test_csv_processor import _write_kv2c
+
+
+def _analyze(folder, **kwargs):
+    proc = CSVProcessor()
+    ok, msg, results = proc.analyze_folder(folder, 10, 2025, "00:00", "23:59", **kwargs)
+    assert ok, msg
+    return proc.combined_df, results
+
+
+def test_exact_copies_are_skipped(tmp_path):
+    folder = tmp_path / "datos"
+    folder.mkdir()
+    _write_kv2c(folder / "medidor.csv", start="10/01/2025 12:00 AM", periods=96)
+    shutil.copy(folder / "medidor.csv", folder / "medidor (1).csv")
+    _write_kv2c(folder / "otro.csv", start="10/01/2025 12:00 AM", periods=96, serial="2")
+
+    df, results = _analyze(folder)
+    assert sorted(df["company"].unique()) == ["medidor", "otro"]
+    assert results["duplicate_files"] == [{"filename": "medidor (1).csv", "duplicate_of": "medidor.csv"}]
+    assert results["processed_files"] == 2 and results["total_files"] == 3
+    assert to_display(df.loc[df["company"] == "medidor", "kwh"]).sum() == pytest.approx(sum(i + 1.5 for i in range(96)))
+
+
+def test_overlapping_exports_merge_into_one_company(tmp_path):
+    ref_folder = tmp_path / "ref"
+    ref_folder.mkdir()
+    lines = _write_kv2c(ref_folder / "medidor.csv", start="10/01/2025 12:00 AM", periods=400).read_text().splitlines()
+    preamble, rows = lines[:7], lines[7:]
+    folder = tmp_path / "datos"
+    folder.mkdir()
+    # Mensual (primeros 200 intervalos) + semanal superpuesto (96..399), mismo medidor
+    (folder / "medidor_octubre.csv").write_text("\n".join(preamble + rows[:200]) + "\n")
+    (folder / "medidor.csv").write_text("\n".join(preamble + rows[96:]) + "\n")
+
+    totals = CompanyTotals()
+    df, results = _analyze(folder, event_cb=totals)
+    ref, _ = _analyze(ref_folder)
+    assert list(df["company"].unique()) == ["medidor"]
+    assert results["merged_companies"] == {"medidor": ["medidor.csv", "medidor_octubre.csv"]}
+    assert df["kwh"].equals(ref["kwh"]) and df["kvarh"].equals(ref["kvarh"])
+    # Los parciales no cuentan dos veces la superposición
+    assert totals.totals["medidor"]["kwh"] == pytest.approx(float(df["kwh"].sum()))
+    assert totals.totals["medidor"]["kwh_values"] == 400 and totals.totals["medidor"]["files"] == 2
+
+    proc = CSVProcessor()
+    proc.deduplicate = False
+    proc.analyze_folder(folder, 10, 2025, "00:00", "23:59")
+    assert sorted(proc.combined_df["company"].unique()) == ["medidor", "medidor_octubre"]
+
+
+def test_sample_match_is_confirmed_with_full_hash(tmp_path):
+    a = _write_kv2c(tmp_path / "a.csv", periods=40)
+    data = bytearray(a.read_bytes())
+    middle = len(data) // 3
+    data[middle] = ord("9") if data[middle] != ord("9") else ord("8")
+    (tmp_path / "b.csv").write_bytes(bytes(data))
+    shutil.copy(a, tmp_path / "c.csv")
+
+    plan = plan_files(discover_sources(tmp_path, (".csv",)), ReaderRegistry(), sample_bytes=16)
+    assert [(d.name, o.name) for d, o in plan.duplicates] == [("c.csv", "a.csv")]
+    # Misma serie: a y b (distintos) quedan en una sola empresa
+    assert plan.merged == {"a": ["a.csv", "b.csv"]}
+    assert KV2CReader().serial('"Meter ID","A-9",\n') == "A-9" and KV2CReader().serial("a,b\n") is None
+
+
+def test_plan_is_reused_across_months(tmp_path, monkeypatch):
+    import src.csv_processor as proc_mod
+
+    folder = tmp_path / "datos"
+    folder.mkdir()
+    _write_kv2c(folder / "medidor.csv", start="10/01/2025 12:00 AM", periods=96 * 40)
+    shutil.copy(folder / "medidor.csv", folder / "medidor (1).csv")
+    calls = []
+    monkeypatch.setattr(proc_mod, "plan_files", lambda *a, **k: calls.append(1) or plan_files(*a, **k))
+
+    proc = CSVProcessor()
+    for month in (10, 11):
+        ok, msg, results = proc.analyze_folder(folder, month, 2025, "00:00", "23:59")
+        assert ok, msg
+        assert results["duplicate_files"] == [{"filename": "medidor (1).csv", "duplicate_of": "medidor.csv"}]
+    assert len(calls) == 1
+
+    # Un archivo nuevo invalida el plan
+    _write_kv2c(folder / "otro.csv", start="10/01/2025 12:00 AM", periods=96, serial="2")
+    proc.analyze_folder(folder, 10, 2025, "00:00", "23:59")
+    assert len(calls) == 2
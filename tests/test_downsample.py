@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.downsample import curve_points, finite_runs, lttb_indices, minmax_indices
+from src.energy_units import to_fixed
+
+
+def _curve(n=20_000):
+    ts = pd.date_range("2025-01-01", periods=n, freq="15min")
+    kwh = np.sin(np.arange(n) / 96 * 2 * np.pi) * 10 + 20
+    kwh[777] = 95.0
+    kwh[5000:5400] = np.nan
+    return pd.DataFrame({"company": "A", "timestamp": ts, "kwh": kwh})
+
+
+def test_minmax_keeps_peaks_and_gaps():
+    df = _curve()
+    ts, kwh = curve_points(df, "kwh", 800, "minmax")
+    assert len(ts) <= 800 and np.all(np.diff(ts.view("int64")) > 0)
+    assert np.nanmax(kwh) == 95.0 and np.nanmin(kwh) == pytest.approx(10.0, abs=0.01)
+    # El hueco de datos queda como un corte de la línea
+    assert len(finite_runs(ts, kwh)) == 2
+
+
+def test_lttb_selects_shape_points():
+    x = np.arange(10_000, dtype="int64")
+    y = np.zeros(10_000)
+    y[4321] = 7.0
+    idx = lttb_indices(x, y, 100)
+    assert len(idx) == 100 and idx[0] == 0 and idx[-1] == 9_999
+    assert 4321 in idx
+    # Pocos puntos: se devuelven todos
+    assert minmax_indices(y[:10], 50).tolist() == list(range(10))
+
+
+def test_fixed_point_curve_in_kwh():
+    df = _curve(1000)
+    df["kwh"] = to_fixed(df["kwh"].round(3), 1000)
+    _, kwh = curve_points(df, "kwh", 2000, "lttb")
+    assert np.nanmax(kwh) == 95.0
+    with pytest.raises(ValueError):
+        curve_points(df, "kwh", 100, "spline")
@@ -0,0 +1,55 @@
+from datetime import datetime
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from src.csv_processor import CSVProcessor
+from src.energy_units import is_fixed, multiply, to_display, to_fixed
+from src.reports import hourly_reports
+from tests.test_csv_processor import _write_kv2c
+
+
+def test_fixed_roundtrip_keeps_missing_values():
+    s = pd.Series([0.1, np.nan, 2.5, 1234.567])
+    fixed = to_fixed(s)
+    assert is_fixed(fixed) and fixed.isna().tolist() == [False, True, False, False]
+    assert fixed.dropna().tolist() == [100, 2500, 1234567]
+    back = to_display(fixed)
+    assert back.dtype == "float64" and np.isnan(back[1])
+    assert back.dropna().tolist() == [0.1, 2.5, 1234.567]
+    # Multiplo no entero: se redondea a la unidad fija
+    assert multiply(fixed, 1.25).dropna().tolist() == [125, 3125, 1543209]
+
+
+def test_hourly_reports_fixed_point_totals_are_exact():
+    ts = pd.date_range("2025-10-01", "2025-10-31 23:45", freq="15min")
+    df = pd.DataFrame({"company": "A", "timestamp": ts, "kwh": 0.001 * (np.arange(len(ts)) % 997), "kvarh": 0.1})
+    start_dt, end_dt = datetime(2025, 10, 1), datetime(2025, 10, 31, 23, 59)
+    fixed = df.assign(kwh=to_fixed(df["kwh"]), kvarh=to_fixed(df["kvarh"]))
+
+    report_f, totals_f, _ = hourly_reports(df, start_dt, end_dt, {"A": 80})["A"]
+    report_i, totals_i, _ = hourly_reports(fixed, start_dt, end_dt, {"A": 80})["A"]
+    pd.testing.assert_frame_equal(report_i, report_f, atol=1e-9)
+
+    exact_kwh = sum(Decimal(int(v)) for v in (np.arange(len(ts)) % 997)) * 80 / 1000
+    assert Decimal(repr(totals_i["kwh"])) == exact_kwh
+    assert totals_i["kvarh"] == len(ts) * 8.0
+
+
+def test_processor_stores_fixed_point_and_exports_kwh(tmp_path):
+    folder = tmp_path / "datos"
+    folder.mkdir()
+    _write_kv2c(folder / "medidor.csv")
+    proc = CSVProcessor()
+    proc.fixed_point_dtype = "Int32"
+    ok, _, _ = proc.analyze_folder(folder, 10, 2025, "00:00", "23:59")
+    assert ok
+    df = proc.combined_df
+    assert str(df["kwh"].dtype) == "Int32" and df["kwh"].iloc[0] == 5500
+
+    out = tmp_path / "out.csv"
+    ok, _ = proc.export_combined_csv(str(out))
+    assert ok
+    exported = pd.read_csv(out, encoding="utf-8-sig")
+    assert exported["kwh"].iloc[0] == 5.5 and exported["kvarh"].iloc[0] == 0.25
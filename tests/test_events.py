@@ -0,0 +1,65 @@
+import pytest
+
+from src.csv_processor import CSVProcessor
+from src.energy_units import to_display
+from src.events import AnalysisFinished, AnalysisStarted, CompanyTotals, FileCompleted, FileFailed
+from tests.test_csv_processor import _write_kv2c
+
+
+def _folder(tmp_path):
+    folder = tmp_path / "datos"
+    folder.mkdir()
+    _write_kv2c(folder / "a_medidor.csv", start="10/01/2025 12:00 AM", periods=40)
+    _write_kv2c(folder / "b_medidor.csv", start="10/02/2025 12:00 AM", periods=8, serial="2")
+    (folder / "c_roto.csv").write_text("sin,fechas\n1,2\n", encoding="utf-8")
+    return folder
+
+
+@pytest.mark.parametrize("fixed", [None, "Int32"])
+def test_events_per_file_match_final_totals(tmp_path, fixed):
+    events = []
+    totals = CompanyTotals()
+    proc = CSVProcessor()
+    proc.fixed_point_dtype = fixed
+    ok, msg, results = proc.analyze_folder(_folder(tmp_path), 10, 2025, "00:00", "23:59",
+                                     event_cb=lambda e: (events.append(e), totals(e)))
+    assert ok, msg
+    assert isinstance(events[0], AnalysisStarted) and events[0].total_files == 3
+    assert events[0].period == "10/2025"
+    done = [e for e in events if isinstance(e, FileCompleted)]
+    assert [(e.company, e.index) for e in done] == [("a_medidor", 1), ("b_medidor", 2)]
+    assert done[0].kwh_values == 40 and done[0].format == "kv2c"
+    assert [e.filename for e in events if isinstance(e, FileFailed)] == ["c_roto.csv"]
+    finished = events[-1]
+    assert isinstance(finished, AnalysisFinished)
+    assert finished.companies == ["a_medidor", "b_medidor"] and finished.processed_files == 2
+    assert finished.error_files == results["error_files"] and finished.rows == len(proc.combined_df)
+
+    # Los parciales suman lo mismo que el resultado final
+    df = proc.combined_df
+    for company, t in totals.totals.items():
+        part = df[df["company"] == company]
+        assert t["kwh"] == pytest.approx(float(to_display(part["kwh"]).sum()))
+        assert t["kvarh"] == pytest.approx(float(to_display(part["kvarh"]).sum()))
+    assert totals.companies == ["a_medidor", "b_medidor"] and totals.failed == ["c_roto.csv"]
+
+
+def test_failing_callback_does_not_stop_analysis(tmp_path):
+    def boom(event):
+        raise RuntimeError("ui cerrada")
+
+    proc = CSVProcessor()
+    ok, _, results = proc.analyze_folder(_folder(tmp_path), 10, 2025, "00:00", "23:59", event_cb=boom)
+    assert ok and results["processed_files"] == 2
+
+
+def test_company_totals_count_files_once_across_months(tmp_path):
+    folder = _folder(tmp_path)
+    _write_kv2c(folder / "a_medidor_nov.csv", start="11/01/2025 12:00 AM", periods=8)
+    totals = CompanyTotals()
+    proc = CSVProcessor()
+    proc.deduplicate = False
+    for month in (10, 11):
+        assert proc.analyze_folder(folder, month, 2025, "00:00", "23:59", event_cb=totals)[0]
+    # Cada archivo se emite una vez por mes, pero se cuenta una sola vez
+    assert totals.totals["a_medidor"]["files"] == 1 and totals.totals["b_medidor"]["files"] == 1
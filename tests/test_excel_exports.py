@@ -0,0 +1,43 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from src.combined_index import CombinedIndex
+from src.excel_exports import write_company_workbook
+from src.utils import Cancelled
+
+
+def _index():
+    ts = pd.date_range("2025-10-01", periods=4, freq="15min")
+    df = pd.concat([pd.DataFrame({"company": c, "timestamp": ts, "kwh": [1.0, 2.0, 3.0, 4.0], "kvarh": 0.5})
+                    for c in ("B", "A")], ignore_index=True)
+    return CombinedIndex(df)
+
+
+def test_company_workbook_sheets_and_progress(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    index = _index()
+    totals = pd.DataFrame({"kwh": [800.0, 80.0], "kvarh": [160.0, 16.0]}, index=["A", "B"])
+    msgs = []
+    path = tmp_path / "salida.xlsx"
+    write_company_workbook(path, index, totals, pd.Series({"A": 80.0, "B": 8.0}), 80.0, progress_cb=msgs.append)
+
+    wb = openpyxl.load_workbook(path)
+    assert wb.sheetnames == ["total", "A", "B"]
+    assert wb["A"]["D1"].value == 800.0 and wb["B"]["B1"].value == 8
+    assert wb["A"]["A5"].value == "01/10/2025 00:00:00"
+    assert any("hoja 2/2" in m for m in msgs)
+    assert [p.name for p in tmp_path.iterdir()] == ["salida.xlsx"]
+
+
+def test_cancel_keeps_previous_file(tmp_path):
+    pytest.importorskip("openpyxl")
+    path = tmp_path / "salida.xlsx"
+    path.write_bytes(b"anterior")
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(Cancelled):
+        write_company_workbook(path, _index(), pd.DataFrame(), pd.Series(dtype=float), 80.0, cancel=cancel)
+    assert path.read_bytes() == b"anterior"
+    assert [p.name for p in tmp_path.iterdir()] == ["salida.xlsx"]
@@ -0,0 +1,32 @@
+from src.header_detection import HeaderDetector, find_header_index
+
+
+def _kv2c(serial, firmware="5.1", extra_preamble=0):
+    lines = [f"Meter ID,{serial}", "Meter Model,KV2C", f"Firmware Version,{firmware}"]
+    lines += [f"Note {i},x" for i in range(extra_preamble)]
+    lines += [
+        "Set Number,Read Date Time,Channel 1 (Scale Factor),Channel 2 (Scale Factor),Common Flags,",
+        "1,,1.0,1.0,,",
+        "Set Number,Read Date Time,Channel 1,Channel 2,Status Flags,Common Flags",
+        "1,10/01/2025 12:15 AM,1.5,0.5,,",
+    ]
+    return ("\r\n".join(lines) + "\r\n").encode("utf-8")
+
+
+def test_find_header_skips_scale_factor_row():
+    lines = _kv2c("1").decode().splitlines()
+    assert find_header_index(lines) == 5
+
+
+def test_detector_reuses_layout_for_same_model_and_firmware():
+    det = HeaderDetector()
+    first = det.detect(_kv2c("111"), "utf-8")
+    again = det.detect(_kv2c("222"), "utf-8")
+    assert not first["cached"] and again["cached"]
+    assert again["header_index"] == 5
+    assert again["columns"][:4] == ["Set Number", "Read Date Time", "Channel 1", "Channel 2"]
+
+    other_fw = det.detect(_kv2c("333", firmware="6.0"), "utf-8")
+    shifted = det.detect(_kv2c("444", extra_preamble=2), "utf-8")
+    assert not other_fw["cached"] and not shifted["cached"]
+    assert shifted["header_index"] == 7
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+from src.interval_grid import IntervalGrid
+
+
+def test_fold_takes_max_and_skips_off_grid_and_out_of_range():
+    grid = IntervalGrid.from_range(pd.date_range("2025-10-01", periods=4, freq="15min"))
+    ts = pd.to_datetime(pd.Series([
+        "2025-10-01 00:00", "2025-10-01 00:00", "2025-10-01 00:07",
+        "2025-10-01 00:45", "2025-10-01 01:00", None,
+    ]))
+    slots = grid.slots(ts)
+    assert slots.tolist() == [0, 0, -1, 3, -1, -1]
+    assert grid.off_grid == 1
+
+    grid.fold(slots, kwh=np.array([1.0, 3.0, 9.0, np.nan, 9.0, 9.0]),
+              kvarh=np.array([np.nan, 2.0, 9.0, 4.0, 9.0, 9.0]))
+    grid.fold(grid.slots(ts[:1]), kwh=np.array([2.0]))
+    out = grid.to_frame("A")
+    assert out["kwh"].tolist()[:1] == [3.0] and np.isnan(out["kwh"]).tolist() == [False, True, True, True]
+    assert out["kvarh"].fillna(-1).tolist() == [2.0, -1, -1, 4.0]
+    assert out["timestamp"].iloc[-1] == pd.Timestamp("2025-10-01 00:45")
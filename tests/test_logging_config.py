@@ -0,0 +1,41 @@
+import logging
+
+import pytest
+
+from config.logging_config import configure_logging
+from src.csv_processor import CSVProcessor
+from tests.test_csv_processor import _write_kv2c
+
+
+@pytest.fixture
+def restore_root():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield
+    for handler in [h for h in root.handlers if h not in handlers]:
+        root.removeHandler(handler)
+        handler.close()
+    root.setLevel(level)
+
+
+def test_rotating_sink_and_run_summary(tmp_path, restore_root):
+    folder = tmp_path / "datos"
+    folder.mkdir()
+    _write_kv2c(folder / "a.csv")
+    _write_kv2c(folder / "b.csv", serial="2")
+
+    path = configure_logging(tmp_path / "ws", "INFO")
+    configure_logging(tmp_path / "ws", "INFO")
+    assert sum(getattr(h, "_billread", False) for h in logging.getLogger().handlers) == 2
+    ok, _, _ = CSVProcessor().analyze_folder(folder, 10, 2025, "00:00", "23:59")
+    assert ok
+    lines = path.read_text(encoding="utf-8").splitlines()
+    # Una línea de resumen por corrida; nada por archivo ni por columna en INFO
+    assert len(lines) == 1 and "Análisis 10/2025: 2/2 archivos procesados" in lines[0]
+    assert "kv2c=2" in lines[0]
+
+    configure_logging(tmp_path / "ws", "DEBUG")
+    CSVProcessor().analyze_folder(folder, 10, 2025, "00:00", "23:59")
+    assert "[DEBUG] csv_processor" in path.read_text(encoding="utf-8")
+    with pytest.raises(ValueError):
+        configure_logging(None, "VERBOSO")
@@ -0,0 +1,52 @@
+import pandas as pd
+
+from src.multipliers import MultiplierStore
+
+
+def test_store_persists_and_versions(tmp_path):
+    store = MultiplierStore.for_workspace(tmp_path)
+    store.set("ACME", 100)
+    store.set("ACME", 120, effective="01/10/2025")
+
+    reopened = MultiplierStore.for_workspace(tmp_path)
+    assert reopened.get("ACME", on="15/09/2025") == 100
+    assert reopened.get("ACME", on="2025-10-01") == 120
+    assert reopened.get("OTRA") == 80
+
+
+def test_import_csv_and_vectorized_apply(tmp_path):
+    src = tmp_path / "multiplos.csv"
+    src.write_text("Empresa;CT;PT;Vigencia\nA;30;2;\nB;10;1;01/10/2025\nC;x;1;\n", encoding="utf-8")
+    store = MultiplierStore(tmp_path / "m.json")
+    imported, errors = store.import_csv(src)
+    assert imported == 2
+    assert len(errors) == 1
+
+    df = pd.DataFrame({
+        "company": ["A", "B", "B", "Z"],
+        "timestamp": pd.to_datetime(["2025-09-30", "2025-09-30", "2025-10-02", "2025-10-02"]),
+    })
+    assert store.apply(df).tolist() == [60.0, 80.0, 10.0, 80.0]
+    # Timestamps en microsegundos (p. ej. leídos de Parquet): mismas claves que en ns
+    assert store.apply(df.astype({"timestamp": "datetime64[us]"})).tolist() == [60.0, 80.0, 10.0, 80.0]
+
+
+def test_current_multiplier_follows_the_date(tmp_path, monkeypatch):
+    import datetime as dt
+    from src import multipliers
+
+    class FakeDate(dt.date):
+        today_value = dt.date(2025, 9, 30)
+
+        @classmethod
+        def today(cls):
+            return cls.today_value
+
+    monkeypatch.setattr(multipliers, "date", FakeDate)
+    store = MultiplierStore(tmp_path / "m.json")
+    store.set("ACME", 100)
+    store.set("ACME", 120, effective="2025-10-01")
+    assert store.get("ACME") == 100
+    # Sesión abierta pasada la medianoche: entra la nueva vigencia sin recargar
+    FakeDate.today_value = dt.date(2025, 10, 1)
+    assert store.get("ACME") == 120 and store.as_dict() == {"ACME": 120}
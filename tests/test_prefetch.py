@@ -0,0 +1,20 @@
+from src.prefetch import PrefetchReader
+
+
+def test_prefetch_keeps_order_and_memory_cap(tmp_path):
+    paths = []
+    for i in range(6):
+        p = tmp_path / f"f{i}.csv"
+        p.write_bytes(bytes([65 + i]) * 100)
+        paths.append(p)
+    big = tmp_path / "grande.csv"
+    big.write_bytes(b"x" * 1000)
+    paths.insert(3, big)
+
+    reader = PrefetchReader(paths, depth=4, max_bytes=250)
+    out = [(src.path, data) for src, data in reader]
+    assert [p for p, _ in out] == paths
+    # El archivo que no entra en el tope se lee del disco (None)
+    assert dict(out)[big] is None
+    assert dict(out)[paths[0]] == b"A" * 100
+    assert reader.peak_bytes <= 250
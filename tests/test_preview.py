@@ -0,0 +1,45 @@
+from datetime import datetime
+
+import pandas as pd
+
+from src import preview
+from src.csv_processor import CSVProcessor
+from src.preview import guess_timestamp_format, sample_files
+from tests.test_csv_processor import _write_kv2c
+
+
+def test_preview_reads_head_and_tail(tmp_path, monkeypatch):
+    folder = tmp_path / "datos"
+    folder.mkdir()
+    # ~5 días de lecturas: el final queda fuera del inicio leído
+    _write_kv2c(folder / "largo.csv", start="10/01/2025 12:00 AM", periods=500)
+    _write_kv2c(folder / "otro_mes.csv", start="08/01/2025 12:00 AM", periods=12, serial="2")
+    (folder / "roto.csv").write_bytes(b"\x00\x01")
+    monkeypatch.setattr(preview, "PREVIEW_HEAD_BYTES", 2048)
+    monkeypatch.setattr(preview, "PREVIEW_TAIL_BYTES", 512)
+
+    proc = CSVProcessor()
+    ok, msg, results = proc.preview_folder(folder, datetime(2025, 10, 1), datetime(2025, 10, 31, 23, 59))
+    assert ok, msg
+    assert proc.combined_df is None
+    files = {p["filename"]: p for p in results["files"]}
+    big = files["largo.csv"]
+    assert big["header_index"] == 6 and big["format"] == "kv2c"
+    assert big["roles"] == {"timestamp": "Read Date Time", "kwh": ["Channel 1"], "kvarh": ["Channel 2"]}
+    assert big["timestamp_format"] == "%m/%d/%Y %I:%M %p"
+    assert big["sampled_rows"] < 500
+    assert big["last"] == pd.Timestamp("2025-10-01") + pd.Timedelta(minutes=15 * 499)
+    assert files["otro_mes.csv"]["coverage"] == 0
+    assert "error" in files["roto.csv"]
+    assert results["coverage"]["files_in_window"] == 1 and results["coverage"]["files_outside"] == 1
+    assert results["calibrated"] and results["estimated_seconds"] > 0
+
+
+def test_format_guess_and_sampling():
+    day_first = pd.Series([f"{d:02d}/10/2025 00:00" for d in range(1, 20)])
+    assert guess_timestamp_format(day_first) == "%d/%m/%Y %H:%M"
+    # Ambiguo (día ≤ 12): gana el formato que deja las fechas en orden
+    ambiguous = pd.Series([f"{d:02d}/03/2025 10:00:00" for d in range(1, 12)])
+    assert guess_timestamp_format(ambiguous) == "%d/%m/%Y %H:%M:%S"
+    assert guess_timestamp_format(pd.Series(["x", "y"])) is None
+    assert sample_files(list(range(10)), 3) == [0, 4, 9]
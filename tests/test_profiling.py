@@ -0,0 +1,21 @@
+from src.csv_processor import CSVProcessor
+from src.profiling import ProfileCapture
+from tests.test_csv_processor import _write_kv2c
+
+
+def test_capture_writes_profile_and_summary(tmp_path):
+    folder = tmp_path / "datos"
+    folder.mkdir()
+    _write_kv2c(folder / "m.csv")
+    proc = CSVProcessor(tmp_path / "ws")
+
+    with ProfileCapture(proc.logs_dir, "análisis csv") as capture:
+        ok, _, _ = proc.analyze_folder(folder, 10, 2025, "00:00", "23:59")
+    assert ok
+    if not capture.active:
+        return  # otro perfilador (p. ej. cobertura) ocupa el hook de perfilado
+    assert capture.profile_path.parent == proc.logs_dir and capture.profile_path.stat().st_size > 0
+    assert capture.profile_path.name.startswith("profile-análisis_csv-")
+    summary = capture.summary_path.read_text(encoding="utf-8")
+    assert "Duración:" in summary and "analyze_folder" in summary
+    assert "por cumulative" in summary and "por tottime" in summary
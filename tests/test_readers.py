@@ -0,0 +1,50 @@
+from src.csv_processor import CSVProcessor
+from src.readers import KV2CReader, MeterReader, ReaderRegistry
+from tests.test_csv_processor import _write_kv2c
+
+
+class _LoggerReader(MeterReader):
+    name = "logger"
+    timestamp_format = "%Y-%m-%d %H:%M"
+
+    def matches(self, text, name):
+        return text.startswith("logger v2")
+
+    def header_index(self, lines):
+        return next(i for i, line in enumerate(lines) if line.startswith("Instante"))
+
+    def roles(self, columns):
+        return {"timestamp": "Instante", "kwh": ["Activa"], "kvarh": ["Reactiva"], "flags": [], "source": self.name}
+
+
+def _no_detection(*args, **kwargs):
+    raise AssertionError("no debería usarse la detección genérica")
+
+
+def test_registry_detects_by_signature(tmp_path):
+    registry = ReaderRegistry()
+    prefix = _write_kv2c(tmp_path / "m.csv").read_bytes()
+    assert registry.detect(prefix, "m.csv").name == "kv2c"
+    assert registry.detect(b"fecha hora kwh\n", "lecturas.prn").name == "prn"
+    assert registry.detect(b"a,b,c\n1,2,3\n", "otro.csv") is registry.fallback
+    assert KV2CReader().roles(["Read Date Time", "Channel 1"]) is None
+
+
+def test_known_formats_skip_generic_detection(tmp_path, monkeypatch):
+    folder = tmp_path / "datos"
+    folder.mkdir()
+    _write_kv2c(folder / "kv2c.csv")
+    lines = ["logger v2", "", "Instante,Activa,Reactiva,Notas"]
+    lines += [f"2025-10-01 00:{m:02d},{m / 15 + 1},0.5,ok" for m in (0, 15, 30, 45)]
+    (folder / "logger.csv").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    proc = CSVProcessor()
+    proc.readers.register(_LoggerReader())
+    monkeypatch.setattr(proc, "_detect_energy_roles", _no_detection)
+    monkeypatch.setattr(proc, "detect_date_column", _no_detection)
+    ok, _, results = proc.analyze_folder(folder, 10, 2025, "00:00", "23:59")
+    assert ok
+    formats = {d["filename"]: d["format"] for d in results["file_details"]}
+    assert formats == {"kv2c.csv": "kv2c", "logger.csv": "logger"}
+    logger = proc.combined_df[proc.combined_df["company"] == "logger"]
+    assert logger["kwh"].head(4).tolist() == [1.0, 2.0, 3.0, 4.0]
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.reports import format_es_date, hourly_reports, write_report_files
+
+
+def _combined():
+    ts = pd.date_range("2025-10-01", "2025-10-03 23:45", freq="15min")
+    rng = np.random.default_rng(0)
+    parts = [pd.DataFrame({"company": c, "timestamp": ts, "kwh": rng.random(len(ts)), "kvarh": rng.random(len(ts))})
+             for c in ("A", "B")]
+    df = pd.concat(parts, ignore_index=True)
+    df.loc[5, "kwh"] = np.nan
+    return df
+
+
+def _one_company_reference(df, company, start_dt, end_dt, multiplo):
+    # Cálculo fila a fila (una empresa por vez) como referencia
+    cdf = df[(df["company"] == company) & (df["timestamp"] >= start_dt) & (df["timestamp"] <= end_dt)]
+    hourly = cdf.groupby(cdf["timestamp"].dt.floor("h"))[["kwh", "kvarh"]].sum()
+    rows = []
+    cur = datetime(start_dt.year, start_dt.month, start_dt.day)
+    while cur <= end_dt:
+        for h in range(24):
+            t = cur + timedelta(hours=h)
+            kv = hourly.loc[t] if t in hourly.index else None
+            rows.append([format_es_date(cur.date()), h + 1,
+                         round(float(kv["kwh"]) * multiplo if kv is not None else 0.0, 3),
+                         round(float(kv["kvarh"]) * multiplo if kv is not None else 0.0, 3)])
+        cur += timedelta(days=1)
+    return pd.DataFrame(rows, columns=["Fecha", "Hora", "Kwh", "Kvarh"])
+
+
+def test_hourly_reports_match_single_company_tables():
+    df = _combined()
+    start_dt, end_dt = datetime(2025, 10, 1), datetime(2025, 10, 2, 23, 59)
+    window = df[(df["timestamp"] >= start_dt) & (df["timestamp"] <= end_dt)]
+    reports = hourly_reports(window, start_dt, end_dt, {"A": 80.0, "B": 40.0, "C": 10.0}, companies=["A", "B", "C"])
+    for company, m in (("A", 80.0), ("B", 40.0)):
+        report, totals, meta = reports[company]
+        ref = _one_company_reference(df, company, start_dt, end_dt, m)
+        pd.testing.assert_frame_equal(report, ref, check_dtype=False, atol=1e-9)
+        assert totals["kwh"] == pytest.approx(ref["Kwh"].sum())
+        assert meta == {"company": company, "multiplo": m}
+    # Empresa sin lecturas: rejilla completa en cero
+    assert len(reports["C"][0]) == 48 and reports["C"][1] == {"kwh": 0.0, "kvarh": 0.0}
+
+
+def test_write_report_files_in_processes(tmp_path):
+    pytest.importorskip("openpyxl")
+    start_dt, end_dt = datetime(2025, 10, 1), datetime(2025, 10, 1, 23, 59)
+    reports = hourly_reports(_combined(), start_dt, end_dt, {}, companies=["A", "B/1"])
+    written = write_report_files(reports, tmp_path, start_dt, workers=2)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["reporte_A_2025-10.xlsx", "reporte_B_1_2025-10.xlsx"]
+    assert len(written) == 2
+
+
+def test_write_report_files_frozen_uses_threads(tmp_path, monkeypatch):
+    pytest.importorskip("openpyxl")
+    from src import reports as reports_module
+    monkeypatch.setattr(reports_module.sys, "frozen", True, raising=False)
+    monkeypatch.setattr(reports_module, "ProcessPoolExecutor", None)
+    start_dt, end_dt = datetime(2025, 10, 1), datetime(2025, 10, 1, 23, 59)
+    reports = hourly_reports(_combined(), start_dt, end_dt, {}, companies=["A", "B/1"])
+    assert len(write_report_files(reports, tmp_path, start_dt, workers=2)) == 2
+
+
+def test_write_report_files_dedups_sanitized_names(tmp_path):
+    pytest.importorskip("openpyxl")
+    start_dt, end_dt = datetime(2025, 10, 1), datetime(2025, 10, 1, 23, 59)
+    # 'X/Y', 'X:Y' y 'x_y' se sanean al mismo nombre (sin distinguir mayúsculas)
+    reports = hourly_reports(_combined(), start_dt, end_dt, {}, companies=["X/Y", "X:Y", "x_y"])
+    written = write_report_files(reports, tmp_path, start_dt, workers=2)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "reporte_X_Y_2025-10-2.xlsx", "reporte_X_Y_2025-10.xlsx", "reporte_x_y_2025-10-3.xlsx"]
+    assert len(written) == 3
@@ -0,0 +1,74 @@
+import gzip
+import tarfile
+import zipfile
+
+from src.csv_processor import CSVProcessor
+from src.sources import discover_sources
+
+from tests.test_csv_processor import _write_kv2c
+
+
+def _bundle(tmp_path):
+    plain = tmp_path / "plain"
+    plain.mkdir()
+    for i in range(3):
+        _write_kv2c(plain / f"med{i}.csv", start="10/01/2025 12:00 AM", periods=20 + i, serial=str(i))
+    return sorted(plain.glob("*.csv"))
+
+
+def test_archives_match_plain_folder(tmp_path):
+    files = _bundle(tmp_path)
+    ref = CSVProcessor()
+    assert ref.analyze_folder(tmp_path / "plain", 10, 2025, "00:00", "23:59")[0]
+    expected = ref.combined_df.reset_index(drop=True)
+
+    mixed = tmp_path / "mixed"
+    mixed.mkdir()
+    with zipfile.ZipFile(mixed / "bundle.zip", "w") as zf:
+        zf.write(files[0], f"octubre/{files[0].name}")
+    with tarfile.open(mixed / "bundle.tar.gz", "w:gz") as tf:
+        tf.add(files[1], files[1].name)
+    (mixed / f"{files[2].name}.gz").write_bytes(gzip.compress(files[2].read_bytes()))
+    assert sorted(s.name for s in discover_sources(mixed)) == [f.name for f in files]
+
+    proc = CSVProcessor()
+    ok, _, results = proc.analyze_folder(mixed, 10, 2025, "00:00", "23:59")
+    assert ok and results["processed_files"] == 3
+    got = proc.combined_df.sort_values(["company", "timestamp"]).reset_index(drop=True)
+    assert got.equals(expected)
+
+
+def test_archive_as_folder_argument(tmp_path):
+    files = _bundle(tmp_path)
+    archive = tmp_path / "bundle.tgz"
+    with tarfile.open(archive, "w:gz") as tf:
+        for f in files:
+            tf.add(f, f.name)
+    proc = CSVProcessor()
+    ok, _, results = proc.analyze_folder(archive, 10, 2025, "00:00", "23:59")
+    assert ok and results["processed_files"] == 3
+    assert sorted(proc.combined_df["company"].unique()) == [f.stem for f in files]
+
+
+def test_tar_members_are_decompressed_once(tmp_path, monkeypatch):
+    import src.sources as sources
+
+    files = _bundle(tmp_path)
+    archive = tmp_path / "bundle.tar.gz"
+    with tarfile.open(archive, "w:gz") as tf:
+        for f in files:
+            tf.add(f, f.name)
+    opened = []
+    real_open = tarfile.open
+    monkeypatch.setattr(sources.tarfile, "open", lambda *a, **k: opened.append(a[0]) or real_open(*a, **k))
+
+    proc = CSVProcessor()
+    ok, _, results = proc.analyze_folder(archive, 10, 2025, "00:00", "23:59")
+    assert ok and results["processed_files"] == 3
+    # Un listado + una sola pasada de lectura (muestra, serie y proceso salen de la caché)
+    assert len(opened) == 2
+
+    # Con un tope chico se reabre, pero el resultado es el mismo
+    reader = sources.archive_sources(archive)[0]._reader
+    reader.max_bytes = 1
+    assert [reader.read(f.name) for f in reversed(files)] == [f.read_bytes() for f in reversed(files)]
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.combined_index import CombinedIndex, concat_sorted
+from src.csv_processor import CSVProcessor
+
+pytest.importorskip("pyarrow")
+
+from src.spill import SpillStore  # noqa: E402
+
+
+def _month(start, companies=("A", "B", "C")):
+    parts = []
+    for i, company in enumerate(companies):
+        ts = pd.date_range(start, periods=96, freq="15min")
+        parts.append(pd.DataFrame({"company": company, "timestamp": ts, "kwh": np.arange(96.0) + i,
+                                   "kvarh": np.full(96, 0.5)}))
+    return pd.concat(parts, ignore_index=True)
+
+
+def _store(tmp_path, budget):
+    store = SpillStore(budget, tmp_path / "spill")
+    for start in ("2025-10-01", "2025-11-01", "2025-12-01"):
+        store.add(_month(start), key=start[:7])
+    return store
+
+
+def test_spilled_reads_match_memory(tmp_path):
+    memory = CombinedIndex(concat_sorted([_month(s) for s in ("2025-10-01", "2025-11-01", "2025-12-01")]))
+    store = _store(tmp_path, 1)
+    assert store.spilled and store.memory_bytes == 0
+    assert len(list((tmp_path / "spill").rglob("*.parquet"))) == 3
+    assert store.companies == memory.companies and len(store) == len(memory)
+    assert store.time_range("B") == memory.time_range("B")
+
+    start, end = pd.Timestamp("2025-10-01 12:00"), pd.Timestamp("2025-11-01 06:00")
+    pd.testing.assert_frame_equal(store.slice("B", start, end).reset_index(drop=True),
+                                  memory.slice("B", start, end).reset_index(drop=True))
+    pd.testing.assert_frame_equal(store.slice(None, start, end).reset_index(drop=True),
+                                  memory.slice(None, start, end).reset_index(drop=True))
+    # Bloques de empresas completas, en orden, con todas las filas
+    batches = list(store.batches())
+    assert [c for batch, _ in batches for c in batch] == ["A", "B", "C"]
+    assert sum(len(df) for _, df in batches) == len(memory)
+
+    store.cleanup()
+    assert not list((tmp_path / "spill").rglob("*.parquet"))
+
+
+def test_processor_exports_from_spilled_partitions(tmp_path):
+    paths = {}
+    for budget in (None, 1):
+        proc = CSVProcessor(tmp_path / f"ws{budget}")
+        proc.memory_budget_mb = budget and 1e-6
+        store = proc.new_result_store()
+        for start in ("2025-10-01", "2025-11-01"):
+            store.add(_month(start))
+        proc.set_partitions(store)
+        assert proc.has_data()
+        assert (proc.combined_df is None) == bool(budget)
+        paths[budget] = tmp_path / f"out{budget}.csv"
+        ok, msg = proc.export_combined_csv(paths[budget], chunk_rows=100)
+        assert ok, msg
+        assert len(proc.get_slice("C", pd.Timestamp("2025-11-01"), pd.Timestamp("2025-11-01 23:59"))) == 96
+    assert paths[1].read_text(encoding="utf-8-sig") == paths[None].read_text(encoding="utf-8-sig")
+
+    proc.clear_data()
+    assert not proc.has_data()
+    assert not list((tmp_path / "ws1" / "cache" / "spill").rglob("*.parquet"))
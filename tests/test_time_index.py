@@ -0,0 +1,39 @@
+import pandas as pd
+
+from src.time_index import TimeIndex, TimeIndexCache
+
+
+def _parse_day(text):
+    return pd.to_datetime(text).date()
+
+
+def _write(path, stamps):
+    lines = ["Meter ID,1", "Fecha,Valor"] + [f"{t:%Y-%m-%d %H:%M},{i}" for i, t in enumerate(stamps)]
+    path.write_bytes(("\n".join(lines) + "\n").encode("utf-8"))
+    return path
+
+
+def test_byte_range_covers_window_with_margin(tmp_path):
+    stamps = pd.date_range("2025-01-01", periods=96 * 10, freq="15min")
+    path = _write(tmp_path / "m.csv", stamps)
+    index = TimeIndex.build(path, 1, 0, _parse_day)
+    assert len(index.days) == 10
+    assert path.read_bytes()[index.header_offset:index.data_offset] == b"Fecha,Valor\n"
+
+    lo, hi = index.byte_range(pd.Timestamp("2025-01-05"), pd.Timestamp("2025-01-06 23:45"))
+    chunk = path.read_bytes()[lo:hi].decode().splitlines()
+    assert chunk[0].startswith("2025-01-04 00:00") and chunk[-1].startswith("2025-01-07 23:45")
+    assert index.byte_range(pd.Timestamp("2026-01-01"), pd.Timestamp("2026-01-31")) == (index.size, index.size)
+
+
+def test_cache_rejects_unsorted_and_rebuilds_on_change(tmp_path):
+    stamps = pd.date_range("2025-01-01", periods=96 * 3, freq="15min")
+    path = _write(tmp_path / "m.csv", stamps[::-1])
+    cache = TimeIndexCache(tmp_path / "cache", min_bytes=0)
+    assert cache.get(path, 1, 0, _parse_day) is None
+
+    _write(path, stamps)
+    index = cache.get(path, 1, 0, _parse_day)
+    assert index is not None and len(index.days) == 3
+    # Otra instancia lee el sidecar del disco
+    assert TimeIndexCache(tmp_path / "cache", min_bytes=0).get(path, 1, 0, _parse_day).days == index.days
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from src import utils
+from src.utils import atomic_write
+
+
+@pytest.mark.skipif(os.name == "nt", reason="permisos POSIX")
+def test_atomic_write_keeps_regular_permissions(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "_UMASK", 0o022)
+
+    def no_umask(mask):
+        raise AssertionError("la umask del proceso no se toca al escribir")
+
+    monkeypatch.setattr(utils.os, "umask", no_umask)
+    new = tmp_path / "nuevo.csv"
+    with atomic_write(new) as tmp:
+        tmp.write_text("a,b\n")
+    assert new.stat().st_mode & 0o777 == 0o644
+
+    existing = tmp_path / "existente.csv"
+    existing.write_text("viejo\n")
+    existing.chmod(0o664)
+    with atomic_write(existing) as tmp:
+        tmp.write_text("nuevo\n")
+    assert existing.read_text() == "nuevo\n" and existing.stat().st_mode & 0o777 == 0o664
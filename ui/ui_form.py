@@ -5,10 +5,12 @@ import tkinter as tk
 from pathlib import Path
 import math
 import re
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 from tkinter import ttk, filedialog, messagebox
 from tkcalendar import DateEntry
 from collections import defaultdict
+import numpy as np
 import pandas as pd
 
 try:
@@ -22,20 +24,22 @@ try:
     from src.ui_components import run_ui
 except Exception:
     run_ui = None
+from config.logging_config import configure_logging
+from config.settings import CSV_BACKEND, LOG_LEVEL, LOG_TO_FILE, MEMORY_BUDGET_MB
 from src.csv_processor import CSVProcessor
+from src.downsample import DEFAULT_METHOD, DOWNSAMPLE_METHODS, curve_points, finite_runs
+from src.energy_units import frame_to_display, multiply
+from src.events import CompanyTotals, FileCompleted, FileFailed
+from src.excel_exports import write_company_workbook, write_report_excel
+from src.multipliers import MultiplierStore
+from src.preview import preview_lines
+from src.profiling import ProfileCapture
+from src.reports import hourly_reports, write_report_book, write_report_files
+from src.utils import Cancelled, check_cancel
 
 
-MONTH_ABBR_ES = {
-    1: "ene", 2: "feb", 3: "mar", 4: "abr", 5: "may", 6: "jun",
-    7: "jul", 8: "ago", 9: "sep", 10: "oct", 11: "nov", 12: "dic"
-}
-
-def format_es_date(d: datetime.date) -> str:
-    # 1-ago-25
-    return f"{d.day}-{MONTH_ABBR_ES.get(d.month, '')}-{d.strftime('%y')}"
-
 class CSVUploaderApp:
-    def __init__(self, root):
+    def __init__(self, root, profile: bool = False):
         self.root = root
         self.root.title("Lecturas KV2C - v2.0")
         # Escalado para pantallas FHD/4K
@@ -57,14 +61,23 @@ class CSVUploaderApp:
         # Procesador
         workspace_path = Path.home() / "Downloads" / "BILLREAD_WORKSPACE"
         workspace_path.mkdir(parents=True, exist_ok=True)
+        # Consola + archivo rotativo en <workspace>/logs (resúmenes por corrida; detalle en DEBUG)
+        configure_logging(workspace_path if LOG_TO_FILE else None, LOG_LEVEL)
         self.csv_processor = run_ui(workspace_path) if run_ui else CSVProcessor(workspace_path)
+        self.csv_processor.csv_backend = CSV_BACKEND
+        self.csv_processor.memory_budget_mb = MEMORY_BUDGET_MB
 
         # UI
+        self.profile_var = tk.BooleanVar(value=profile)
+        self._build_menu()
         self.create_widgets()
         self._build_statusbar()
 
-        self.company_multipliers = {}  # cache por empresa
+        # Registro persistente de multiplos por empresa (JSON en el workspace)
+        self.company_multipliers = MultiplierStore.for_workspace(workspace_path, default=self.default_multiplier)
         self.last_report = None        # (df, totals, meta)
+        self._job_cancel = None        # threading.Event del trabajo en curso (análisis o exportación)
+        self._analyzing = False        # el análisis reemplaza combined_df y las particiones en disco
 
     # ---------- Estilo ----------
     def _init_style(self):
@@ -168,11 +181,12 @@ class CSVUploaderApp:
         for i in range(6):
             opts.columnconfigure(i, weight=0)
 
-        # Carpeta
+        # Carpeta (o archivo comprimido .zip/.gz/.tar.gz con los CSV/PRN)
         ttk.Label(opts, text="Carpeta").grid(row=0, column=0, sticky="w")
         self.folder_path = ttk.Entry(opts, width=40)
-        self.folder_path.grid(row=0, column=1, columnspan=4, sticky="ew", padx=8)
-        ttk.Button(opts, text="Examinar...", command=self.browse_folder).grid(row=0, column=5, sticky="e")
+        self.folder_path.grid(row=0, column=1, columnspan=3, sticky="ew", padx=8)
+        ttk.Button(opts, text="Examinar...", command=self.browse_folder).grid(row=0, column=4, sticky="e")
+        ttk.Button(opts, text="Comprimido...", command=self.browse_archive).grid(row=0, column=5, sticky="e", padx=(4, 0))
 
         # Resolución
         ttk.Label(opts, text="Resolución").grid(row=1, column=0, sticky="w", pady=(8, 0))
@@ -221,9 +235,18 @@ class CSVUploaderApp:
         self.multiplier_sp.bind('<FocusOut>', lambda e: self._on_multiplier_change())
         self.multiplier_sp.bind('<Return>', lambda e: self._on_multiplier_change())
 
+        # Historial local (SQLite en el workspace)
+        self.history_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(opts, text="Guardar historial local", variable=self.history_var,
+                        command=self._on_history_toggle).grid(row=6, column=0, columnspan=3, sticky="w", pady=(8, 0))
+        # Energía en enteros (milésimas de kWh): totales exactos, se aplica al próximo análisis
+        self.fixed_point_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(opts, text="Energía exacta (enteros)", variable=self.fixed_point_var,
+                        command=self._on_fixed_point_toggle).grid(row=6, column=3, columnspan=3, sticky="w", pady=(8, 0))
+
         # Botonera
         btns = ttk.Frame(opts)
-        btns.grid(row=6, column=0, columnspan=6, sticky="ew", pady=(12, 0))
+        btns.grid(row=7, column=0, columnspan=6, sticky="ew", pady=(12, 0))
         btns.columnconfigure(0, weight=1)
         ttk.Button(btns, text="Analizar CSV", style="Accent.TButton", command=self.analyze_folder).grid(row=0, column=0, sticky="ew")
         ttk.Button(btns, text="Analizar PRN", command=self.analyze_folder_prn).grid(row=0, column=1, sticky="ew", padx=(8, 0))
@@ -237,6 +260,16 @@ class CSVUploaderApp:
         self.clear_btn.grid(row=2, column=0, sticky="ew", pady=(8, 0))
         self.report_btn = ttk.Button(btns, text="Generar reporte mensual", command=self.generate_report, state="disabled")
         self.report_btn.grid(row=2, column=1, sticky="ew", padx=(8, 0), pady=(8, 0))
+        # Sesiones (Parquet/Feather)
+        self.save_session_btn = ttk.Button(btns, text="Guardar sesión", command=self.save_session, state="disabled")
+        self.save_session_btn.grid(row=3, column=0, sticky="ew", pady=(8, 0))
+        ttk.Button(btns, text="Abrir sesión", command=self.open_session).grid(row=3, column=1, sticky="ew", padx=(8, 0), pady=(8, 0))
+        ttk.Button(btns, text="Importar multiplos", command=self.import_multipliers).grid(row=4, column=0, sticky="ew", pady=(8, 0))
+        self.batch_report_btn = ttk.Button(btns, text="Reportes (todas)", command=self.generate_all_reports, state="disabled")
+        self.batch_report_btn.grid(row=4, column=1, sticky="ew", padx=(8, 0), pady=(8, 0))
+        self.curve_btn = ttk.Button(btns, text="Curva de carga", command=self.show_load_curve, state="disabled")
+        self.curve_btn.grid(row=5, column=0, sticky="ew", pady=(8, 0))
+        ttk.Button(btns, text="Vista previa", command=self.preview_folder).grid(row=5, column=1, sticky="ew", padx=(8, 0), pady=(8, 0))
 
         # Panel de resultados (log)
         right = ttk.Labelframe(body, text="Registro y resultados", style="Section.TLabelframe")
@@ -250,6 +283,15 @@ class CSVUploaderApp:
         self.info_text.grid(row=0, column=0, sticky="nsew")
         yscroll.grid(row=0, column=1, sticky="ns")
 
+        # Totales por empresa: se llenan a medida que terminan los archivos (kWh crudos, sin multiplo)
+        cols = ("Empresa", "kWh", "kVArh", "Intervalos", "Archivos")
+        self.company_tree = ttk.Treeview(right, columns=cols, show="headings", height=6)
+        for c, w in [("Empresa", 180), ("kWh", 110), ("kVArh", 110), ("Intervalos", 80), ("Archivos", 70)]:
+            self.company_tree.heading(c, text=c)
+            self.company_tree.column(c, width=w, anchor="w" if c == "Empresa" else "e")
+        self.company_tree.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(8, 0))
+        self.company_totals = CompanyTotals()
+
         # Permitir expandir el panel derecho
         body.rowconfigure(0, weight=1)
         body.columnconfigure(1, weight=1)
@@ -262,6 +304,8 @@ class CSVUploaderApp:
         self.status_label.grid(row=0, column=0, sticky="w")
         self.progress = ttk.Progressbar(bar, mode="indeterminate", length=160)
         self.progress.grid(row=0, column=1, sticky="e")
+        self.cancel_btn = ttk.Button(bar, text="Cancelar", command=self.cancel_background, state="disabled")
+        self.cancel_btn.grid(row=0, column=2, sticky="e", padx=(8, 0))
 
     # ---------- Utilidades UI ----------
     def set_busy(self, busy: bool, msg: str = ""):
@@ -293,12 +337,95 @@ class CSVUploaderApp:
             except Exception:
                 pass
 
+    # ---------- Trabajos en segundo plano (exportaciones) ----------
+    def _build_menu(self):
+        menubar = tk.Menu(self.root)
+        tools = tk.Menu(menubar, tearoff=0)
+        # Perfil cProfile de cada análisis/exportación en <workspace>/logs (ver src/profiling.py)
+        tools.add_checkbutton(label="Perfilar análisis y exportaciones", variable=self.profile_var)
+        menubar.add_cascade(label="Herramientas", menu=tools)
+        self.root.config(menu=menubar)
+
+    def _maybe_profile(self, label: str, fn, profile: bool):
+        """
+        Corre fn() en el hilo actual; con 'profile' deja .prof + resumen en logs.
+        'profile' se lee de profile_var en el hilo de Tk, antes de lanzar el hilo de trabajo.
+        """
+        if not profile:
+            return fn()
+        capture = ProfileCapture(getattr(self.csv_processor, "logs_dir", None), label)
+        try:
+            with capture:
+                return fn()
+        finally:
+            if capture.active:
+                self.root.after(0, lambda: self.append_info(f"Perfil guardado: {capture.summary_path}"))
+
+    def _run_background(self, label: str, job, on_success):
+        """
+        Corre job(progress_cb, cancel) en un hilo, igual que el análisis: la UI
+        solo se toca vía root.after. El progreso va a la barra de estado.
+        """
+        if self._busy():
+            return
+        cancel = threading.Event()
+        self._job_cancel = cancel
+        self.set_busy(True, label)
+        self.cancel_btn.configure(state="normal")
+        profile = self.profile_var.get()
+
+        def progress_cb(msg: str):
+            self.root.after(0, lambda: self.status_label.config(text=msg))
+
+        def worker():
+            try:
+                result = self._maybe_profile(label.rstrip("…"), lambda: job(progress_cb, cancel), profile)
+            except Cancelled:
+                self.root.after(0, lambda: self.append_info(f"{label.rstrip('…')}: cancelado"))
+            except Exception as e:
+                err = str(e)
+                self.root.after(0, lambda: self.show_error(err))
+            else:
+                self.root.after(0, lambda: on_success(result))
+            finally:
+                self.root.after(0, self._background_done)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _busy(self, title: str = "Ocupado") -> bool:
+        """Un trabajo a la vez: análisis y exportaciones comparten el mismo guardia."""
+        if self._job_cancel is None:
+            return False
+        what = "un análisis" if self._analyzing else "una exportación"
+        messagebox.showinfo(title, f"Ya hay {what} en curso.")
+        return True
+
+    def _background_done(self):
+        self._job_cancel = None
+        self._analyzing = False
+        self.cancel_btn.configure(state="disabled")
+        self.set_busy(False, "Listo")
+
+    def cancel_background(self):
+        if self._job_cancel is not None:
+            self._job_cancel.set()
+            self.status_label.config(text="Cancelando…")
+
     def browse_folder(self):
         folder = filedialog.askdirectory(title="Selecciona carpeta con archivos")
         if folder:
             self.folder_path.delete(0, tk.END)
             self.folder_path.insert(0, folder)
 
+    def browse_archive(self):
+        path = filedialog.askopenfilename(
+            title="Selecciona archivo comprimido con archivos",
+            filetypes=[("Comprimidos", "*.zip *.gz *.tgz *.tar"), ("Todos", "*.*")]
+        )
+        if path:
+            self.folder_path.delete(0, tk.END)
+            self.folder_path.insert(0, path)
+
     # ---------- Saneo de horas/minutos ----------
     def _sanitize_time_inputs(self):
         def to_int(v, default):
@@ -326,6 +453,33 @@ class CSVUploaderApp:
     def analyze_folder(self):
         self._run_analysis("csv")
 
+    def preview_folder(self):
+        """Vista previa rápida (inicio/final de una muestra de archivos) antes de analizar."""
+        folder_path = self.folder_path.get()
+        if not folder_path or not os.path.exists(folder_path):
+            messagebox.showerror("Error", "Selecciona una carpeta válida")
+            return
+        sdate = self.start_date.get_date()
+        edate = self.end_date.get_date()
+        sh, sm, eh, em = self._sanitize_time_inputs()
+        start_dt = datetime(sdate.year, sdate.month, sdate.day, sh, sm)
+        end_dt = datetime(edate.year, edate.month, edate.day, eh, em)
+
+        def job(progress_cb, cancel):
+            ok, msg, results = self.csv_processor.preview_folder(Path(folder_path), start_dt, end_dt,
+                                                                 progress_cb=progress_cb)
+            if not ok:
+                raise RuntimeError(msg)
+            return msg, results
+
+        def done(outcome):
+            msg, results = outcome
+            self.append_info(msg)
+            for line in preview_lines(results):
+                self.append_info(line)
+
+        self._run_background("Vista previa…", job, done)
+
     def analyze_folder_prn(self):
         self._run_analysis("prn")
 
@@ -346,16 +500,26 @@ class CSVUploaderApp:
             return
 
         resolution = self.resolution.get()
+        if self._busy("Analizar"):
+            return
+        # Mismo guardia que las exportaciones (sin cancelación: el análisis corre mes a mes)
+        self._job_cancel = threading.Event()
+        self._analyzing = True
 
         # Preparar UI
         self.info_text.configure(state="normal")
         self.info_text.delete("1.0", "end")
         self.info_text.configure(state="disabled")
+        self._reset_company_totals()
         self.set_busy(True, "Procesando…")
 
         def progress_cb(msg: str):
             self.root.after(0, lambda: self.append_info(msg))
 
+        def event_cb(event):
+            # Llega desde el hilo del análisis: se aplica en el hilo de Tk
+            self.root.after(0, lambda: self._on_analysis_event(event))
+
         def month_span(s, e):
             y, m = s.year, s.month
             while (y < e.year) or (y == e.year and m <= e.month):
@@ -368,8 +532,12 @@ class CSVUploaderApp:
         def worker():
             try:
                 months = list(month_span(sdate, edate))
-                monthly_dfs, all_details = [], []
-                total_files = total_processed = total_errors = 0
+                # Un mes por partición: pasado el presupuesto de memoria se vuelcan a disco
+                store = self.csv_processor.new_result_store()
+                all_details = []
+                months_ok = total_files = total_processed = total_errors = 0
+                before_rows = after_parse_rows = after_filter_rows = total_rows = kwh_values = kvar_values = 0
+                columns = []
                 last_folder = folder_path
 
                 for (yy, mm) in months:
@@ -387,61 +555,61 @@ class CSVUploaderApp:
                     if file_type == "csv":
                         ok, msg, results = self.csv_processor.analyze_folder(
                             Path(folder_path), mes_usuario=mm, año_usuario=yy,
-                            start_time=s_t, end_time=e_t, progress_cb=progress_cb
+                            start_time=s_t, end_time=e_t, progress_cb=progress_cb, event_cb=event_cb
                         )
                     else:
                         if hasattr(self.csv_processor, "analyze_folder_prn"):
                             ok, msg, results = self.csv_processor.analyze_folder_prn(
                                 Path(folder_path), mes_usuario=mm, año_usuario=yy,
-                                start_time=s_t, end_time=e_t, progress_cb=progress_cb
+                                start_time=s_t, end_time=e_t, progress_cb=progress_cb, event_cb=event_cb
                             )
                         else:
                             ok, msg, results = False, "Función PRN no disponible", None
 
                     if ok and getattr(self.csv_processor, "combined_df", None) is not None:
-                        monthly_dfs.append(self.csv_processor.combined_df.copy())
+                        index = self.csv_processor.combined_index
+                        before_rows += len(index)
+                        after_parse_rows += index.valid_rows
+
+                        # Filtro por rango final: corte por searchsorted (excluye timestamps inválidos)
+                        if "timestamp" in index.df.columns:
+                            part = index.slice(None, start_dt, end_dt)
+                        else:
+                            part = index.df
+                        after_filter_rows += part.shape[0]
+
+                        if resolution == "1h" and not part.empty and "timestamp" in part.columns:
+                            agg_cols = {c: "sum" for c in ["kwh", "kvarh"] if c in part.columns}
+                            # Claves como Series: agrupa sin agregar una columna (copia) al frame;
+                            # las horas no cruzan meses, así que se agrega mes a mes
+                            part = (part.groupby([part["company"], part["timestamp"].dt.floor("h")])
+                                    .agg(agg_cols).reset_index())
+
+                        total_rows += len(part)
+                        kwh_values += int(pd.notna(part["kwh"]).sum()) if "kwh" in part.columns else 0
+                        kvar_values += int(pd.notna(part["kvarh"]).sum()) if "kvarh" in part.columns else 0
+                        columns = columns or list(part.columns)
+                        # Cada análisis arma un frame nuevo: no hace falta copiarlo
+                        store.add(part, key=f"{yy}-{mm:02d}")
+                        self.csv_processor.combined_df = None
+                        months_ok += 1
                         all_details.extend(results.get("file_details", []))
                         total_files += results.get("total_files", 0)
                         total_processed += results.get("processed_files", 0)
                         total_errors += results.get("error_files", 0)
                         last_folder = results.get("folder", last_folder)
 
-                if not monthly_dfs:
+                if not months_ok:
                     self.root.after(0, lambda: self.set_busy(False, "Sin datos"))
                     self.root.after(0, lambda: self.append_info("No se generaron datos"))
                     return
 
-                combined = pd.concat(monthly_dfs, ignore_index=True)
-
-                # Normalizar timestamp si no es datetime
-                if "timestamp" in combined.columns and not pd.api.types.is_datetime64_any_dtype(combined["timestamp"]):
-                    # Intentos múltiples de parseo
-                    combined["timestamp"] = pd.to_datetime(
-                        combined["timestamp"].astype(str).str.strip(),
-                        errors="coerce", dayfirst=True
-                    )
-                # Eliminar filas sin timestamp válido
-                if "timestamp" in combined.columns:
-                    before_rows = combined.shape[0]
-                    combined = combined[pd.notna(combined["timestamp"])].copy()
-                    after_parse_rows = combined.shape[0]
-                else:
-                    before_rows = combined.shape[0]
-                    after_parse_rows = before_rows
-
-                # Filtro por rango final
-                if "timestamp" in combined.columns:
-                    combined = combined[(combined["timestamp"] >= start_dt) & (combined["timestamp"] <= end_dt)]
-                after_filter_rows = combined.shape[0]
-
-                if resolution == "1h" and not combined.empty and "timestamp" in combined.columns:
-                    combined["hour_ts"] = combined["timestamp"].dt.floor("H")
-                    agg_cols = {c: "sum" for c in ["kwh", "kvarh"] if c in combined.columns}
-                    grouped = combined.groupby(["company", "hour_ts"], as_index=False).agg(agg_cols)
-                    combined = grouped.rename(columns={"hour_ts": "timestamp"})
-                    combined = combined.sort_values(["company", "timestamp"]).reset_index(drop=True)
-
-                self.csv_processor.combined_df = combined
+                # Meses ya ordenados por empresa/tiempo: en memoria se intercalan por empresa en
+                # un solo concat; si se pasó el presupuesto, quedan en disco y se leen al pedirlos
+                spilled = store.spilled
+                self.csv_processor.set_partitions(store)
+                if spilled:
+                    progress_cb(f"Memoria: {store.partitions} meses, parte volcada a disco (cache/spill)")
 
                 # Agregados y detalles
                 fmt = "%d/%m/%y %H:%M"
@@ -479,10 +647,10 @@ class CSVUploaderApp:
                         "end": end_dt.strftime("%d/%m/%y %H:%M")
                     },
                     "combined_stats": {
-                        "total_rows": int(combined.shape[0]),
-                        "total_columns": int(combined.shape[1]),
-                        "total_kwh_values": int(pd.notna(combined["kwh"]).sum()) if "kwh" in combined.columns else 0,
-                        "total_kvar_values": int(pd.notna(combined["kvarh"]).sum()) if "kvarh" in combined.columns else 0,
+                        "total_rows": total_rows,
+                        "total_columns": len(columns),
+                        "total_kwh_values": kwh_values,
+                        "total_kvar_values": kvar_values,
                         "resolution": resolution,
                         "rows_before_parse": before_rows,
                         "rows_after_parse": after_parse_rows,
@@ -493,11 +661,14 @@ class CSVUploaderApp:
                 }
                 self.root.after(0, lambda: self.on_analysis_done(True, f"Procesamiento {file_type.upper()} completado", results_agg))
             except Exception as e:
-                self.root.after(0, lambda: self.show_error(str(e)))
+                err = str(e)
+                self.root.after(0, lambda: self.show_error(err))
             finally:
-                self.root.after(0, lambda: self.set_busy(False, "Listo"))
+                self.root.after(0, self._background_done)
 
-        threading.Thread(target=worker, daemon=True).start()
+        profile = self.profile_var.get()
+        threading.Thread(target=lambda: self._maybe_profile(f"analisis-{file_type}", worker, profile),
+                         daemon=True).start()
 
     def append_info(self, text: str):
         self.info_text.configure(state="normal")
@@ -512,28 +683,82 @@ class CSVUploaderApp:
         self.info_text.configure(state="disabled")
         self.export_excel_btn.configure(state="disabled")
         self.export_csv_btn.configure(state="disabled")
+        self.save_session_btn.configure(state="disabled")
+        self._reset_company_totals()
         self.append_info("Panel limpiado.")
         self.last_results = None
         self.csv_processor.combined_df = None
 
     # --- Utilidades reporte ---
+    def _reset_company_totals(self):
+        self.company_totals = CompanyTotals()
+        self.company_tree.delete(*self.company_tree.get_children())
+
+    def _on_analysis_event(self, event):
+        """Resultados parciales: fila de la empresa y lista de empresas crecen durante el análisis."""
+        self.company_totals(event)
+        if isinstance(event, FileCompleted):
+            t = self.company_totals.totals[event.company]
+            row = (event.company, f"{t['kwh']:,.3f}", f"{t['kvarh']:,.3f}",
+                   f"{max(t['kwh_values'], t['kvar_values']):,}", t["files"])
+            if self.company_tree.exists(event.company):
+                self.company_tree.item(event.company, values=row)
+            else:
+                # Orden alfabético, como la lista de empresas
+                names = self.company_tree.get_children()
+                pos = next((i for i, n in enumerate(names) if n > event.company), "end")
+                self.company_tree.insert("", pos, iid=event.company, values=row)
+            self.company_cb.configure(values=self.company_totals.companies)
+        if isinstance(event, (FileCompleted, FileFailed)):
+            self.status_label.config(text=f"Procesando {event.period}… {event.index}/{event.total_files} archivos")
+
     def populate_companies(self):
-        df = getattr(self.csv_processor, "combined_df", None)
-        if df is None or df.empty:
+        has_data = self.csv_processor.has_data()
+        # Empresas del índice (sin company se usa "General") + las del historial local:
+        # el reporte mensual de una empresa lee el historial (get_slice); el resto, el análisis actual
+        companies = set(self.csv_processor.combined_index.companies) if has_data else set()
+        store = self.csv_processor.interval_store
+        if store is not None:
+            try:
+                companies.update(store.companies())
+            except Exception as e:
+                self.append_info(f"[WARN] No se pudo leer el historial local: {e}")
+        if not companies:
             self.company_cb.configure(state="disabled", values=[])
             self.report_btn.configure(state="disabled")
+            self.batch_report_btn.configure(state="disabled")
+            self.curve_btn.configure(state="disabled")
             return
-        if "company" in df.columns:
-            companies = sorted([str(x) for x in df["company"].dropna().unique().tolist()])
-        else:
-            companies = ["General"]
-            df["company"] = "General"
+        companies = sorted(companies)
         self.company_cb.configure(state="readonly", values=companies)
-        if not self.company_cb.get():
+        if self.company_cb.get() not in companies:
             self.company_cb.set(companies[0])
         # Al poblar, refleja el multiplo para la empresa actual (si existe)
         self._on_company_selected()
         self.report_btn.configure(state="normal")
+        self.batch_report_btn.configure(state="normal" if has_data else "disabled")
+        self.curve_btn.configure(state="normal" if has_data else "disabled")
+
+    def _on_fixed_point_toggle(self):
+        self.csv_processor.fixed_point_dtype = "Int32" if self.fixed_point_var.get() else None
+
+    def _on_history_toggle(self):
+        try:
+            if self.history_var.get():
+                store = self.csv_processor.enable_interval_store()
+                first, last = store.time_range()
+                if first is not None:
+                    self.append_info(f"Historial local: {first:%d/%m/%Y} - {last:%d/%m/%Y}")
+                    self.append_info("El historial alimenta el reporte mensual por empresa; "
+                                     "Exportar Excel/CSV, reportes (todas) y la curva usan el análisis actual.")
+                else:
+                    self.append_info("Historial local activado (vacío)")
+            else:
+                self.csv_processor.disable_interval_store()
+            self.populate_companies()
+        except Exception as e:
+            self.history_var.set(False)
+            self.show_error(f"No se pudo abrir el historial local: {e}")
 
     # --- Multiplo por empresa: sincronización UI <-> cache ---
     def _on_company_selected(self, event=None):
@@ -542,9 +767,7 @@ class CSVUploaderApp:
         company = self.company_cb.get()
         if not company:
             return
-        val = self.company_multipliers.get(company)
-        if val is None:
-            val = getattr(self, 'default_multiplier', 80)
+        val = self.company_multipliers.get(company, on=self._multiplier_effective_date())
         try:
             self.multiplier_sp.set(str(int(val)))
         except Exception:
@@ -559,83 +782,55 @@ class CSVUploaderApp:
             m = float(self.multiplier_sp.get())
         except Exception:
             return
-        self.company_multipliers[company] = m
-
-    def _hourly_aggregate(self, df):
-        # Asegura timestamp datetime, agrega por hora
-        if "timestamp" not in df.columns:
-            return df.iloc[0:0].copy()
-        if not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
-            df = df.copy()
-            df["timestamp"] = pd.to_datetime(df["timestamp"].astype(str), errors="coerce", dayfirst=True)
-            df = df[pd.notna(df["timestamp"])]
-        df["hour_ts"] = df["timestamp"].dt.floor("H")
-        agg_cols = {}
-        if "kwh" in df.columns:
-            agg_cols["kwh"] = "sum"
-        if "kvarh" in df.columns:
-            agg_cols["kvarh"] = "sum"
-        if not agg_cols:
-            return df.iloc[0:0].copy()
-        g = df.groupby("hour_ts", as_index=True).agg(agg_cols)
-        return g
+        if m != self.company_multipliers.get(company, on=self._multiplier_effective_date()):
+            self.company_multipliers.set(company, m, effective=self._multiplier_effective_date())
+
+    def _multiplier_effective_date(self):
+        """Los multiplos editados en la UI rigen desde el primer día del mes de inicio."""
+        return self.start_date.get_date().replace(day=1)
+
+    def import_multipliers(self):
+        path = filedialog.askopenfilename(
+            filetypes=[("CSV", "*.csv"), ("Todos", "*.*")],
+            title="Importar multiplos por empresa"
+        )
+        if not path:
+            return
+        try:
+            imported, errors = self.company_multipliers.import_csv(path)
+        except Exception as e:
+            self.show_error(f"No se pudieron importar multiplos: {e}")
+            return
+        self.append_info(f"Multiplos importados: {imported} ({len(errors)} con error)")
+        for err in errors[:20]:
+            self.append_info(f"  - {err}")
+        self._on_company_selected()
 
     def compute_report_table(self, company: str, start_dt: datetime, end_dt: datetime, multiplo: float):
-        df = getattr(self.csv_processor, "combined_df", None)
-        if df is None or df.empty:
+        has_history = getattr(self.csv_processor, "interval_store", None) is not None
+        if not self.csv_processor.has_data() and not has_history:
             return pd.DataFrame(), {"kwh": 0.0, "kvarh": 0.0}, {}
-        # Filtrar por empresa y rango
-        if "company" in df.columns:
-            df = df[df["company"].astype(str) == str(company)].copy()
-        # Ajustar rango
-        if "timestamp" in df.columns:
-            if not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
-                df["timestamp"] = pd.to_datetime(df["timestamp"].astype(str), errors="coerce", dayfirst=True)
-                df = df[pd.notna(df["timestamp"])]
-            df = df[(df["timestamp"] >= start_dt) & (df["timestamp"] <= end_dt)]
-        # Agregado por hora
-        hourly = self._hourly_aggregate(df)  # index: hour_ts
-        # Crear rejilla de días/24h
-        rows = []
-        cur = datetime(start_dt.year, start_dt.month, start_dt.day)
-        end_day = datetime(end_dt.year, end_dt.month, end_dt.day)
-        while cur <= end_day:
-            for h in range(24):
-                ts = cur + timedelta(hours=h)
-                kv = hourly.loc[ts] if ts in hourly.index else None
-                kwh = float(kv["kwh"]) if kv is not None and "kwh" in hourly.columns else 0.0
-                kvarh = float(kv["kvarh"]) if kv is not None and "kvarh" in hourly.columns else 0.0
-                # Aplicar multiplo a valores por hora
-                kwh_scaled = kwh * multiplo
-                kvarh_scaled = kvarh * multiplo
-                rows.append({
-                    "Fecha": format_es_date(cur.date()),
-                    "Hora": h + 1,  # 1..24
-                    "Kwh": round(kwh_scaled, 3),
-                    "Kvarh": round(kvarh_scaled, 3),
-                })
-            cur += timedelta(days=1)
-        report = pd.DataFrame(rows, columns=["Fecha", "Hora", "Kwh", "Kvarh"])
-        totals = {
-            # Totales = suma de valores ya multiplicados (NO se vuelve a multiplicar)
-            "kwh": float(report["Kwh"].sum()),
-            "kvarh": float(report["Kvarh"].sum()),
-        }
-        meta = {"company": company, "multiplo": multiplo}
-        return report, totals, meta
+        # Filtrar por empresa y rango (combined_df o historial local)
+        df = self.csv_processor.get_slice(company, start_dt, end_dt)
+        # Mismo cálculo vectorizado que los reportes de todas las empresas
+        reports = hourly_reports(df, start_dt, end_dt, {company: multiplo}, companies=[company])
+        return reports[str(company)]
 
     def generate_report(self):
-        df = getattr(self.csv_processor, "combined_df", None)
-        if df is None or df.empty:
+        if self._busy("Reporte"):
+            return
+        company = self.company_cb.get()
+        if not company and self.csv_processor.has_data():
+            company = self.csv_processor.combined_index.companies[0]
+        if not company:
             messagebox.showinfo("Reporte", "No hay datos para generar reporte.")
             return
-        company = self.company_cb.get() or ("General" if "company" not in df.columns else str(df["company"].iloc[0]))
         try:
             m = float(self.multiplier_sp.get())
         except Exception:
             m = 80.0
         # Guardar preferencia por empresa
-        self.company_multipliers[company] = m
+        self.company_multipliers.set(company, m, effective=self._multiplier_effective_date())
         # Construir tabla
         sdate = self.start_date.get_date(); edate = self.end_date.get_date()
         sh, sm, eh, em = self._sanitize_time_inputs()
@@ -648,6 +843,51 @@ class CSVUploaderApp:
         self.last_report = {"df": report_df, "totals": totals, "meta": meta}
         self.show_report_window(report_df, totals, meta)
 
+    def generate_all_reports(self):
+        """Reporte mensual de TODAS las empresas en una pasada (libro multi-hoja o un libro por empresa)."""
+        if self._busy("Reporte"):
+            return
+        index = self.csv_processor.combined_index
+        if index is None or not len(index):
+            messagebox.showinfo("Reporte", "No hay datos para generar reportes.")
+            return
+        one_book = messagebox.askyesnocancel(
+            "Reportes (todas)",
+            "¿Un solo libro con una hoja por empresa?\n(No = un archivo por empresa en una carpeta)"
+        )
+        if one_book is None:
+            return
+        if one_book:
+            target = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel", "*.xlsx")],
+                                                  title="Guardar reportes mensuales")
+        else:
+            target = filedialog.askdirectory(title="Carpeta para los reportes")
+        if not target:
+            return
+
+        sdate = self.start_date.get_date(); edate = self.end_date.get_date()
+        start_dt = datetime(sdate.year, sdate.month, sdate.day, 0, 0)
+        end_dt = datetime(edate.year, edate.month, edate.day, 23, 59)
+        eff = self._multiplier_effective_date()
+        companies = sorted(index.companies)
+        multipliers = {c: self.company_multipliers.get(c, on=eff) for c in companies}
+
+        def job(progress_cb, cancel):
+            progress_cb(f"Reportes: calculando {len(companies)} empresas…")
+            # Por bloques de empresas completas (en memoria: un solo bloque con todas)
+            reports = {}
+            for batch, frame in index.batches(start_dt, end_dt):
+                check_cancel(cancel)
+                reports.update(hourly_reports(frame, start_dt, end_dt, multipliers, companies=batch,
+                                              default_multiplier=self.company_multipliers.default))
+            if one_book:
+                write_report_book(reports, target, progress_cb=progress_cb, cancel=cancel)
+                return f"Libro guardado:\n{target}"
+            written = write_report_files(reports, target, start_dt, progress_cb=progress_cb, cancel=cancel)
+            return f"{len(written)} reportes guardados en:\n{target}"
+
+        self._run_background("Generando reportes…", job, lambda msg: messagebox.showinfo("Reportes", msg))
+
     def show_report_window(self, report_df: pd.DataFrame, totals: dict, meta: dict):
         win = tk.Toplevel(self.root)
         win.title(f"Reporte mensual - {meta.get('company','')}")
@@ -675,6 +915,137 @@ class CSVUploaderApp:
         btnf.pack(side="bottom", fill="x")
         ttk.Button(btnf, text="Exportar reporte a Excel", command=self.export_report_excel).pack(side="right")
 
+    # ---------- Curva de carga ----------
+    def show_load_curve(self):
+        """
+        Curva kWh/kvarh de la empresa seleccionada en un Canvas.
+        Cada dibujo pide al índice solo el rango visible y lo reduce al ancho en píxeles
+        (src.downsample): rueda = zoom en el cursor, arrastre = desplazar, doble clic = todo.
+        """
+        if self._busy("Curva de carga"):
+            return
+        if not self.csv_processor.has_data():
+            messagebox.showinfo("Curva de carga", "No hay datos para graficar.")
+            return
+        index = self.csv_processor.combined_index
+        company = self.company_cb.get() or index.companies[0]
+        first, last = index.time_range(company)
+        if first is None or first == last:
+            messagebox.showinfo("Curva de carga", "La empresa no tiene lecturas con fecha suficientes.")
+            return
+
+        win = tk.Toplevel(self.root)
+        win.title(f"Curva de carga - {company}")
+        win.geometry("960x520")
+        top = ttk.Frame(win, padding=(12, 8))
+        top.pack(side="top", fill="x")
+        ttk.Label(top, text="Reducción").pack(side="left")
+        method = tk.StringVar(value=DEFAULT_METHOD)
+        method_cb = ttk.Combobox(top, textvariable=method, values=DOWNSAMPLE_METHODS, state="readonly", width=8)
+        method_cb.pack(side="left", padx=(6, 12))
+        info = ttk.Label(top, text="")
+        info.pack(side="left")
+        canvas = tk.Canvas(win, background="white", highlightthickness=0)
+        canvas.pack(side="top", fill="both", expand=True, padx=12, pady=(0, 12))
+
+        colors = {"kwh": "#1b4f72", "kvarh": "#c0392b"}
+        left, right, top_m, bottom = 72, 16, 24, 28
+        min_span = pd.Timedelta(hours=2)
+        view = {"start": first, "end": last, "pending": False, "drag": None}
+
+        def to_px(t, x0, span, width):
+            return left + (t.view("int64") - x0) / span * width
+
+        def draw():
+            view["pending"] = False
+            t0 = time.perf_counter()
+            canvas.delete("all")
+            w, h = canvas.winfo_width(), canvas.winfo_height()
+            pw, ph = w - left - right, h - top_m - bottom
+            if pw < 20 or ph < 20:
+                return
+            if self._analyzing:
+                # Los datos se están reemplazando: se redibuja al terminar (o con el próximo gesto)
+                canvas.create_text(w // 2, h // 2, text="Análisis en curso…")
+                return
+            df = self.csv_processor.get_slice(company, view["start"], view["end"])
+            series = {c: curve_points(df, c, pw, method.get()) for c in colors}
+            values = np.concatenate([v for _, v in series.values()]) if series else np.array([])
+            values = values[~np.isnan(values)]
+            lo, hi = (float(values.min()), float(values.max())) if len(values) else (0.0, 1.0)
+            if hi == lo:
+                hi = lo + 1.0
+            x0 = pd.Timestamp(view["start"]).value
+            span = max(pd.Timestamp(view["end"]).value - x0, 1)
+
+            canvas.create_rectangle(left, top_m, left + pw, top_m + ph, outline="#999999")
+            canvas.create_text(left - 6, top_m, text=f"{hi:,.3f}", anchor="e")
+            canvas.create_text(left - 6, top_m + ph, text=f"{lo:,.3f}", anchor="e")
+            canvas.create_text(left, top_m + ph + 4, anchor="nw",
+                               text=pd.Timestamp(view["start"]).strftime("%d/%m/%Y %H:%M"))
+            canvas.create_text(left + pw, top_m + ph + 4, anchor="ne",
+                               text=pd.Timestamp(view["end"]).strftime("%d/%m/%Y %H:%M"))
+            points = 0
+            for i, (column, (xs, ys)) in enumerate(series.items()):
+                canvas.create_text(left + 8 + i * 80, 4, anchor="nw", text=column, fill=colors[column])
+                points += len(xs)
+                for rx, ry in finite_runs(xs, ys):
+                    px = to_px(rx, x0, span, pw)
+                    py = top_m + ph - (ry - lo) / (hi - lo) * ph
+                    if len(px) == 1:
+                        canvas.create_oval(px[0] - 1, py[0] - 1, px[0] + 1, py[0] + 1, outline=colors[column])
+                    else:
+                        canvas.create_line(*np.column_stack([px, py]).ravel().tolist(), fill=colors[column])
+            ms = (time.perf_counter() - t0) * 1000
+            info.configure(text=f"{len(df):,} lecturas → {points:,} puntos ({method.get()}, {ms:.0f} ms)")
+
+        def redraw(*_):
+            # Un solo dibujo por ráfaga de eventos (rueda, arrastre, cambio de tamaño)
+            if not view["pending"]:
+                view["pending"] = True
+                win.after_idle(draw)
+
+        def set_view(start, end):
+            start, end = max(pd.Timestamp(start), first), min(pd.Timestamp(end), last)
+            if end - start < min_span:
+                return
+            view["start"], view["end"] = start, end
+            redraw()
+
+        def cursor_time(x):
+            pw = max(canvas.winfo_width() - left - right, 1)
+            frac = min(max((x - left) / pw, 0.0), 1.0)
+            return view["start"] + (view["end"] - view["start"]) * frac, frac
+
+        def on_wheel(event):
+            zoom_in = getattr(event, "delta", 0) > 0 or getattr(event, "num", 0) == 4
+            factor = 0.8 if zoom_in else 1.25
+            center, frac = cursor_time(event.x)
+            span = (view["end"] - view["start"]) * factor
+            set_view(center - span * frac, center + span * (1 - frac))
+
+        def on_press(event):
+            view["drag"] = (event.x, view["start"], view["end"])
+
+        def on_motion(event):
+            if view["drag"] is None:
+                return
+            x, start, end = view["drag"]
+            pw = max(canvas.winfo_width() - left - right, 1)
+            shift = (end - start) * ((x - event.x) / pw)
+            shift = min(max(shift, first - start), last - end)
+            set_view(start + shift, end + shift)
+
+        canvas.bind("<Configure>", redraw)
+        canvas.bind("<MouseWheel>", on_wheel)
+        canvas.bind("<Button-4>", on_wheel)
+        canvas.bind("<Button-5>", on_wheel)
+        canvas.bind("<ButtonPress-1>", on_press)
+        canvas.bind("<B1-Motion>", on_motion)
+        canvas.bind("<ButtonRelease-1>", lambda e: view.update(drag=None))
+        canvas.bind("<Double-Button-1>", lambda e: set_view(first, last))
+        method_cb.bind("<<ComboboxSelected>>", redraw)
+
     def export_report_excel(self):
         if not self.last_report:
             messagebox.showinfo("Exportar", "No hay reporte para exportar.")
@@ -689,65 +1060,13 @@ class CSVUploaderApp:
         )
         if not path:
             return
-        try:
-            from openpyxl import Workbook
-            from openpyxl.styles import Alignment, Font, PatternFill, Border, Side
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Reporte"
-
-            # Encabezado
-            ws["A1"] = "Multiplo →"
-            ws["B1"] = int(meta.get("multiplo", 0))
-            ws["C1"] = "Kwh"
-            ws["D1"] = "Kvarh"
-            ws["C2"] = totals["kwh"]
-            ws["D2"] = totals["kvarh"]
-            ws["C2"].number_format = "#,##0.000"
-            ws["D2"].number_format = "#,##0.000"
-            ws["A1"].font = Font(bold=True, size=12)
-            ws["C2"].font = Font(bold=True, size=14)
-            ws["D2"].font = Font(bold=True, size=14)
-
-            # Cabecera de tabla
-            headers = ["Fecha", "Hora", "Kwh", "Kvarh"]
-            ws.append([])  # fila 3 vacía
-            ws.append(headers)  # fila 4
-            hdr_fill = PatternFill("solid", fgColor="D9EAF7")
-            for col, h in enumerate(headers, start=1):
-                cell = ws.cell(row=4, column=col)
-                cell.fill = hdr_fill
-                cell.font = Font(bold=True)
-                cell.alignment = Alignment(horizontal="center")
-
-            # Datos
-            thin = Side(style="thin", color="999999")
-            border = Border(left=thin, right=thin, top=thin, bottom=thin)
-            start_row = 5
-            for idx, r in report_df.iterrows():
-                row = start_row + idx
-                ws.cell(row=row, column=1, value=r["Fecha"])
-                ws.cell(row=row, column=2, value=int(r["Hora"]))
-                c3 = ws.cell(row=row, column=3, value=float(r["Kwh"]))
-                c4 = ws.cell(row=row, column=4, value=float(r["Kvarh"]))
-                c3.number_format = "#,##0.000"
-                c4.number_format = "#,##0.000"
-                for col in range(1, 5):
-                    ws.cell(row=row, column=col).border = border
-                # Colorear columnas Kwh/Kvarh
-                ws.cell(row=row, column=3).fill = PatternFill("solid", fgColor="E9F5FE")
-                ws.cell(row=row, column=4).fill = PatternFill("solid", fgColor="E9F5FE")
-
-            # Anchos
-            ws.column_dimensions["A"].width = 14
-            ws.column_dimensions["B"].width = 8
-            ws.column_dimensions["C"].width = 14
-            ws.column_dimensions["D"].width = 14
-
-            wb.save(path)
-            messagebox.showinfo("Exportar", f"Archivo guardado:\n{path}")
-        except Exception as e:
-            self.show_error(str(e))
+
+        def job(progress_cb, cancel):
+            write_report_excel(path, report_df, totals, meta, progress_cb=progress_cb, cancel=cancel)
+            return path
+
+        self._run_background("Exportando reporte…", job,
+                             lambda p: messagebox.showinfo("Exportar", f"Archivo guardado:\n{p}"))
 
     # ---------- Exportaciones clásicas (Excel/CSV combinados) ----------
     def export_excel(self):
@@ -755,8 +1074,7 @@ class CSVUploaderApp:
         Los totales se calculan como suma(Kwh) y suma(Kvarh) del rango analizado y se multiplican
         por el multiplo de la empresa (si existe) o el actual del spinner como valor por defecto.
         """
-        df = getattr(self.csv_processor, "combined_df", None)
-        if df is None or df.empty:
+        if not self.csv_processor.has_data():
             messagebox.showinfo("Exportar", "No hay datos para exportar.")
             return
 
@@ -770,201 +1088,126 @@ class CSVUploaderApp:
             return
 
         # Solo aplicar el multiplo del spinner a la empresa seleccionada;
-        # las demás usan su valor guardado (o 1.0 por defecto)
+        # las demás usan su valor registrado (o el multiplo por defecto)
         selected_company = self.company_cb.get() or None
         try:
             selected_multiplo = float(self.multiplier_sp.get())
         except Exception:
             selected_multiplo = None
 
-        try:
-            from openpyxl import Workbook
-            from openpyxl.styles import Alignment, Font, PatternFill, Border, Side
-
-            # Preparar datos: formatear timestamp a texto día/mes/año HH:MM:SS
-            data = df.copy()
-            if "timestamp" in data.columns and not data["timestamp"].isna().all():
-                if pd.api.types.is_datetime64_any_dtype(data["timestamp"]):
-                    data["timestamp"] = data["timestamp"].dt.strftime("%d/%m/%Y %H:%M:%S")
-                else:
-                    ts = pd.to_datetime(data["timestamp"].astype(str), errors="coerce", dayfirst=True)
-                    data["timestamp"] = ts.dt.strftime("%d/%m/%Y %H:%M:%S")
-
-            # Crear libro, estilos y hoja TOTAL (primera)
-            wb = Workbook()
-            hdr_fill = PatternFill("solid", fgColor="D9EAF7")
-            light_fill = PatternFill("solid", fgColor="E9F5FE")
-            thin = Side(style="thin", color="999999")
-            border = Border(left=thin, right=thin, top=thin, bottom=thin)
-
-            ws_total = wb.active
-            ws_total.title = "total"
-
-            # Cabecera TOTAL
-            total_headers = ["No.", "Cliente", "Multiplo", "KWh", "KVARh", "KW"]
-            ws_total.append(total_headers)
-            for c in range(1, len(total_headers) + 1):
-                cell = ws_total.cell(row=1, column=c)
-                cell.fill = hdr_fill
-                cell.font = Font(bold=True)
-                cell.alignment = Alignment(horizontal="center")
-
-            # Preparar compañías y mapa nombre->hoja
-            companies = sorted([str(x) for x in data["company"].dropna().unique()]) if "company" in data.columns else ["General"]
-            if "company" not in data.columns:
-                data["company"] = "General"
-
-            # Helper para nombre de hoja único (cap Excel 31 chars)
-            used_titles = set([ws_total.title])
-            def unique_title(base: str) -> str:
-                t = str(base)[:31]
-                if t not in used_titles:
-                    used_titles.add(t); return t
-                i = 2
-                while True:
-                    cand = (str(base)[:31-len(str(i))-1] + f" {i}") if len(str(base)) >= 31 else f"{str(base)} {i}"
-                    cand = cand[:31]
-                    if cand not in used_titles:
-                        used_titles.add(cand); return cand
-                    i += 1
-
-            sheet_by_company = {}
-
-            # Crear hojas por empresa y recolectar totales + rango para KW
-            total_rows = []
-            for idx, company in enumerate(companies, start=1):
-                 # Resolver multiplo por empresa: usa el guardado; si no existe, el valor por defecto (spinner inicial)
-                m = float(self.company_multipliers.get(company, getattr(self, 'default_multiplier', 80)))
-                if selected_company and company == selected_company and (selected_multiplo is not None):
-                    m = float(selected_multiplo)
-                    # Actualizar cache para esta empresa únicamente
-                    self.company_multipliers[company] = m
-                cdf = data[data["company"].astype(str) == company].copy()
-
-                # Totales multiplicados para TOTAL
-                kwh_sum = float(pd.to_numeric(cdf.get("kwh"), errors="coerce").sum()) if "kwh" in cdf.columns else 0.0
-                kvar_sum = float(pd.to_numeric(cdf.get("kvarh"), errors="coerce").sum()) if "kvarh" in cdf.columns else 0.0
-                kwh_total = kwh_sum * m
-                kvar_total = kvar_sum * m
-
-                # Hoja empresa
-                sheet_name = unique_title(company)
-                ws = wb.create_sheet(title=sheet_name)
-                sheet_by_company[company] = sheet_name
-
-                # Encabezado Totales/Multiplo
-                ws["A1"] = "Multiplo →"; ws["A1"].font = Font(bold=True, size=12)
-                ws["B1"] = int(m)
-                # Colocar directamente los totales numéricos en D1 y E1 como solicitaste
-                ws["C1"] = "Kwh"; ws["C1"].font = Font(bold=True, size=12)
-                ws["D1"] = kwh_total; ws["D1"].number_format = "#,##0.000"; ws["D1"].font = Font(bold=True, size=14)
-                ws["E1"] = kvar_total; ws["E1"].number_format = "#,##0.000"; ws["E1"].font = Font(bold=True, size=14)
-
-                # Cabeceras de tabla
-                ws.append([])  # fila 3
-                cols = []
-                for name in ["timestamp", "Hora", "company", "kwh", "kvarh"]:
-                    if name in cdf.columns and name not in cols:
-                        cols.append(name)
-                for name in cdf.columns:
-                    if name not in cols:
-                        cols.append(name)
-                ws.append(cols)  # fila 4
-                for col_idx, h in enumerate(cols, start=1):
-                    cell = ws.cell(row=4, column=col_idx)
-                    cell.fill = hdr_fill
-                    cell.font = Font(bold=True)
-                    cell.alignment = Alignment(horizontal="center")
-
-                # Datos
-                start_row = 5
-                for ridx, (_, row) in enumerate(cdf.iterrows(), start=start_row):
-                    for cidx, col_name in enumerate(cols, start=1):
-                        val = row.get(col_name)
-                        cell = ws.cell(row=ridx, column=cidx, value=val if pd.notna(val) else None)
-                        cell.border = border
-                        if col_name.lower() in ("kwh", "kvarh"):
-                            cell.number_format = "#,##0.000"
-                            cell.fill = light_fill
-
-                # Anchos
-                ws.column_dimensions["A"].width = max(14, min(28, len(str(cols[0])) + 6)) if cols else 14
-                ws.column_dimensions["B"].width = 10
-                ws.column_dimensions["C"].width = 16
-                ws.column_dimensions["D"].width = 16
-
-                # Guardar info para TOTAL (hipervínculo y fórmula KW)
-                last_row = start_row + max(len(cdf), 1) - 1
-                if len(cdf) <= 0:
-                    kw_formula = 0
-                else:
-                    # Kwh está en columna D por el orden definido
-                    esc = sheet_name.replace("'", "''")
-                    kw_formula = f"=MAX('{esc}'!$D${start_row}:$D${last_row})"
-                total_rows.append((idx, company, m, kwh_total, kvar_total, kw_formula, esc, start_row, last_row))
-
-            # Volcar TOTAL con hipervínculos
-            for r_idx, (no, company, m, kwh_t, kvar_t, kw_formula, esc, srow, lrow) in enumerate(total_rows, start=2):
-                ws_total.cell(row=r_idx, column=1, value=no)
-                c_name = ws_total.cell(row=r_idx, column=2, value=company)
-                sheet_name = sheet_by_company[company]
-                esc = sheet_name.replace("'", "''")
-                # Hipervínculo con nombre de hoja entre comillas simples
-                c_name.hyperlink = f"#'{esc}'!A1"
-                c_name.font = Font(color="0563C1", underline="single")
-                ws_total.cell(row=r_idx, column=3, value=int(m))
-                # KWh/KVARh en TOTAL con respaldo: si D1/E1 no son números, sumar columna de datos
-                c4 = ws_total.cell(row=r_idx, column=4)
-                c4.value = f"=IF(ISNUMBER('{esc}'!$D$1), '{esc}'!$D$1, SUM('{esc}'!$D${srow}:'{esc}'!$D${lrow}))"; c4.number_format = "#,##0.000"
-                c5 = ws_total.cell(row=r_idx, column=5)
-                c5.value = f"=IF(ISNUMBER('{esc}'!$E$1), MAX('{esc}'!$E$1), SUM('{esc}'!$E${srow}:'{esc}'!$E${lrow}))"; c5.number_format = "#,##0.000"
-                c6 = ws_total.cell(row=r_idx, column=6)
-                if isinstance(kw_formula, str):
-                    c6.value = kw_formula
-                else:
-                    c6.value = 0
-                c6.number_format = "#,##0.000"
-
-            # Anchos TOTAL
-            ws_total.column_dimensions["A"].width = 6
-            ws_total.column_dimensions["B"].width = 34
-            ws_total.column_dimensions["C"].width = 10
-            ws_total.column_dimensions["D"].width = 16
-            ws_total.column_dimensions["E"].width = 16
-            ws_total.column_dimensions["F"].width = 12
-
-            wb.save(path)
-            messagebox.showinfo("Exportar", f"Excel exportado: {path}")
-        except Exception as e:
-            self.show_error(str(e))
+        # El spinner solo actualiza el multiplo de la empresa seleccionada
+        if selected_company and selected_multiplo is not None:
+            eff = self._multiplier_effective_date()
+            if selected_multiplo != self.company_multipliers.get(selected_company, on=eff):
+                self.company_multipliers.set(selected_company, selected_multiplo, effective=eff)
+
+        # Índice empresa/tiempo: frame ordenado, siempre con columna company
+        index = self.csv_processor.combined_index
+        multipliers = self.company_multipliers
+
+        def job(progress_cb, cancel):
+            totals, mults = [], []
+            # Por bloques de empresas completas (en memoria: un solo bloque con todo combined_df)
+            for _, df in index.batches():
+                check_cancel(cancel)
+                # Totales multiplicados: un solo join vectorizado de multiplos sobre el bloque
+                keys = df["company"].astype(str)
+                mult = multipliers.apply(df)
+                # En punto fijo el producto y la suma son enteros; a kWh al final
+                scaled = pd.DataFrame({c: multiply(df[c], mult) for c in ("kwh", "kvarh") if c in df.columns})
+                totals.append(frame_to_display(scaled.groupby(keys).sum()))
+                mults.append(mult.groupby(keys).last())
+            totals_by_company = pd.concat(totals) if totals else pd.DataFrame()
+            mult_by_company = pd.concat(mults) if mults else pd.Series(dtype="float64")
+            write_company_workbook(path, index, totals_by_company, mult_by_company, multipliers.default,
+                                   progress_cb=progress_cb, cancel=cancel)
+            return path
+
+        self._run_background("Exportando Excel…", job,
+                             lambda p: messagebox.showinfo("Exportar", f"Excel exportado: {p}"))
 
     def export_csv(self):
-        df = getattr(self.csv_processor, "combined_df", None)
-        if df is None or df.empty:
+        if not self.csv_processor.has_data():
             messagebox.showinfo("Exportar", "No hay datos para exportar.")
             return
         path = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("CSV", "*.csv")],
+            filetypes=[("CSV", "*.csv"), ("CSV comprimido", "*.csv.gz")],
             title="Guardar CSV combinado"
         )
         if not path:
             return
-        ok, msg = self.csv_processor.export_combined_csv(path)
+
+        # Índice capturado al lanzar el trabajo, como en export_excel
+        index = self.csv_processor.combined_index
+
+        def job(progress_cb, cancel):
+            ok, msg = self.csv_processor.export_combined_csv(path, progress_cb=progress_cb, cancel=cancel,
+                                                             index=index)
+            if cancel.is_set():
+                raise Cancelled()
+            if not ok:
+                raise RuntimeError(msg)
+            return msg
+
+        self._run_background("Exportando CSV…", job, lambda msg: messagebox.showinfo("Exportar", msg))
+
+    # ---------- Sesiones (Parquet/Feather) ----------
+    def save_session(self):
+        if self._busy("Sesión"):
+            return
+        if not self.csv_processor.has_data():
+            messagebox.showinfo("Sesión", "No hay datos para guardar.")
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=".parquet",
+            filetypes=[("Parquet", "*.parquet"), ("Feather", "*.feather")],
+            initialdir=str(getattr(self.csv_processor, "output_dir", "") or ""),
+            title="Guardar sesión de análisis"
+        )
+        if not path:
+            return
+        ok, msg = self.csv_processor.export_session(
+            path, results=getattr(self, "last_results", None),
+            multipliers=self.company_multipliers.as_dict(on=self._multiplier_effective_date())
+        )
         if ok:
-            messagebox.showinfo("Exportar", msg)
+            self.append_info(msg)
         else:
-            messagebox.showerror("Exportar", msg)
+            self.show_error(msg)
+
+    def open_session(self):
+        path = filedialog.askopenfilename(
+            filetypes=[("Sesiones", "*.parquet *.feather *.arrow"), ("Todos", "*.*")],
+            initialdir=str(getattr(self.csv_processor, "output_dir", "") or ""),
+            title="Abrir sesión de análisis"
+        )
+        if not path:
+            return
+        if self._busy("Sesión"):
+            return
+        ok, msg, session = self.csv_processor.load_session(path)
+        if not ok:
+            self.show_error(msg)
+            return
+        # El registro persistente manda; la sesión solo completa empresas sin multiplo
+        for company, m in (session.get("multipliers") or {}).items():
+            if company not in self.company_multipliers:
+                self.company_multipliers.set(company, m, autosave=False)
+        self.company_multipliers.save()
+        self.on_analysis_done(True, msg, session.get("results") or {})
 
     # ...existing code on_analysis_done...
     def on_analysis_done(self, ok: bool, msg: str, results: dict):
         self.append_info(msg)
-        if ok and getattr(self.csv_processor, "combined_df", None) is not None:
+        if ok and self.csv_processor.has_data():
             self.last_results = results
             if hasattr(self, "export_excel_btn"):
                 self.export_excel_btn.configure(state="normal")
             if hasattr(self, "export_csv_btn"):
                 self.export_csv_btn.configure(state="normal")
+            if hasattr(self, "save_session_btn"):
+                self.save_session_btn.configure(state="normal")
             # Habilitar selección de empresa y reporte
             self.populate_companies()
             cs = results.get("combined_stats", {})
@@ -973,3 +1216,5 @@ class CSVUploaderApp:
             self.append_info("Sin resultados para exportar.")
             self.company_cb.configure(state="disabled")
             self.report_btn.configure(state="disabled")
+            self.batch_report_btn.configure(state="disabled")
+            self.curve_btn.configure(state="disabled")